@@ -12,14 +12,30 @@ sys.path.insert(0, project_root)
 
 # Configure Django settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'expense_tracker.settings.development')
+# Define a shard database for the sharding tests, but leave sharding off
+os.environ.setdefault('DB_SHARDS', 'shard1')
+os.environ.setdefault('EXPENSE_SHARDS', '')
 
 # Initialize Django
 if not settings.configured:
     django.setup()
 
 import pytest
+from datetime import date
+from decimal import Decimal
 from django.contrib.auth.models import User
 
+from expenses.models import Expense, ExpenseCategory
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache."""
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
+
 
 @pytest.fixture
 def user(db):
@@ -31,6 +47,19 @@ def user(db):
     )
 
 
+@pytest.fixture
+def expense_factory(db):
+    """
+    Create an expense for a user: ``expense_factory(user, '12.50', ...)``.
+    Category defaults to food and date to today; other fields as keywords.
+    """
+    def create(user, amount='10.00', **kwargs):
+        kwargs.setdefault('category', ExpenseCategory.FOOD)
+        kwargs.setdefault('date', date.today())
+        return Expense.objects.create(user=user, amount=Decimal(amount), **kwargs)
+    return create
+
+
 @pytest.fixture
 def authenticated_client(client, user):
     """Create an authenticated client."""
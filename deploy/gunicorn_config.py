@@ -2,14 +2,19 @@
 Gunicorn configuration file for production deployment.
 """
 import multiprocessing
+import os
 
 # Server socket
 bind = "0.0.0.0:8000"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# Each worker keeps its own database pool of up to DB_POOL_MAX_SIZE
+# connections, so a host opens at most workers * DB_POOL_MAX_SIZE. With
+# threads > 1 (gthread workers) set DB_POOL_MAX_SIZE to the thread count.
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+worker_class = "sync" if threads == 1 else "gthread"
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 50
@@ -22,8 +27,9 @@ errorlog = "-"
 loglevel = "info"
 access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
 
-# Process naming
-proc_name = "expense_tracker"
+# Process naming (the auth pool in docker-compose.yml runs this same
+# config with fewer workers)
+proc_name = os.environ.get("GUNICORN_PROC_NAME", "expense_tracker")
 
 # Server mechanics
 daemon = False
@@ -0,0 +1,244 @@
+"""
+In-process database connection pool.
+
+One pool per database per worker process, shared by the worker's threads.
+Django hands its connection back at the end of each request (with
+``CONN_MAX_AGE = 0``) and the pool keeps it open for the next one, so a
+worker needs at most ``max_size`` server connections however many requests
+it serves. Connections idle for longer than ``check_interval`` are health
+checked before reuse, which weeds out connections broken by a failover.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the pool timeout."""
+
+
+class _Entry:
+    __slots__ = ('connection', 'created', 'last_used')
+
+    def __init__(self, connection, now):
+        self.connection = connection
+        self.created = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections created by ``connect()``.
+
+    ``check(connection)`` raises if a connection is unusable and
+    ``reset(connection)`` returns it to a clean state before reuse; both
+    are optional.
+    """
+
+    def __init__(self, connect, *, check=None, reset=None, min_size=0, max_size=10,
+                 timeout=10.0, max_idle=300.0, max_lifetime=1800.0,
+                 check_interval=30.0, name='pool'):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self.connect = connect
+        self.check = check
+        self.reset = reset
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self.name = name
+        self.pid = os.getpid()
+
+        self._idle = deque()
+        self._in_use = {}
+        self._opening = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._counters = dict.fromkeys((
+            'connections_created', 'connections_closed', 'checkouts',
+            'timeouts', 'health_check_failures',
+        ), 0)
+        self._wait_seconds = 0.0
+
+    @property
+    def size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def acquire(self):
+        """Check out a connection, waiting up to ``timeout`` seconds."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout(f'{self.name} is closed')
+                    entry = self._take_idle()
+                    if entry is not None or self.size < self.max_size:
+                        # Reserve the slot while the connection is checked or opened
+                        self._opening += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'{self.name}: no connection available after {self.timeout}s '
+                            f'({self.max_size} in use)'
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+        try:
+            if entry is None or not self._healthy(entry):
+                entry = self._open()
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._opening -= 1
+            self._in_use[id(entry.connection)] = entry
+            self._counters['checkouts'] += 1
+            self._wait_seconds += entry.last_used - started
+        return entry.connection
+
+    def release(self, connection):
+        """Return a checked out connection to the pool."""
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            self._close_connection(connection)
+            return
+        now = time.monotonic()
+        keep = not self._closed and now - entry.created < self.max_lifetime
+        if keep and self.reset is not None:
+            try:
+                self.reset(connection)
+            except Exception:
+                keep = False
+        if not keep:
+            self._close_connection(connection)
+            with self._cond:
+                self._cond.notify()
+            return
+        entry.last_used = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def discard(self, connection):
+        """Close a checked out connection instead of returning it."""
+        with self._cond:
+            self._in_use.pop(id(connection), None)
+            self._cond.notify()
+        self._close_connection(connection)
+
+    def close(self):
+        """Close idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_connection(entry.connection)
+
+    def stats(self):
+        """Current pool metrics."""
+        with self._cond:
+            checkouts = self._counters['checkouts']
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'max_size': self.max_size,
+                **self._counters,
+                'avg_wait_ms': round(self._wait_seconds * 1000 / checkouts, 3) if checkouts else 0.0,
+            }
+
+    def _take_idle(self):
+        """Pop the most recently used live connection (lock held)."""
+        now = time.monotonic()
+        while self._idle:
+            entry = self._idle.pop()
+            expired = now - entry.created >= self.max_lifetime or (
+                now - entry.last_used >= self.max_idle and self.size >= self.min_size
+            )
+            if not expired:
+                return entry
+            self._close_connection(entry.connection)
+        return None
+
+    def _healthy(self, entry):
+        if self.check is None or time.monotonic() - entry.last_used < self.check_interval:
+            return True
+        try:
+            self.check(entry.connection)
+            return True
+        except Exception:
+            logger.warning('%s: discarding connection that failed its health check', self.name)
+            with self._cond:
+                self._counters['health_check_failures'] += 1
+            self._close_connection(entry.connection)
+            return False
+
+    def _open(self):
+        connection = self.connect()
+        with self._cond:
+            self._counters['connections_created'] += 1
+        return _Entry(connection, time.monotonic())
+
+    def _close_connection(self, connection):
+        with self._cond:
+            self._counters['connections_closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Connections inherited from a parent process are never closed by the child:
+# closing would terminate the parent's session on the shared socket.
+_inherited = []
+
+
+def get_pool(key, factory):
+    """The pool registered under ``key`` in this process, created on demand."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                _inherited.append(pool)
+            pool = _pools[key] = factory()
+        return pool
+
+
+def close_pools(predicate=None):
+    """Close the pools whose key matches ``predicate`` (all by default)."""
+    with _pools_lock:
+        keys = [key for key in _pools if predicate is None or predicate(key)]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
+
+
+def pool_stats():
+    """Metrics of every pool in this process, keyed by pool name."""
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+    return {pool.name: pool.stats() for pool in pools}
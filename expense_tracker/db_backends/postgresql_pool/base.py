@@ -0,0 +1,131 @@
+"""
+PostgreSQL backend that takes connections from an in-process pool.
+
+Use with ``CONN_MAX_AGE = 0``: Django "closes" its connection at the end of
+every request, which returns it to the pool. Pool sizing comes from the
+``POOL`` entry of the database settings::
+
+    'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 4, 'TIMEOUT': 10, 'MAX_IDLE': 300,
+             'MAX_LIFETIME': 1800, 'CHECK_INTERVAL': 30}
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+
+from ..pool import ConnectionPool, PoolTimeout, close_pools, get_pool
+
+if not is_psycopg3:
+    import psycopg2.extras
+
+Database = base.Database
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 4,
+    'TIMEOUT': 10,
+    'MAX_IDLE': 300,
+    'MAX_LIFETIME': 1800,
+    'CHECK_INTERVAL': 30,
+}
+
+
+def check_connection(connection):
+    """Raise if ``connection`` can no longer run queries."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    connection.rollback()
+
+
+def reset_connection(connection):
+    """Roll back anything left open before the connection is reused."""
+    if connection.closed:
+        raise Database.InterfaceError('connection already closed')
+    connection.rollback()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would block DROP DATABASE
+        close_pools(lambda key: key[1] == test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+
+    @property
+    def pool_enabled(self):
+        return self.alias != NO_DB_ALIAS and self.settings_dict.get('POOL') is not False
+
+    def pool_key(self, conn_params):
+        return (
+            self.alias, conn_params.get('dbname'), conn_params.get('host'),
+            conn_params.get('port'), conn_params.get('user'),
+        )
+
+    def _isolation_level(self):
+        """The configured isolation level and whether it must be set explicitly."""
+        options = self.settings_dict['OPTIONS']
+        if 'isolation_level' not in options:
+            return IsolationLevel.READ_COMMITTED, False
+        try:
+            return IsolationLevel(options['isolation_level']), True
+        except ValueError:
+            raise ImproperlyConfigured(
+                f"Invalid transaction isolation level {options['isolation_level']} "
+                f"specified. Use one of the psycopg.IsolationLevel values."
+            )
+
+    def _create_pool(self, conn_params):
+        isolation_level, set_isolation_level = self._isolation_level()
+
+        def connect():
+            connection = Database.connect(**conn_params)
+            if set_isolation_level:
+                connection.isolation_level = isolation_level
+            if not is_psycopg3:
+                psycopg2.extras.register_default_jsonb(
+                    conn_or_curs=connection, loads=lambda x: x
+                )
+            return connection
+
+        options = {**POOL_DEFAULTS, **(self.settings_dict.get('POOL') or {})}
+        return ConnectionPool(
+            connect,
+            check=check_connection,
+            reset=reset_connection,
+            min_size=options['MIN_SIZE'],
+            max_size=options['MAX_SIZE'],
+            timeout=options['TIMEOUT'],
+            max_idle=options['MAX_IDLE'],
+            max_lifetime=options['MAX_LIFETIME'],
+            check_interval=options['CHECK_INTERVAL'],
+            name=self.alias,
+        )
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_enabled:
+            return super().get_new_connection(conn_params)
+        pool = get_pool(self.pool_key(conn_params), lambda: self._create_pool(conn_params))
+        try:
+            connection = pool.acquire()
+        except PoolTimeout as exc:
+            raise Database.OperationalError(str(exc)) from exc
+        self._pool = pool
+        self.isolation_level = self._isolation_level()[0]
+        return connection
+
+    def _close(self):
+        pool, self._pool = self._pool, None
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            if self.errors_occurred and not self.is_usable():
+                pool.discard(self.connection)
+            else:
+                pool.release(self.connection)
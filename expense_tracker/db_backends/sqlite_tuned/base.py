@@ -0,0 +1,36 @@
+"""
+SQLite backend tuned for single-node deployments with several workers.
+
+Every new connection switches to WAL journaling (readers no longer block
+the writer), relaxes fsyncs to ``synchronous=NORMAL`` (safe with WAL),
+enlarges the page cache and memory map and waits ``busy_timeout`` ms for
+locks. Transactions start with ``BEGIN IMMEDIATE`` so a transaction that
+reads before it writes takes the write lock up front, waiting on the busy
+timeout, instead of failing with "database is locked" when it later tries
+to upgrade its read lock. Override pragmas with the ``PRAGMAS`` entry of
+the database settings.
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMA_DEFAULTS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    # Negative values are KiB rather than pages
+    'cache_size': -32000,
+    'busy_timeout': 5000,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def pragmas(self):
+        return {**PRAGMA_DEFAULTS, **(self.settings_dict.get('PRAGMAS') or {})}
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas().items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,101 @@
+"""
+Liveness and readiness endpoints for load balancers and orchestrators.
+
+``/health/`` only says the worker answers requests. ``/ready/`` also runs
+``SELECT 1`` on the primary and every expense shard and a set/get round trip
+on the default cache, and answers ``503`` when any of them fails or is slower
+than ``HEALTH_DB_MAX_LATENCY`` / ``HEALTH_CACHE_MAX_LATENCY`` seconds, so
+traffic is routed away from workers that could not serve it anyway.
+"""
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.views import View
+
+logger = logging.getLogger(__name__)
+
+
+def readiness_databases():
+    """The primary plus every expense shard, each once."""
+    return list(dict.fromkeys(['default', *getattr(settings, 'EXPENSE_SHARDS', [])]))
+
+
+def check_database(alias):
+    """Run ``SELECT 1`` on ``alias``."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def check_cache(alias='default'):
+    """Write a value to the cache and read it back."""
+    cache = caches[alias]
+    key = f'health:{uuid.uuid4().hex}'
+    cache.set(key, key, 10)
+    try:
+        if cache.get(key) != key:
+            raise RuntimeError('Cache returned a different value')
+    finally:
+        cache.delete(key)
+
+
+def timed_check(name, check, max_latency):
+    """Run ``check`` and report its status and latency."""
+    started = time.perf_counter()
+    try:
+        check()
+    except Exception:
+        logger.exception('Readiness check %s failed', name)
+        status = 'error'
+    else:
+        status = 'ok'
+    latency = time.perf_counter() - started
+    if status == 'ok' and latency > max_latency:
+        logger.warning('Readiness check %s took %.3fs', name, latency)
+        status = 'slow'
+    return {'status': status, 'latency_ms': round(latency * 1000, 3)}
+
+
+def readiness_checks():
+    """Status and latency of every dependency, keyed by check name."""
+    db_max = getattr(settings, 'HEALTH_DB_MAX_LATENCY', 0.5)
+    results = {
+        f'database:{alias}': timed_check(f'database:{alias}', lambda: check_database(alias), db_max)
+        for alias in readiness_databases()
+    }
+    results['cache'] = timed_check(
+        'cache', check_cache, getattr(settings, 'HEALTH_CACHE_MAX_LATENCY', 0.25)
+    )
+    return results
+
+
+class LivenessView(View):
+    """The worker is up; no dependencies are checked."""
+
+    def get(self, request, *args, **kwargs):
+        response = HttpResponse('OK', content_type='text/plain')
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class ReadinessView(View):
+    """The worker can reach its databases and cache quickly enough."""
+
+    def get(self, request, *args, **kwargs):
+        checks = readiness_checks()
+        ready = all(check['status'] == 'ok' for check in checks.values())
+        response = JsonResponse(
+            {'status': 'ok' if ready else 'unavailable', 'checks': checks},
+            status=200 if ready else 503,
+        )
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+liveness = LivenessView.as_view()
+readiness = ReadinessView.as_view()
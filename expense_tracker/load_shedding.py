@@ -0,0 +1,63 @@
+"""
+Overload detection for load shedding.
+
+A ``LoadMonitor`` tracks the requests in flight in one worker process and a
+moving average of how long they took. The average moves by ``alpha`` of
+each new sample and decays toward zero while no request finishes, so a
+worker that went quiet after a slow spell is not considered overloaded
+forever. With sync gunicorn workers a process handles one request at a
+time, so the in-flight limit only matters with ``GUNICORN_THREADS > 1``;
+the time a request spent queued before a worker picked it up (from the
+``X-Request-Start`` header set by nginx) covers the sync case.
+"""
+import math
+import threading
+import time
+
+
+class LoadMonitor:
+    """In-flight requests and recent latency of this process."""
+
+    def __init__(self, alpha=0.2, decay=30.0):
+        self.alpha = alpha
+        self.decay = decay
+        self.in_flight = 0
+        self._latency = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decayed(self, now):
+        return self._latency * math.exp(-max(0.0, now - self._updated) / self.decay)
+
+    def latency(self, now=None):
+        """Moving average of request durations in seconds."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self._decayed(now)
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, duration, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.in_flight -= 1
+            self._latency = (1 - self.alpha) * self._decayed(now) + self.alpha * duration
+            self._updated = now
+
+
+def queue_time(value, now=None):
+    """
+    Seconds since ``value``, an ``X-Request-Start`` header of the form
+    ``t=1700000000.123`` (nginx's ``$msec``), or None if it is missing or
+    malformed.
+    """
+    if not value:
+        return None
+    try:
+        started = float(value.removeprefix('t='))
+    except ValueError:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, now - started)
@@ -0,0 +1,159 @@
+"""
+Non-blocking structured logging.
+
+Every logger writes to one ``BackgroundHandler``, which only puts records
+on an in-memory queue; a single listener thread per process formats them
+and hands them to the real handlers (console, file, admin emails). A
+request never waits for disk or SMTP, and when the queue is full records
+are dropped and counted rather than blocking. ``JSONFormatter`` writes one
+JSON object per line with the request id, user id, view name and, for the
+access lines of ``RequestLogMiddleware``, the status and latency.
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import atexit
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+import threading
+
+# Fields of the current request, set by RequestLogMiddleware
+_context = ContextVar('log_context', default=None)
+
+CONTEXT_FIELDS = ('request_id', 'user_id', 'view')
+# LogRecord attributes passed through ``extra`` that JSONFormatter writes
+EXTRA_FIELDS = ('method', 'path', 'status', 'latency_ms')
+
+
+def log_context():
+    """The mutable context dict of the current request, or None."""
+    return _context.get()
+
+
+def bind_context(**fields):
+    """Start a request context; returns a token for ``reset_context``."""
+    return _context.set(dict(fields))
+
+
+def reset_context(token):
+    _context.reset(token)
+
+
+class RequestContextFilter(logging.Filter):
+    """Copy the current request's context onto every record."""
+
+    def filter(self, record):
+        context = _context.get() or {}
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec='milliseconds'
+            ),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.thread,
+        }
+        for field in CONTEXT_FIELDS + EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """
+    Queue records for the handlers named in ``targets``, which a listener
+    thread started on first use (and again after a fork) writes out.
+    ``configure_logging`` connects the names to the configured handlers.
+    """
+
+    def __init__(self, targets=(), maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target_names = list(targets)
+        self.targets = []
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # Threads do not survive a fork, and neither should queued records
+            self.queue = queue.Queue(self.maxsize)
+            self._listener = logging.handlers.QueueListener(
+                self.queue, *self.targets, respect_handler_level=True
+            )
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """Write out queued records and stop the listener thread."""
+        listener, self._listener = self._listener, None
+        if listener is not None and self._pid == os.getpid():
+            listener.stop()
+        self._pid = None
+
+    def prepare(self, record):
+        # Merge the arguments now, since they may change once the caller
+        # moves on, but keep exc_info and attributes such as ``request``
+        # for the formatters and AdminEmailHandler
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            self._put_warning(f'Logging queue full; {dropped} records dropped')
+
+    def _put_warning(self, message):
+        record = logging.makeLogRecord({
+            'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING', 'msg': message,
+        })
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def configure_logging(config):
+    """
+    ``LOGGING_CONFIG``: apply ``config`` with ``dictConfig`` and point each
+    ``BackgroundHandler`` at the handlers it names.
+    """
+    configurator = logging.config.DictConfigurator(config)
+    configurator.configure()
+    handlers = configurator.config.get('handlers', {})
+    for handler in handlers.values():
+        if isinstance(handler, BackgroundHandler):
+            handler.stop()
+            handler.targets = [handlers[name] for name in handler.target_names]
@@ -0,0 +1,257 @@
+"""
+Project-wide middleware.
+"""
+import logging
+import math
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from .load_shedding import LoadMonitor, queue_time
+from .log import bind_context, log_context, reset_context
+from .routers import routing_context
+from .throttling import parse_rate, take
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger('expense_tracker.requests')
+
+REPLICA_PIN_COOKIE = 'db_pinned_until'
+
+
+class RequestLogMiddleware:
+    """
+    Give every request an id (nginx's ``X-Request-ID`` or a new one), bind
+    it with the user and view name to the log context of everything logged
+    while handling it, return it in the ``X-Request-ID`` response header and
+    log one access line with the status and latency. Goes first, so shed
+    and throttled requests are logged too.
+    """
+
+    REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.META.get('HTTP_X_REQUEST_ID', '')
+        if not self.REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        token = bind_context(request_id=request_id)
+        started = time.monotonic()
+        try:
+            response = self.get_response(request)
+            response['X-Request-ID'] = request_id
+            access_logger.info(
+                '%s %s %s', request.method, request.path, response.status_code,
+                extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'latency_ms': round((time.monotonic() - started) * 1000, 3),
+                },
+            )
+            return response
+        finally:
+            reset_context(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        context = log_context()
+        if context is None:
+            return None
+        context['view'] = request.resolver_match.view_name if request.resolver_match else None
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            context['user_id'] = user.pk
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Track database writes and the user of each request for the routers.
+    After a request writes, a short-lived cookie pins the client's reads to
+    the primary so they always see their own changes. Writes refused while
+    the user's data moves between shards answer 503 with ``Retry-After``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        now = time.time()
+        try:
+            pinned = float(request.COOKIES.get(REPLICA_PIN_COOKIE, 0)) > now
+        except ValueError:
+            pinned = False
+
+        def user_id():
+            # Resolved on first use: AuthenticationMiddleware runs after this
+            return getattr(getattr(request, 'user', None), 'pk', None)
+
+        with routing_context(pinned=pinned, user=user_id) as state:
+            response = self.get_response(request)
+
+        if state.written:
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+            response.set_cookie(
+                REPLICA_PIN_COOKIE,
+                str(int(now + pin_seconds)),
+                max_age=pin_seconds,
+                httponly=True,
+                samesite='Lax',
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
+
+    def process_exception(self, request, exception):
+        from expenses.sharding import UserMoving
+
+        if not isinstance(exception, UserMoving):
+            return None
+        logger.warning('Refused a write during a shard move: %s', exception)
+        response = HttpResponse(
+            'Your data is being moved. Please try again shortly.\n',
+            status=503,
+            content_type='text/plain',
+        )
+        response['Retry-After'] = str(getattr(settings, 'SHARD_MOVE_RETRY_AFTER', 10))
+        return response
+
+
+class ThrottleMiddleware:
+    """
+    Refuse bursts of writes with ``429 Too Many Requests``. For every URL
+    name in ``THROTTLE_RATES``, unsafe requests take a token from a bucket
+    per signed-in user and one per client IP; a ``Retry-After`` header
+    says when the next token arrives. Must come after
+    ``AuthenticationMiddleware``.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rates = {
+            url_name: {scope: parse_rate(rate) for scope, rate in scopes.items()}
+            for url_name, scopes in getattr(settings, 'THROTTLE_RATES', {}).items()
+        }
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def client_ip(self, request):
+        header = getattr(settings, 'THROTTLE_IP_HEADER', '')
+        ip = request.META.get(header) if header else None
+        return ip or request.META.get('REMOTE_ADDR', '')
+
+    def buckets(self, request, url_name):
+        rates = self.rates.get(url_name)
+        if not rates:
+            return []
+        buckets = []
+        user = getattr(request, 'user', None)
+        if 'user' in rates and user is not None and user.is_authenticated:
+            buckets.append((f'throttle:{url_name}:user:{user.pk}', rates['user']))
+        if 'ip' in rates:
+            buckets.append((f'throttle:{url_name}:ip:{self.client_ip(request)}', rates['ip']))
+        return buckets
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            not getattr(settings, 'THROTTLE_ENABLED', True)
+            or request.method in self.SAFE_METHODS
+            or request.resolver_match is None
+        ):
+            return None
+        buckets = self.buckets(request, request.resolver_match.url_name)
+        if not buckets:
+            return None
+
+        cache = caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+        try:
+            wait = take(cache, buckets)
+        except Exception:
+            # An unavailable cache must not take the site down with it
+            logger.exception('Throttle cache unavailable; request allowed')
+            return None
+        if not wait:
+            return None
+
+        retry_after = max(1, math.ceil(wait))
+        response = HttpResponse(
+            f'Too many requests. Try again in {retry_after} seconds.\n',
+            status=429,
+            content_type='text/plain',
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Answer low-priority views (``LOAD_SHED_LOW_PRIORITY``, by view name)
+    with ``503 Service Unavailable`` while this worker is overloaded, so the
+    requests users are waiting for finish well within gunicorn's timeout.
+    The worker counts as overloaded with ``LOAD_SHED_MAX_IN_FLIGHT``
+    requests in flight, a recent average latency over
+    ``LOAD_SHED_MAX_LATENCY`` seconds, or when the request waited in the
+    queue for over ``LOAD_SHED_MAX_QUEUE_TIME`` seconds. Shed requests are
+    refused before sessions or users are loaded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.monitor = LoadMonitor(decay=getattr(settings, 'LOAD_SHED_DECAY', 30.0))
+        self.low_priority = frozenset(getattr(settings, 'LOAD_SHED_LOW_PRIORITY', []))
+
+    def __call__(self, request):
+        if not getattr(settings, 'LOAD_SHED_ENABLED', True):
+            return self.get_response(request)
+
+        if self.is_low_priority(request):
+            reason = self.overload_reason(request)
+            if reason:
+                logger.warning('Shedding %s: %s', request.path, reason)
+                return self.shed_response()
+
+        self.monitor.started()
+        started = time.monotonic()
+        try:
+            return self.get_response(request)
+        finally:
+            self.monitor.finished(time.monotonic() - started)
+
+    def is_low_priority(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.view_name in self.low_priority
+
+    def overload_reason(self, request):
+        in_flight = self.monitor.in_flight
+        if in_flight >= getattr(settings, 'LOAD_SHED_MAX_IN_FLIGHT', 8):
+            return f'{in_flight} requests in flight'
+        latency = self.monitor.latency()
+        if latency > getattr(settings, 'LOAD_SHED_MAX_LATENCY', 10.0):
+            return f'average latency {latency:.2f}s'
+        header = getattr(settings, 'LOAD_SHED_QUEUE_HEADER', '')
+        queued = queue_time(request.META.get(header)) if header else None
+        if queued is not None and queued > getattr(settings, 'LOAD_SHED_MAX_QUEUE_TIME', 5.0):
+            return f'queued for {queued:.2f}s'
+        return None
+
+    def shed_response(self):
+        retry_after = getattr(settings, 'LOAD_SHED_RETRY_AFTER', 30)
+        response = HttpResponse(
+            'The server is busy. Please try again shortly.\n',
+            status=503,
+            content_type='text/plain',
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -0,0 +1,262 @@
+"""
+Database routers for expense shards and read replicas.
+
+``ShardRouter`` sends per-user expense data (``SHARDED_MODELS``) to the
+shard of the user it belongs to: taken from the model instance when there
+is one, otherwise from the user of the current request (or
+``routing_user()`` block).
+
+``ReplicaRouter`` sends other reads to replicas. Reads only go to a replica
+inside ``replica_reads()`` (read-only views, exports and analytics opt in),
+only for models of ``REPLICA_ROUTED_APPS``, and never once the current
+request has written or the user's recent write pinned them to the primary
+(read-your-writes). Replicas that lag more than ``REPLICA_MAX_LAG`` seconds,
+or cannot be reached, are skipped.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+POSTGRESQL_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class RoutingState:
+    """Per-request routing flags."""
+
+    __slots__ = ('replica_reads', 'max_lag', 'pinned', 'written', 'user', 'shards')
+
+    def __init__(self, pinned=False, user=None):
+        self.replica_reads = False
+        self.max_lag = None
+        self.pinned = pinned
+        self.written = False
+        # User ID, or a callable returning it once authentication has run
+        self.user = user
+        self.shards = {}
+
+    def user_id(self):
+        return self.user() if callable(self.user) else self.user
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def routing_context(pinned=False, user=None):
+    """Track reads and writes for one request (or job)."""
+    state = RoutingState(pinned, user)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def replica_reads(max_lag=None):
+    """
+    Allow reads in this block to be served by a replica. ``max_lag``
+    tightens ``REPLICA_MAX_LAG``, e.g. to the age of a job so the replica
+    has caught up with everything written before it was queued.
+    """
+    state = _state.get()
+    if state is None:
+        with routing_context(), replica_reads(max_lag):
+            yield
+        return
+    previous = state.replica_reads, state.max_lag
+    state.replica_reads = True
+    state.max_lag = max_lag
+    try:
+        yield
+    finally:
+        state.replica_reads, state.max_lag = previous
+
+
+@contextmanager
+def routing_user(user):
+    """Route sharded models in this block to the shard of ``user``."""
+    state = _state.get()
+    if state is None:
+        with routing_context(user=getattr(user, 'pk', user)):
+            yield
+        return
+    previous = state.user
+    state.user = getattr(user, 'pk', user)
+    try:
+        yield
+    finally:
+        state.user = previous
+
+
+def replica_lag(alias):
+    """Replication lag of ``alias`` in seconds, or ``None`` if unreachable."""
+    connection = connections[alias]
+    try:
+        if connection.vendor != 'postgresql':
+            connection.ensure_connection()
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute(POSTGRESQL_LAG_SQL)
+            return float(cursor.fetchone()[0])
+    except DatabaseError:
+        return None
+
+
+class LagMonitor:
+    """Caches replica lag checks for ``REPLICA_LAG_CHECK_INTERVAL`` seconds."""
+
+    def __init__(self):
+        self._checks = {}
+        self._lock = threading.Lock()
+
+    def lag(self, alias):
+        """
+        Lag of ``alias`` in seconds, or ``None`` if unreachable. A cached
+        measurement is aged by the time since it was taken, so the result
+        is always an upper bound.
+        """
+        now = time.monotonic()
+        interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+        with self._lock:
+            checked = self._checks.get(alias)
+        if checked is not None and now - checked[0] < interval:
+            checked_at, lag = checked
+            return None if lag is None else lag + (now - checked_at)
+        lag = replica_lag(alias)
+        with self._lock:
+            self._checks[alias] = (now, lag)
+        return lag
+
+    def healthy(self, aliases, max_lag=None):
+        """Aliases whose lag is known and at most ``max_lag`` seconds."""
+        if max_lag is None:
+            max_lag = getattr(settings, 'REPLICA_MAX_LAG', 5)
+        healthy = []
+        for alias in aliases:
+            lag = self.lag(alias)
+            if lag is not None and lag <= max_lag:
+                healthy.append(alias)
+        return healthy
+
+    def clear(self):
+        with self._lock:
+            self._checks.clear()
+
+
+lag_monitor = LagMonitor()
+
+
+class ShardRouter:
+    """Route per-user expense data to the user's shard."""
+
+    def _shard(self, model, hints):
+        if (
+            not getattr(settings, 'EXPENSE_SHARDS', None)
+            or model._meta.label_lower not in settings.SHARDED_MODELS
+        ):
+            return None
+        from expenses.sharding import shard_for_user
+
+        instance = hints.get('instance')
+        if instance is not None:
+            label = instance._meta.label_lower
+            if label in settings.SHARDED_MODELS and instance._state.db:
+                # Loaded from (or saved to) a shard already
+                return instance._state.db
+            if label == settings.AUTH_USER_MODEL.lower():
+                return shard_for_user(instance.pk)
+            user_id = getattr(instance, 'user_id', None)
+            if user_id is not None:
+                return shard_for_user(user_id)
+
+        state = _state.get()
+        user_id = state.user_id() if state is not None else None
+        if user_id is None:
+            return None
+        if user_id not in state.shards:
+            state.shards[user_id] = shard_for_user(user_id)
+        return state.shards[user_id]
+
+    def db_for_read(self, model, **hints):
+        return self._shard(model, hints)
+
+    def _user_id(self, hints):
+        instance = hints.get('instance')
+        if instance is not None:
+            if instance._meta.label_lower == settings.AUTH_USER_MODEL.lower():
+                return instance.pk
+            user_id = getattr(instance, 'user_id', None)
+            if user_id is not None:
+                return user_id
+        state = _state.get()
+        return state.user_id() if state is not None else None
+
+    def db_for_write(self, model, **hints):
+        alias = self._shard(model, hints)
+        if alias is not None:
+            from expenses.sharding import check_writable
+
+            # Nothing may be written to the old shard while move_user copies
+            check_writable(self._user_id(hints))
+        state = _state.get()
+        if alias is not None and state is not None:
+            state.written = True
+        return alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        shards = getattr(settings, 'EXPENSE_SHARDS', None)
+        if shards and {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, *shards}:
+            return True
+        return None
+
+
+class ReplicaRouter:
+    """Route opted-in reads to healthy replicas and all writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        state = _state.get()
+        if (
+            not replicas
+            or state is None
+            or not state.replica_reads
+            or state.pinned
+            or state.written
+            or model._meta.app_label not in getattr(settings, 'REPLICA_ROUTED_APPS', [])
+        ):
+            return DEFAULT_DB_ALIAS
+        max_lag = getattr(settings, 'REPLICA_MAX_LAG', 5)
+        if state.max_lag is not None:
+            max_lag = min(max_lag, state.max_lag)
+        healthy = lag_monitor.healthy(replicas, max_lag)
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.written = True
+        # Objects read from a replica must still be saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'DATABASE_REPLICAS', []):
+            return False
+        return None
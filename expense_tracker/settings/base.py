@@ -30,12 +30,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'expense_tracker.middleware.RequestLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static file serving
+    'expense_tracker.middleware.LoadSheddingMiddleware',
+    'expense_tracker.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'expense_tracker.middleware.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -97,6 +101,10 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Private directory for monthly statements (python manage.py generate_statements),
+# kept outside MEDIA_ROOT and only served to their owner by the statement view.
+STATEMENTS_ROOT = config('STATEMENTS_ROOT', default=str(BASE_DIR / 'statements'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -109,7 +117,144 @@ LOGOUT_REDIRECT_URL = 'login'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Rendering caches (enabled in production)
+# Seconds to keep rendered expense rows cached; 0 disables row caching.
+TEMPLATE_FRAGMENT_CACHE_TIMEOUT = 0
+# Reuse crispy output for unbound forms per form class.
+CRISPY_RENDER_CACHE = False
+
+# Admin changelist scaling
+# Upper bound for changelist row counts; larger tables show an estimate.
+ADMIN_COUNT_CAP = config('ADMIN_COUNT_CAP', default=10000, cast=int)
+# Seconds to cache the month choices shown in the expense admin.
+ADMIN_DATE_HIERARCHY_CACHE_TIMEOUT = 3600
+# Seconds to cache the admin spending analytics page.
+ANALYTICS_CACHE_TIMEOUT = 300
+# Number of per-user columnar expense frames kept in memory per process.
+ANALYTICS_FRAME_CACHE_SIZE = config('ANALYTICS_FRAME_CACHE_SIZE', default=256, cast=int)
+# Reuse frames and spending statistics until the user's data version changes.
+# Versions live in the default cache, so every process must share it.
+DATA_VERSION_CACHES = True
+
+# Currencies
+# Currency for new users and expenses.
+DEFAULT_CURRENCY = config('DEFAULT_CURRENCY', default='GHS')
+# Exchange rates are stored as units of currency per one unit of this currency.
+FX_BASE_CURRENCY = config('FX_BASE_CURRENCY', default='USD')
+
+# Read replicas
+# Aliases in DATABASES that serve read-only views, exports and analytics.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = [
+    'expense_tracker.routers.ShardRouter',
+    'expense_tracker.routers.ReplicaRouter',
+]
+# Only models of these apps are ever read from a replica.
+REPLICA_ROUTED_APPS = ['expenses']
+# Replicas lagging more than this many seconds are skipped.
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=5, cast=float)
+REPLICA_LAG_CHECK_INTERVAL = 5
+# Seconds a client reads from the primary after its own write.
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+
+# Sharding
+# Aliases in DATABASES that hold per-user expense data; empty disables
+# sharding. Users are assigned round-robin by ID; users without an
+# assignment stay on the primary.
+EXPENSE_SHARDS = []
+# Models stored on the owning user's shard.
+SHARDED_MODELS = [
+    'expenses.expense',
+    'expenses.expensemonthlytotal',
+    'expenses.categorystats',
+    'expenses.recurringexpense',
+    'expenses.budget',
+]
+# Seconds each process caches a user's shard and move block from UserShard.
+SHARD_CACHE_TIMEOUT = 5
+# While rebalance_shards moves a user, their writes are refused with a 503.
+# Seconds to wait for writes already in flight before copying (on top of
+# SHARD_CACHE_TIMEOUT).
+SHARD_MOVE_GRACE = 2
+# Safety expiry of the block, should the move process die.
+SHARD_MOVE_TIMEOUT = 3600
+SHARD_MOVE_RETRY_AFTER = 10
+
+# Anomaly detection
+# Expenses this many standard deviations from the category mean are flagged.
+ANOMALY_THRESHOLD = config('ANOMALY_THRESHOLD', default=3.0, cast=float)
+# Minimum number of earlier expenses in a category before flagging.
+ANOMALY_MIN_SAMPLES = 5
+
+# Background jobs (python manage.py run_workers)
+# Private directory for job output such as CSV exports (not served publicly).
+JOB_OUTPUT_DIR = config('JOB_OUTPUT_DIR', default=str(BASE_DIR / 'exports'))
+JOB_MAX_ATTEMPTS = 3
+# Base retry delay in seconds; doubled after every failed attempt.
+JOB_RETRY_DELAY = 30
+# Running jobs locked longer than this are assumed lost and requeued.
+JOB_STALE_TIMEOUT = 600
+# Seconds between each worker's checks for stale jobs.
+JOB_REQUEUE_INTERVAL = 60
+
+# Request throttling (expense_tracker.middleware.ThrottleMiddleware)
+# Token buckets for unsafe requests per URL name, one per signed-in user
+# and one per client IP, kept in the THROTTLE_CACHE_ALIAS cache. '30/min'
+# allows a burst of 30 requests, refilled evenly over a minute.
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+THROTTLE_CACHE_ALIAS = 'default'
+THROTTLE_RATES = {
+    'add_expense': {'user': '30/min', 'ip': '120/min'},
+    'edit_expense': {'user': '60/min', 'ip': '240/min'},
+    'delete_expense': {'user': '60/min', 'ip': '240/min'},
+    'bulk_expenses': {'user': '20/min', 'ip': '60/min'},
+    'export_expenses': {'user': '5/hour', 'ip': '20/hour'},
+    'login': {'ip': '10/min'},
+    'signup': {'ip': '10/hour'},
+}
+# META key holding the client address set by a trusted proxy, e.g.
+# HTTP_X_REAL_IP behind nginx; REMOTE_ADDR is used when empty.
+THROTTLE_IP_HEADER = config('THROTTLE_IP_HEADER', default='')
+
+# Password hashing for login and signup (expenses.passwords)
+# Hashes run at once per worker process, in a thread pool; 0 hashes inline.
+AUTH_HASH_THREADS = config('AUTH_HASH_THREADS', default=2, cast=int)
+# Further hashes allowed to wait before logins and signups get 503.
+AUTH_HASH_MAX_PENDING = config('AUTH_HASH_MAX_PENDING', default=16, cast=int)
+
+# Load shedding (expense_tracker.middleware.LoadSheddingMiddleware)
+# Views answered with 503 while the worker is overloaded, by view name.
+LOAD_SHED_ENABLED = config('LOAD_SHED_ENABLED', default=True, cast=bool)
+LOAD_SHED_LOW_PRIORITY = [
+    'export_expenses',
+    'download_job',
+    'admin:expenses_expense_analytics',
+]
+# Requests in flight per worker process (only reached with GUNICORN_THREADS > 1).
+LOAD_SHED_MAX_IN_FLIGHT = config('LOAD_SHED_MAX_IN_FLIGHT', default=8, cast=int)
+# Recent average request duration in seconds; gunicorn kills workers at 30.
+LOAD_SHED_MAX_LATENCY = config('LOAD_SHED_MAX_LATENCY', default=10.0, cast=float)
+# Seconds the latency average takes to decay to 1/e while no request finishes.
+LOAD_SHED_DECAY = 30.0
+# Seconds a request may have waited for a worker, from the META key below
+# (X-Request-Start: t=<unix time>, set by nginx); empty disables the check.
+LOAD_SHED_MAX_QUEUE_TIME = config('LOAD_SHED_MAX_QUEUE_TIME', default=5.0, cast=float)
+LOAD_SHED_QUEUE_HEADER = 'HTTP_X_REQUEST_START'
+LOAD_SHED_RETRY_AFTER = 30
+
+# Readiness checks (/ready/)
+# Slower database or cache round trips mark the worker as not ready.
+HEALTH_DB_MAX_LATENCY = config('HEALTH_DB_MAX_LATENCY', default=0.5, cast=float)
+HEALTH_CACHE_MAX_LATENCY = config('HEALTH_CACHE_MAX_LATENCY', default=0.25, cast=float)
+
 # Logging configuration
+# Loggers only queue records (expense_tracker.log.BackgroundHandler); one
+# listener thread per process writes them to the handlers in 'targets', so
+# requests never wait for disk or email. The file gets JSON lines with the
+# request id, user id, view name and latency. WatchedFileHandler never
+# rotates itself, which races between gunicorn workers; rotate the file
+# externally (e.g. logrotate) and it is reopened.
+LOGGING_CONFIG = 'expense_tracker.log.configure_logging'
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -122,6 +267,9 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'expense_tracker.log.JSONFormatter',
+        },
     },
     'filters': {
         'require_debug_false': {
@@ -130,8 +278,20 @@ LOGGING = {
         'require_debug_true': {
             '()': 'django.utils.log.RequireDebugTrue',
         },
+        'request_context': {
+            '()': 'expense_tracker.log.RequestContextFilter',
+        },
+        'django_request': {
+            '()': 'logging.Filter',
+            'name': 'django.request',
+        },
     },
     'handlers': {
+        'queue': {
+            '()': 'expense_tracker.log.BackgroundHandler',
+            'targets': ['console', 'file', 'mail_admins'],
+            'filters': ['request_context'],
+        },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
@@ -139,37 +299,40 @@ LOGGING = {
         },
         'file': {
             'level': 'INFO',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'logging.handlers.WatchedFileHandler',
             'filename': BASE_DIR / 'logs' / 'django.log',
-            'maxBytes': 1024 * 1024 * 15,  # 15MB
-            'backupCount': 10,
-            'formatter': 'verbose',
+            'formatter': 'json',
         },
         'mail_admins': {
             'level': 'ERROR',
             'class': 'django.utils.log.AdminEmailHandler',
-            'filters': ['require_debug_false'],
+            'filters': ['require_debug_false', 'django_request'],
         }
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
         'django.request': {
-            'handlers': ['mail_admins', 'file'],
+            'handlers': ['queue'],
             'level': 'ERROR',
             'propagate': False,
         },
         'expenses': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'expense_tracker': {
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
     },
     'root': {
-        'handlers': ['console'],
+        'handlers': ['queue'],
         'level': 'INFO',
     },
 }
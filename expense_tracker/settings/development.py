@@ -12,13 +12,47 @@ ALLOWED_HOSTS = ['localhost', '127.0.0.1', '[::1]']
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
+# SQLITE_TUNED applies WAL journaling, relaxed fsyncs, a larger cache and
+# IMMEDIATE transactions, for single-node installs with several workers.
+SQLITE_ENGINE = (
+    'expense_tracker.db_backends.sqlite_tuned'
+    if config('SQLITE_TUNED', default=True, cast=bool)
+    else 'django.db.backends.sqlite3'
+)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': SQLITE_ENGINE,
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
 
+# Optional local replica for trying out replica routing, e.g.
+# DB_REPLICA_NAME=replica.sqlite3 (a copy of db.sqlite3)
+if config('DB_REPLICA_NAME', default=''):
+    DATABASES['replica'] = {
+        'ENGINE': SQLITE_ENGINE,
+        'NAME': BASE_DIR / config('DB_REPLICA_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+
+# Optional local expense shards, e.g. DB_SHARDS=shard1,shard2 (one SQLite
+# file each; run `migrate --database=<alias>` for every shard). Users are
+# spread over EXPENSE_SHARDS, by default the primary plus these shards.
+DB_SHARDS = config('DB_SHARDS', cast=Csv(), default='')
+for alias in DB_SHARDS:
+    DATABASES[alias] = {
+        'ENGINE': SQLITE_ENGINE,
+        'NAME': BASE_DIR / f'{alias}.sqlite3',
+    }
+EXPENSE_SHARDS = config(
+    'EXPENSE_SHARDS', cast=Csv(), default=','.join(['default', *DB_SHARDS]) if DB_SHARDS else ''
+)
+
+# Serve static files by their plain names; the hashed manifest only exists
+# after collectstatic
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
 # Email backend for development (prints to console)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
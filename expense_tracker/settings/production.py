@@ -13,22 +13,74 @@ DEBUG = False
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', cast=Csv(), default='')
 
 # Database
-# Use PostgreSQL in production
+# Use PostgreSQL in production. With DB_POOL each worker process keeps a
+# pool of at most DB_POOL_MAX_SIZE connections shared by its threads;
+# Django returns its connection to the pool after every request.
+DB_POOL = config('DB_POOL', default=True, cast=bool)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'expense_tracker.db_backends.postgresql_pool' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
-        'CONN_MAX_AGE': 600,
+        'CONN_MAX_AGE': 0 if DB_POOL else 600,
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'connect_timeout': 10,
-        }
+        },
+        'POOL': {
+            'MIN_SIZE': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=4, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10, cast=float),
+            'MAX_IDLE': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+            'CHECK_INTERVAL': config('DB_POOL_CHECK_INTERVAL', default=30, cast=float),
+        },
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1.internal,localhost:5433
+for index, replica in enumerate(config('DB_REPLICA_HOSTS', cast=Csv(), default=''), start=1):
+    alias = f'replica{index}'
+    host, _, port = replica.partition(':')
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Expense shards, e.g. DB_SHARD_HOSTS=shard1.internal,shard2.internal (same
+# database name and credentials as the primary)
+for index, shard in enumerate(config('DB_SHARD_HOSTS', cast=Csv(), default=''), start=1):
+    alias = f'shard{index}'
+    host, _, port = shard.partition(':')
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+    }
+    EXPENSE_SHARDS.append(alias)
+if EXPENSE_SHARDS:
+    EXPENSE_SHARDS.insert(0, 'default')
+
+# Templates - explicit cached loader and rendering caches
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATE_FRAGMENT_CACHE_TIMEOUT = config('TEMPLATE_FRAGMENT_CACHE_TIMEOUT', default=3600, cast=int)
+CRISPY_RENDER_CACHE = config('CRISPY_RENDER_CACHE', default=True, cast=bool)
+
 # Email configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
@@ -46,6 +98,8 @@ ADMINS = [
 
 # Security settings
 SECURE_SSL_REDIRECT = True
+# Probes reach the workers over plain HTTP
+SECURE_REDIRECT_EXEMPT = [r'^health/$', r'^ready/$']
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 SECURE_BROWSER_XSS_FILTER = True
@@ -59,6 +113,8 @@ X_FRAME_OPTIONS = 'DENY'
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 USE_X_FORWARDED_HOST = True
 USE_X_FORWARDED_PORT = True
+# nginx passes the client address in X-Real-IP (deploy/ngnix.conf)
+THROTTLE_IP_HEADER = config('THROTTLE_IP_HEADER', default='HTTP_X_REAL_IP')
 
 # Password validators - stricter for production
 AUTH_PASSWORD_VALIDATORS = [
@@ -80,6 +136,19 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Shared cache for sessions, data versions and throttle buckets. Without
+# REDIS_URL each worker process keeps its own in-memory cache.
+if config('REDIS_URL', default=''):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('REDIS_URL'),
+        }
+    }
+else:
+    # A write in one worker would never reach the others' data versions
+    DATA_VERSION_CACHES = False
+
 # Session backend using cache
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
@@ -94,7 +163,8 @@ if config('SENTRY_DSN', default=''):
         environment=config('SENTRY_ENVIRONMENT', default='production'),
     )
 
-# Production logging - less verbose
+# Production logging - less verbose, JSON lines on stdout for the log collector
+LOGGING['handlers']['console']['formatter'] = 'json'
 LOGGING['handlers']['console']['level'] = 'WARNING'
 LOGGING['loggers']['django']['level'] = 'WARNING'
 LOGGING['loggers']['expenses']['level'] = 'INFO'
@@ -0,0 +1,80 @@
+"""
+Token-bucket request throttling.
+
+Each bucket holds up to ``capacity`` tokens and refills continuously at
+``capacity / period``; a request takes one token or is refused until the
+next token arrives. A bucket is a single ``(tokens, updated_at)`` entry in
+the cache, so checking one costs a constant amount of work however busy it
+is. Full buckets are simply absent: entries expire once they would have
+refilled. Reads and writes are not atomic, so concurrent requests from the
+same client may occasionally both take the last token.
+"""
+from dataclasses import dataclass
+import math
+import re
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+
+PERIODS = {
+    's': 1, 'sec': 1, 'second': 1,
+    'm': 60, 'min': 60, 'minute': 60,
+    'h': 3600, 'hour': 3600,
+    'd': 86400, 'day': 86400,
+}
+
+RATE_PATTERN = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+)\s*$')
+
+
+@dataclass(frozen=True)
+class Rate:
+    capacity: int
+    period: float
+
+    @property
+    def refill_rate(self):
+        """Tokens added per second."""
+        return self.capacity / self.period
+
+
+def parse_rate(value):
+    """
+    Parse ``'30/min'``, ``'5/hour'`` or ``'100/10s'`` into a ``Rate``
+    allowing bursts of the count, refilled evenly over the period.
+    """
+    match = RATE_PATTERN.match(str(value).lower())
+    if not match or match.group(3) not in PERIODS or int(match.group(1)) < 1:
+        raise ImproperlyConfigured(f'Invalid throttle rate: {value!r}')
+    count, multiple, unit = match.groups()
+    return Rate(int(count), int(multiple or 1) * PERIODS[unit])
+
+
+def take(cache, buckets, now=None):
+    """
+    Take one token from every ``(key, rate)`` in ``buckets`` with one
+    ``get_many`` and one ``set_many``. Tokens are only taken if all buckets
+    have one. Returns 0 when allowed, otherwise the seconds until the
+    emptiest bucket has a token again.
+    """
+    now = time.time() if now is None else now
+    stored = cache.get_many([key for key, _ in buckets])
+
+    updates = {}
+    wait = 0.0
+    for key, rate in buckets:
+        tokens, updated_at = stored.get(key, (rate.capacity, now))
+        tokens = min(rate.capacity, tokens + max(0.0, now - updated_at) * rate.refill_rate)
+        if tokens < 1:
+            wait = max(wait, (1 - tokens) / rate.refill_rate)
+        updates[key] = (tokens - 1, rate)
+    if wait:
+        return wait
+
+    # Expire once the slowest bucket would be full again; a bucket kept
+    # longer only refills up to its capacity
+    timeout = max(
+        math.ceil((rate.capacity - tokens) / rate.refill_rate) + 1
+        for tokens, rate in updates.values()
+    )
+    cache.set_many({key: (tokens, now) for key, (tokens, _) in updates.items()}, timeout)
+    return 0
@@ -1,12 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
-from expenses.views import signup
+from expenses.views import login, signup
 from django.contrib.auth import views as auth_views
+from expense_tracker import health
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('health/', health.liveness, name='health'),
+    path('ready/', health.readiness, name='ready'),
     path('signup/', signup, name='signup'),
-    path('login/', auth_views.LoginView.as_view(), name='login'),
+    path('login/', login, name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('', include('expenses.urls')),
 ]
@@ -1,12 +1,199 @@
 """
 Admin configuration for expenses app.
 """
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.db.models import Sum, Count
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.http import QueryDict
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from .models import Expense, ExpenseCategory
+
+from expense_tracker.routers import replica_reads
+
+from .aggregates import spending_analytics
+from .models import (
+    Expense, ExpenseCategory, ExchangeRate, Job, JobStatus, currency_symbol,
+)
+from .sharding import shard_aliases, sharding_enabled
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded COUNT(*).
+    Unfiltered PostgreSQL tables use the planner's row estimate; everything
+    else is counted up to ``ADMIN_COUNT_CAP`` rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] > 0:
+                return row[0]
+
+        cap = getattr(settings, 'ADMIN_COUNT_CAP', 10000)
+        return queryset.order_by()[:cap].count()
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Filter typed into a text box. Its form carries the other changelist
+    parameters along as hidden inputs, like the admin search form.
+    """
+    template = 'admin/expenses/input_filter.html'
+    placeholder = ''
+    hidden_params = ()
+
+    def has_output(self):
+        # The text box is shown even before there is a value to list
+        return True
+
+    def choices(self, changelist):
+        self.hidden_params = [
+            (name, value)
+            for name, values in changelist.filter_params.items()
+            if name != self.parameter_name
+            for value in values
+        ]
+        return super().choices(changelist)
+
+
+class UserIdFilter(InputFilter):
+    """
+    Filter by user ID or exact username without listing every user.
+    """
+    title = 'user'
+    parameter_name = 'user'
+    placeholder = 'User ID or username'
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value:
+            return []
+        user = self._lookup_user(value)
+        return [(value, user.username if user else value)]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        if value.isdigit():
+            return queryset.filter(user_id=int(value))
+        return queryset.filter(user__username=value)
+
+    def _lookup_user(self, value):
+        users = User.objects.only('username')
+        if value.isdigit():
+            return users.filter(pk=int(value)).first()
+        return users.filter(username=value).first()
+
+
+class AmountFilter(InputFilter):
+    """
+    Filter by exact amount. ``amount`` has no index of its own, so this is
+    an explicit filter, meant to narrow a user or month, rather than part
+    of every search.
+    """
+    title = 'amount'
+    parameter_name = 'amount'
+    placeholder = 'Exact amount, e.g. 12.50'
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        return [(value, value)] if value else []
+
+    def queryset(self, request, queryset):
+        amount = self._amount()
+        if amount is None:
+            return queryset
+        return queryset.filter(amount=amount)
+
+    def _amount(self):
+        try:
+            amount = Decimal(self.value() or '')
+        except InvalidOperation:
+            return None
+        return amount if amount.is_finite() else None
+
+
+class CachedMonthFilter(admin.SimpleListFilter):
+    """
+    Month filter whose choices are cached instead of re-querying the
+    distinct dates on every changelist load like ``date_hierarchy``.
+    """
+    title = 'month'
+    parameter_name = 'month'
+    cache_key = 'expenses:admin:months'
+
+    def lookups(self, request, model_admin):
+        shard = model_admin.get_shard(request)
+        cache_key = f'{self.cache_key}:{shard}'
+        months = cache.get(cache_key)
+        if months is None:
+            months = [
+                month.strftime('%Y-%m')
+                for month in Expense.objects.using(shard).dates('date', 'month', order='DESC')
+            ]
+            cache.set(
+                cache_key,
+                months,
+                getattr(settings, 'ADMIN_DATE_HIERARCHY_CACHE_TIMEOUT', 3600)
+            )
+        return [(month, month) for month in months]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        try:
+            year, month = (int(part) for part in value.split('-'))
+        except ValueError:
+            return queryset
+        return queryset.filter(date__year=year, date__month=month)
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """
+    Pick the expense shard to browse. The admin's queryset already reads
+    from the selected shard, so this filter only renders the choices.
+    """
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in shard_aliases()]
+
+    def choices(self, changelist):
+        current = self.value() or shard_aliases()[0]
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': alias == current,
+                'query_string': changelist.get_query_string(
+                    {self.parameter_name: alias}, ['p']
+                ),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset
 
 
 class ExpenseAdmin(admin.ModelAdmin):
@@ -16,29 +203,34 @@ class ExpenseAdmin(admin.ModelAdmin):
         'id', 'user', 'formatted_amount', 'category_badge', 
         'date', 'created_at'
     ]
-    list_filter = ['category', 'date', 'created_at', 'user']
-    search_fields = ['user__username', 'description', 'amount']
-    readonly_fields = ['created_at', 'updated_at']
-    date_hierarchy = 'date'
+    list_filter = [
+        'category', 'is_anomaly', CachedMonthFilter, 'date', 'created_at', UserIdFilter,
+        AmountFilter,
+    ]
+    search_fields = ['=user__username']
+    search_help_text = 'Exact username or expense ID. Use the amount filter for amounts.'
+    readonly_fields = ['is_anomaly', 'anomaly_score', 'created_at', 'updated_at']
     ordering = ['-date', '-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Expense Information', {
-            'fields': ('user', 'amount', 'category', 'date')
+            'fields': ('user', 'amount', 'currency', 'category', 'date')
         }),
         ('Description', {
             'fields': ('description',),
             'classes': ('collapse',)
         }),
         ('Metadata', {
-            'fields': ('created_at', 'updated_at'),
+            'fields': ('is_anomaly', 'anomaly_score', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
     def formatted_amount(self, obj):
         """Display amount with currency symbol."""
-        return format_html('<strong>${}</strong>', obj.amount)
+        return format_html('<strong>{}{}</strong>', currency_symbol(obj.currency), obj.amount)
     formatted_amount.short_description = 'Amount'
     formatted_amount.admin_order_field = 'amount'
 
@@ -63,10 +255,73 @@ class ExpenseAdmin(admin.ModelAdmin):
     category_badge.short_description = 'Category'
     category_badge.admin_order_field = 'category'
 
+    def get_shard(self, request):
+        """
+        Shard selected with the ``shard`` filter, also when opening an
+        expense from a filtered changelist. Defaults to the first shard.
+        """
+        shard = request.GET.get('shard')
+        if shard is None:
+            shard = QueryDict(request.GET.get('_changelist_filters', '')).get('shard')
+        aliases = shard_aliases()
+        return shard if shard in aliases else aliases[0]
+
+    def get_list_filter(self, request):
+        if sharding_enabled():
+            return [ShardFilter, *self.list_filter]
+        return self.list_filter
+
     def get_queryset(self, request):
         """Optimize queryset with select_related."""
-        qs = super().get_queryset(request)
+        qs = super().get_queryset(request).using(self.get_shard(request))
         return qs.select_related('user')
+
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path(
+                'analytics/',
+                self.admin_site.admin_view(self.analytics_view),
+                name='expenses_expense_analytics',
+            ),
+        ]
+        return custom_urls + urls
+
+    def analytics_view(self, request):
+        """Read-only spending analytics built from the monthly totals."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        month = timezone.localdate().replace(day=1)
+        try:
+            month = date.fromisoformat(request.GET.get('month', '') + '-01')
+        except ValueError:
+            pass
+
+        with replica_reads():
+            context = {
+                **self.admin_site.each_context(request),
+                **spending_analytics(month),
+                'opts': self.model._meta,
+                'title': 'Spending analytics',
+                'month': month,
+            }
+            return TemplateResponse(
+                request, 'admin/expenses/expense/analytics.html', context
+            ).render()
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search numeric terms against the primary key and anything else
+        against the exact username, both indexed. Amounts are matched by
+        ``AmountFilter`` instead.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(pk=int(search_term)), False
+        return queryset.filter(user__username=search_term), False
     
     def has_add_permission(self, request):
             return False
@@ -103,6 +358,36 @@ class ReadOnlyUserAdmin(BaseUserAdmin):
         return [field.name for field in User._meta.fields]
 
 
+class ExchangeRateAdmin(admin.ModelAdmin):
+    """Admin for loaded exchange rates."""
+
+    list_display = ['currency', 'date', 'rate']
+    list_filter = ['currency']
+    date_hierarchy = 'date'
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Admin for the background job queue."""
+
+    list_display = ['id', 'kind', 'status', 'attempts', 'user', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    readonly_fields = [
+        'attempts', 'locked_by', 'locked_at', 'result', 'error', 'created_at', 'finished_at'
+    ]
+    actions = ['retry_jobs']
+    show_full_result_count = False
+
+    @admin.action(description='Retry selected jobs')
+    def retry_jobs(self, request, queryset):
+        count = queryset.exclude(status=JobStatus.RUNNING).update(
+            status=JobStatus.QUEUED, attempts=0, run_after=timezone.now(),
+            locked_by='', locked_at=None, finished_at=None, error=''
+        )
+        self.message_user(request, f'{count} jobs queued for retry.')
+
+
 # Customize admin site
 admin.site.site_header = "Expense Tracker Administration"
 admin.site.site_title = "Expense Tracker Admin"
@@ -112,3 +397,5 @@ admin.site.index_title = "Welcome to Expense Tracker Admin"
 admin.site.unregister(User)
 admin.site.register(User, ReadOnlyUserAdmin)
 admin.site.register(Expense, ExpenseAdmin)
+admin.site.register(ExchangeRate, ExchangeRateAdmin)
+admin.site.register(Job, JobAdmin)
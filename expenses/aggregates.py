@@ -0,0 +1,233 @@
+"""
+Incrementally maintained expense aggregates.
+
+Every expense write adjusts the matching ``ExpenseMonthlyTotal`` row with a
+single atomic ``UPDATE ... SET total = total + delta``. Bulk operations that
+bypass model signals call ``rebuild_monthly_totals`` for the affected users.
+"""
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .currency import converted
+from .models import Expense, ExpenseCategory, ExpenseMonthlyTotal
+from .sharding import scatter
+from .versioning import get_fx_version
+
+ExpenseState = namedtuple(
+    'ExpenseState', ['user_id', 'month', 'category', 'currency', 'amount']
+)
+
+TRACKED_FIELDS = ('user_id', 'date', 'category', 'currency', 'amount')
+
+
+def as_date(value):
+    """Normalize a date, datetime or ISO string to a ``date``."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            return timezone.localdate(value)
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def month_start(value):
+    """First day of the month containing ``value``."""
+    return as_date(value).replace(day=1)
+
+
+def expense_state(values):
+    """
+    Build an ``ExpenseState`` from an expense or a mapping of loaded field
+    values. Returns ``None`` when a tracked field is missing.
+    """
+    if isinstance(values, Expense):
+        values = {name: getattr(values, name) for name in TRACKED_FIELDS}
+    if any(values.get(name) is None for name in TRACKED_FIELDS):
+        return None
+    return ExpenseState(
+        values['user_id'],
+        month_start(values['date']),
+        values['category'],
+        values['currency'],
+        Decimal(str(values['amount'])),
+    )
+
+
+def adjust_monthly_total(user_id, month, category, currency, amount, count,
+                         using=DEFAULT_DB_ALIAS):
+    """Atomically add ``amount``/``count`` to one monthly total row."""
+    totals = ExpenseMonthlyTotal.objects.using(using).filter(
+        user_id=user_id, month=month, category=category, currency=currency
+    )
+    changes = {'total': F('total') + amount, 'count': F('count') + count}
+    if totals.update(**changes):
+        return
+    try:
+        with transaction.atomic(using=using):
+            ExpenseMonthlyTotal.objects.using(using).create(
+                user_id=user_id, month=month, category=category,
+                currency=currency, total=amount, count=count
+            )
+    except IntegrityError:
+        # Another writer created the row first
+        totals.update(**changes)
+
+
+def record_expense_change(old, new, using=DEFAULT_DB_ALIAS):
+    """Apply the difference between two ``ExpenseState`` values."""
+    if old == new:
+        return
+    if old is not None:
+        adjust_monthly_total(
+            old.user_id, old.month, old.category, old.currency, -old.amount, -1, using
+        )
+    if new is not None:
+        adjust_monthly_total(
+            new.user_id, new.month, new.category, new.currency, new.amount, 1, using
+        )
+
+
+def monthly_totals_from_expenses(expenses):
+    """Aggregate an expense queryset into monthly total rows."""
+    return (
+        expenses
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category', 'currency')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+
+
+def rebuild_monthly_totals(user_ids=None, using=DEFAULT_DB_ALIAS, batch_size=1000):
+    """
+    Recompute monthly totals from the expense table with one GROUP BY
+    query. Limit the rebuild to ``user_ids`` when given.
+    """
+    expenses = Expense.objects.using(using)
+    totals = ExpenseMonthlyTotal.objects.using(using)
+    if user_ids is not None:
+        expenses = expenses.filter(user_id__in=user_ids)
+        totals = totals.filter(user_id__in=user_ids)
+
+    rows = [
+        ExpenseMonthlyTotal(
+            user_id=row['user_id'],
+            month=as_date(row['month']),
+            category=row['category'],
+            currency=row['currency'],
+            total=row['total'],
+            count=row['count'],
+        )
+        for row in monthly_totals_from_expenses(expenses)
+    ]
+    with transaction.atomic(using=using):
+        totals.delete()
+        ExpenseMonthlyTotal.objects.using(using).bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def _shard_analytics(alias, month, first_month, leaderboard_size, total):
+    """Leaderboard, category and monthly rows of one shard."""
+    totals = ExpenseMonthlyTotal.objects.using(alias).filter(count__gt=0)
+    current = totals.filter(month=month)
+    leaderboard = list(
+        current.values('user_id', 'user__username')
+        .annotate(total=total, count=Sum('count'))
+        .order_by('-total')[:leaderboard_size]
+    )
+    categories = list(
+        current.values('category')
+        .annotate(total=total, count=Sum('count'), users=Count('user_id', distinct=True))
+    )
+    growth = list(
+        totals.filter(month__gte=first_month, month__lte=month)
+        .values('month')
+        .annotate(total=total, count=Sum('count'), users=Count('user_id', distinct=True))
+    )
+    return leaderboard, categories, growth
+
+
+def _merge_rows(rows, key):
+    """Sum per-shard rows sharing ``key``; each user lives on one shard."""
+    merged = {}
+    for row in rows:
+        target = merged.setdefault(
+            row[key], {key: row[key], 'total': Decimal('0'), 'count': 0, 'users': 0}
+        )
+        target['total'] += row['total'] or Decimal('0')
+        target['count'] += row['count']
+        target['users'] += row['users']
+    return list(merged.values())
+
+
+def spending_analytics(month, history=12, leaderboard_size=20):
+    """
+    Admin analytics for ``month`` computed from the monthly totals table:
+    top spenders, category mix and month-over-month growth, converted into
+    ``DEFAULT_CURRENCY``. Every shard is queried and the results merged.
+    Results are cached for ``ANALYTICS_CACHE_TIMEOUT`` seconds.
+    """
+    month = month_start(month)
+    cache_key = (
+        f'expenses:analytics:{month:%Y-%m}:{history}:{leaderboard_size}:{get_fx_version()}'
+    )
+    data = cache.get(cache_key)
+    if data is not None:
+        return data
+
+    currency = settings.DEFAULT_CURRENCY
+    total = Sum(converted(currency, field='total'))
+    first_month = month
+    for _ in range(history - 1):
+        first_month = month_start(first_month - timedelta(days=1))
+
+    results = scatter(
+        lambda alias: _shard_analytics(alias, month, first_month, leaderboard_size, total)
+    )
+
+    leaderboard = sorted(
+        (row for rows, _, _ in results for row in rows),
+        key=lambda row: row['total'] or Decimal('0'),
+        reverse=True,
+    )[:leaderboard_size]
+
+    categories = sorted(
+        _merge_rows((row for _, rows, _ in results for row in rows), 'category'),
+        key=lambda row: row['total'],
+        reverse=True,
+    )
+    month_total = sum((row['total'] for row in categories), Decimal('0'))
+    labels = dict(ExpenseCategory.choices)
+    for row in categories:
+        row['label'] = labels.get(row['category'], row['category'])
+        row['share'] = (row['total'] / month_total * 100) if month_total else Decimal('0')
+
+    growth = sorted(
+        _merge_rows((row for _, _, rows in results for row in rows), 'month'),
+        key=lambda row: row['month'],
+    )
+    previous = None
+    for row in growth:
+        row['change'] = (
+            (row['total'] - previous) / previous * 100 if previous else None
+        )
+        previous = row['total']
+
+    data = {
+        'currency': currency,
+        'leaderboard': leaderboard,
+        'categories': categories,
+        'month_total': month_total,
+        'growth': growth,
+    }
+    cache.set(cache_key, data, getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 300))
+    return data
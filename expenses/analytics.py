@@ -0,0 +1,221 @@
+"""
+In-memory columnar analytics over a single user's expenses.
+
+A user's expenses are loaded once into compact NumPy arrays (date ordinals,
+amounts in integer cents of the user's home currency and category codes)
+and every filter/group-by
+question is answered with vectorized operations. Loaded frames are kept in
+a per-process LRU cache and invalidated through the user's data version.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+
+from .currency import CURRENCY_CODES, factor_array, home_currency
+from .models import Expense, ExpenseCategory
+from .versioning import get_data_version, versions_shared
+
+CATEGORIES = list(ExpenseCategory.values)
+CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Upper bounds (in cents) of the default amount buckets
+AMOUNT_BUCKETS = (1000, 5000, 10000, 50000)
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+class ExpenseFrame:
+    """
+    Columnar snapshot of one user's expenses.
+    """
+
+    __slots__ = ('user_id', 'version', 'currency', 'ordinals', 'cents', 'categories')
+
+    def __init__(self, user_id, version, ordinals, cents, categories, currency=None):
+        self.user_id = user_id
+        self.version = version
+        self.currency = currency
+        self.ordinals = ordinals
+        self.cents = cents
+        self.categories = categories
+
+    @classmethod
+    def load(cls, user_id, version=None):
+        """
+        Load ``user_id``'s expenses with a single query, converted into the
+        user's home currency. Expenses in currencies without an exchange
+        rate are left out.
+        """
+        rows = list(
+            Expense.objects.filter(user_id=user_id)
+            .order_by()
+            .values_list('date', 'amount', 'category', 'currency')
+        )
+        count = len(rows)
+        ordinals = np.fromiter((row[0].toordinal() for row in rows), np.int32, count)
+        cents = np.fromiter((int(row[1] * 100) for row in rows), np.int64, count)
+        categories = np.fromiter(
+            (CATEGORY_CODES.get(row[2], -1) for row in rows), np.int8, count
+        )
+        currencies = np.fromiter(
+            (CURRENCY_CODES.get(row[3], -1) for row in rows), np.int8, count
+        )
+
+        currency = home_currency(user_id)
+        # Trailing nan catches unknown currency codes (-1)
+        factors = np.append(factor_array(currency), np.nan)
+        amounts = cents * factors[currencies]
+        known = ~np.isnan(amounts)
+        if not known.all():
+            ordinals, categories, amounts = ordinals[known], categories[known], amounts[known]
+        cents = np.rint(amounts).astype(np.int64)
+        return cls(user_id, version, ordinals, cents, categories, currency)
+
+    def __len__(self):
+        return len(self.cents)
+
+    @property
+    def nbytes(self):
+        return self.ordinals.nbytes + self.cents.nbytes + self.categories.nbytes
+
+    def mask(self, date_from=None, date_to=None, categories=None,
+             min_amount=None, max_amount=None):
+        """Boolean row mask for the given filters (amounts in currency units)."""
+        mask = np.ones(len(self), dtype=bool)
+        if date_from is not None:
+            mask &= self.ordinals >= date_from.toordinal()
+        if date_to is not None:
+            mask &= self.ordinals <= date_to.toordinal()
+        if categories:
+            codes = [CATEGORY_CODES[category] for category in categories]
+            mask &= np.isin(self.categories, codes)
+        if min_amount is not None:
+            mask &= self.cents >= to_cents(min_amount)
+        if max_amount is not None:
+            mask &= self.cents <= to_cents(max_amount)
+        return mask
+
+    def keys(self, group_by, buckets=AMOUNT_BUCKETS):
+        """Integer group key per row for ``group_by``."""
+        if group_by == 'day':
+            return self.ordinals.astype(np.int64)
+        if group_by == 'week':
+            # date.fromordinal(1) is a Monday
+            return (self.ordinals - (self.ordinals - 1) % 7).astype(np.int64)
+        if group_by == 'weekday':
+            return ((self.ordinals - 1) % 7).astype(np.int64)
+        if group_by == 'month':
+            days = (self.ordinals - EPOCH_ORDINAL).astype('datetime64[D]')
+            return days.astype('datetime64[M]').astype(np.int64)
+        if group_by == 'category':
+            return self.categories.astype(np.int64)
+        if group_by == 'amount_bucket':
+            return np.searchsorted(np.asarray(buckets), self.cents, side='left')
+        raise ValueError(f'Unknown group_by: {group_by}')
+
+    def group(self, group_by, mask=None, buckets=AMOUNT_BUCKETS):
+        """
+        Sum and count rows per group. Returns ``(keys, totals_in_cents,
+        counts)`` arrays sorted by key.
+        """
+        keys = self.keys(group_by, buckets)
+        cents = self.cents
+        if mask is not None:
+            keys = keys[mask]
+            cents = cents[mask]
+        unique, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=cents, minlength=len(unique))
+        counts = np.bincount(inverse, minlength=len(unique))
+        return unique, np.rint(totals).astype(np.int64), counts
+
+    def summarize(self, group_by, buckets=AMOUNT_BUCKETS, **filters):
+        """Filter and group, returning ``[{'key', 'total', 'count'}]`` rows."""
+        mask = self.mask(**filters) if filters else None
+        keys, totals, counts = self.group(group_by, mask, buckets)
+        return [
+            {
+                'key': group_label(group_by, int(key), buckets),
+                'total': from_cents(total),
+                'count': int(count),
+            }
+            for key, total, count in zip(keys, totals, counts)
+        ]
+
+
+def to_cents(amount):
+    return int(Decimal(str(amount)) * 100)
+
+
+def from_cents(cents):
+    return Decimal(int(cents)) / 100
+
+
+def group_label(group_by, key, buckets=AMOUNT_BUCKETS):
+    """Human friendly label for an integer group key."""
+    if group_by in ('day', 'week'):
+        return date.fromordinal(key)
+    if group_by == 'weekday':
+        return WEEKDAYS[key]
+    if group_by == 'month':
+        year, month = divmod(key, 12)
+        return date(1970 + year, month + 1, 1)
+    if group_by == 'category':
+        return CATEGORIES[key] if 0 <= key < len(CATEGORIES) else None
+    if group_by == 'amount_bucket':
+        lower = from_cents(buckets[key - 1]) if key > 0 else Decimal('0')
+        upper = from_cents(buckets[key]) if key < len(buckets) else None
+        return (lower, upper)
+    return key
+
+
+class FrameCache:
+    """Thread-safe LRU cache of ``ExpenseFrame`` objects keyed by user."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Return an up-to-date frame for ``user_id``, loading it if needed."""
+        if not versions_shared():
+            return ExpenseFrame.load(user_id)
+        version = get_data_version(user_id)
+        with self._lock:
+            frame = self._frames.get(user_id)
+            if frame is not None and frame.version == version:
+                self._frames.move_to_end(user_id)
+                return frame
+
+        frame = ExpenseFrame.load(user_id, version)
+        with self._lock:
+            self._frames[user_id] = frame
+            self._frames.move_to_end(user_id)
+            while len(self._frames) > self.maxsize:
+                self._frames.popitem(last=False)
+        return frame
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._frames.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+    def __len__(self):
+        return len(self._frames)
+
+
+frame_cache = FrameCache(getattr(settings, 'ANALYTICS_FRAME_CACHE_SIZE', 256))
+
+
+def get_frame(user_id):
+    """Cached columnar frame for ``user_id``."""
+    return frame_cache.get(user_id)
@@ -0,0 +1,201 @@
+"""
+Streaming anomaly detection for expense amounts.
+
+Each ``CategoryStats`` row keeps the running count, mean and sum of squared
+deviations (Welford) of one user's amounts in one category and currency.
+Writes update the row incrementally, so scoring a new expense needs a single
+primary-key lookup instead of a scan of the user's history.
+"""
+import math
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Avg, Count, StdDev
+from django.utils import timezone
+
+from .models import CategoryStats, Expense
+
+# Lower bound for the standard deviation, relative to the mean, so that a
+# history of identical amounts does not give infinite scores.
+MIN_RELATIVE_STDDEV = 0.05
+
+RESCORE_FIELDS = ['is_anomaly', 'anomaly_score', 'updated_at']
+
+
+def welford_add(count, mean, m2, value):
+    """Add ``value`` to running statistics."""
+    count += 1
+    delta = value - mean
+    mean += delta / count
+    m2 += delta * (value - mean)
+    return count, mean, m2
+
+
+def welford_remove(count, mean, m2, value):
+    """Remove a previously added ``value`` from running statistics."""
+    if count <= 1:
+        return 0, 0.0, 0.0
+    new_mean = (count * mean - value) / (count - 1)
+    m2 -= (value - mean) * (value - new_mean)
+    return count - 1, new_mean, max(m2, 0.0)
+
+
+def anomaly_score(count, mean, m2, value):
+    """
+    Standard deviations between ``value`` and the mean, or ``None`` while
+    there are too few samples to judge.
+    """
+    if count < getattr(settings, 'ANOMALY_MIN_SAMPLES', 5):
+        return None
+    stddev = math.sqrt(m2 / (count - 1))
+    stddev = max(stddev, abs(mean) * MIN_RELATIVE_STDDEV, 0.01)
+    return (value - mean) / stddev
+
+
+def is_anomalous(score):
+    threshold = getattr(settings, 'ANOMALY_THRESHOLD', 3.0)
+    return score is not None and abs(score) >= threshold
+
+
+def _stats_values(user_id, category, currency, using):
+    row = (
+        CategoryStats.objects.using(using)
+        .filter(user_id=user_id, category=category, currency=currency)
+        .values_list('count', 'mean', 'm2')
+        .first()
+    )
+    return row or (0, 0.0, 0.0)
+
+
+def score_expense(instance, old, using=DEFAULT_DB_ALIAS):
+    """
+    Set ``is_anomaly``/``anomaly_score`` on ``instance`` against the stats
+    of its category, excluding the stored version ``old`` of the expense.
+    """
+    key = (instance.user_id, instance.category, instance.currency)
+    count, mean, m2 = _stats_values(*key, using)
+    if old is not None and (old.user_id, old.category, old.currency) == key:
+        count, mean, m2 = welford_remove(count, mean, m2, float(old.amount))
+    score = anomaly_score(count, mean, m2, float(instance.amount))
+    instance.anomaly_score = None if score is None else round(score, 4)
+    instance.is_anomaly = is_anomalous(score)
+
+
+def _apply(state, update, using):
+    """Apply ``update`` to one stats row while holding its row lock."""
+    lookup = {
+        'user_id': state.user_id, 'category': state.category, 'currency': state.currency,
+    }
+    with transaction.atomic(using=using):
+        stats = (
+            CategoryStats.objects.using(using)
+            .select_for_update()
+            .filter(**lookup)
+            .first()
+        )
+        if stats is None:
+            try:
+                with transaction.atomic(using=using):
+                    stats = CategoryStats.objects.using(using).create(**lookup)
+            except IntegrityError:
+                # Another writer created the row first
+                stats = (
+                    CategoryStats.objects.using(using)
+                    .select_for_update()
+                    .get(**lookup)
+                )
+        stats.count, stats.mean, stats.m2 = update(
+            stats.count, stats.mean, stats.m2, float(state.amount)
+        )
+        stats.save(using=using, update_fields=['count', 'mean', 'm2'])
+
+
+def record_stats_change(old, new, using=DEFAULT_DB_ALIAS):
+    """Apply the difference between two ``ExpenseState`` values."""
+    if old == new:
+        return
+    if old is not None:
+        _apply(old, welford_remove, using)
+    if new is not None:
+        _apply(new, welford_add, using)
+
+
+def rebuild_category_stats(user_ids=None, using=DEFAULT_DB_ALIAS, batch_size=1000):
+    """
+    Recompute category statistics from the expense table in one GROUP BY
+    pass. Limit the rebuild to ``user_ids`` when given.
+    """
+    expenses = Expense.objects.using(using)
+    stats = CategoryStats.objects.using(using)
+    if user_ids is not None:
+        expenses = expenses.filter(user_id__in=user_ids)
+        stats = stats.filter(user_id__in=user_ids)
+
+    # Averages over the amount come back in minor units
+    scale = Expense._meta.get_field('amount').scale
+    rows = []
+    groups = (
+        expenses.values('user_id', 'category', 'currency')
+        .annotate(count=Count('id'), mean=Avg('amount'), stddev=StdDev('amount'))
+        .order_by()
+    )
+    for row in groups:
+        stddev = float(row['stddev'] or 0) / scale
+        rows.append(CategoryStats(
+            user_id=row['user_id'],
+            category=row['category'],
+            currency=row['currency'],
+            count=row['count'],
+            mean=float(row['mean']) / scale,
+            m2=stddev * stddev * row['count'],
+        ))
+    with transaction.atomic(using=using):
+        stats.delete()
+        CategoryStats.objects.using(using).bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def rescore_expenses(user_ids=None, using=DEFAULT_DB_ALIAS, batch_size=1000, categories=None):
+    """
+    Re-score existing expenses against the current statistics, leaving each
+    expense out of its own category's stats. Limit the rescore to
+    ``user_ids`` and ``categories`` when given. Only rows whose flag or
+    score changes are written, with ``updated_at`` bumped so cached rows
+    are re-rendered. Returns the number flagged.
+    """
+    stats = CategoryStats.objects.using(using)
+    expenses = Expense.objects.using(using).order_by('pk')
+    if user_ids is not None:
+        stats = stats.filter(user_id__in=user_ids)
+        expenses = expenses.filter(user_id__in=user_ids)
+    if categories is not None:
+        stats = stats.filter(category__in=categories)
+        expenses = expenses.filter(category__in=categories)
+    lookup = {
+        (row.user_id, row.category, row.currency): (row.count, row.mean, row.m2)
+        for row in stats
+    }
+
+    flagged = 0
+    batch = []
+    now = timezone.now()
+    fields = ('pk', 'user_id', 'category', 'currency', 'amount', 'is_anomaly', 'anomaly_score')
+    for expense in expenses.only(*fields).iterator(chunk_size=batch_size):
+        key = (expense.user_id, expense.category, expense.currency)
+        count, mean, m2 = lookup.get(key, (0, 0.0, 0.0))
+        amount = float(expense.amount)
+        score = anomaly_score(*welford_remove(count, mean, m2, amount), amount)
+        score = None if score is None else round(score, 4)
+        anomalous = is_anomalous(score)
+        flagged += anomalous
+        if (expense.is_anomaly, expense.anomaly_score) == (anomalous, score):
+            continue
+        expense.is_anomaly, expense.anomaly_score = anomalous, score
+        expense.updated_at = now
+        batch.append(expense)
+        if len(batch) >= batch_size:
+            Expense.objects.using(using).bulk_update(batch, RESCORE_FIELDS)
+            batch = []
+    if batch:
+        Expense.objects.using(using).bulk_update(batch, RESCORE_FIELDS)
+    return flagged
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ExpensesConfig(AppConfig):
     name = 'expenses'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
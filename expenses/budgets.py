@@ -0,0 +1,63 @@
+"""
+Monthly budget evaluation.
+
+Budgets are compared against the running ``ExpenseMonthlyTotal`` counters,
+which are updated atomically on every expense write, so checking a budget
+never re-sums the month's expenses. Counters in other currencies are
+converted into the user's home currency inside the same query.
+"""
+from decimal import Decimal
+
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .aggregates import month_start
+from .currency import converted, home_currency
+from .models import Budget, ExpenseMonthlyTotal
+
+
+def budget_status(user, month=None, category=None):
+    """
+    Budgets for ``user`` annotated with the month's spend, fetched in a
+    single query. Each budget gets ``spent``, ``remaining``, ``percent``,
+    ``is_over`` and ``currency`` (the user's home currency) attributes.
+    """
+    month = month_start(month or timezone.localdate())
+    currency = home_currency(user)
+    spent = (
+        ExpenseMonthlyTotal.objects.filter(
+            user=OuterRef('user'),
+            month=month,
+            category=OuterRef('category'),
+        )
+        .order_by()
+        .values('category')
+        .annotate(spent=Sum(converted(currency, field='total')))
+        .values('spent')[:1]
+    )
+
+    budgets = Budget.objects.filter(user=user).annotate(
+        spent=Coalesce(
+            Subquery(spent),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )
+    )
+    if category is not None:
+        budgets = budgets.filter(category=category)
+
+    budgets = list(budgets)
+    for budget in budgets:
+        budget.spent = budget.spent.quantize(Decimal('0.01'))
+        budget.remaining = budget.amount - budget.spent
+        budget.percent = min(int(budget.spent / budget.amount * 100), 100)
+        budget.is_over = budget.spent > budget.amount
+        budget.currency = currency
+    return budgets
+
+
+def check_budget(expense):
+    """Budget status for the month and category of ``expense``, if any."""
+    statuses = budget_status(expense.user, expense.date, expense.category)
+    return statuses[0] if statuses else None
@@ -0,0 +1,112 @@
+"""
+Currency conversion backed by the local exchange rate table.
+
+Amounts are converted at the latest loaded rate of each currency. The rates
+are fetched once (and cached per FX version), then applied either in SQL
+as a single ``CASE currency WHEN ... THEN amount * factor`` expression or to
+NumPy arrays as one vectorized multiply, never row by row in Python.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, DecimalField, OuterRef, Subquery, Value, When
+
+from .fields import MajorUnits
+from .models import Currency, ExchangeRate, UserProfile, currency_symbol
+from .versioning import get_fx_version
+
+CURRENCIES = list(Currency.values)
+CURRENCY_CODES = {currency: code for code, currency in enumerate(CURRENCIES)}
+
+FACTOR_PLACES = Decimal('0.0000000001')
+
+
+def format_money(amount, currency):
+    """Format ``amount`` with the symbol of ``currency``."""
+    amount = Decimal(str(amount or 0)).quantize(Decimal('0.01'))
+    return f'{currency_symbol(currency)}{amount}'
+
+
+def home_currency_key(user_id):
+    return f'expenses:home_currency:{user_id}'
+
+
+def home_currency(user):
+    """The currency ``user`` wants totals shown in (cached)."""
+    user_id = getattr(user, 'pk', user)
+    key = home_currency_key(user_id)
+    currency = cache.get(key)
+    if currency is None:
+        currency = (
+            UserProfile.objects.filter(user_id=user_id)
+            .values_list('home_currency', flat=True)
+            .first()
+        ) or settings.DEFAULT_CURRENCY
+        cache.set(key, currency, None)
+    return currency
+
+
+def latest_rates():
+    """
+    Latest rate per currency against ``FX_BASE_CURRENCY``, fetched with one
+    query and cached until new rates are loaded.
+    """
+    cache_key = f'expenses:fx_rates:{get_fx_version()}'
+    rates = cache.get(cache_key)
+    if rates is None:
+        latest = ExchangeRate.objects.filter(
+            currency=OuterRef('currency')
+        ).order_by('-date').values('date')[:1]
+        rates = dict(
+            ExchangeRate.objects.filter(date=Subquery(latest))
+            .values_list('currency', 'rate')
+        )
+        rates[settings.FX_BASE_CURRENCY] = Decimal('1')
+        cache.set(cache_key, rates, None)
+    return rates
+
+
+def conversion_factors(to_currency):
+    """
+    Multipliers converting each currency with a known rate into
+    ``to_currency``. Empty (apart from ``to_currency`` itself) when
+    ``to_currency`` has no rate.
+    """
+    rates = latest_rates()
+    if to_currency not in rates:
+        return {to_currency: Decimal('1')}
+    target = rates[to_currency]
+    factors = {
+        currency: (target / rate).quantize(FACTOR_PLACES)
+        for currency, rate in rates.items()
+    }
+    factors[to_currency] = Decimal('1')
+    return factors
+
+
+def converted(to_currency, field='amount', currency_field='currency', max_digits=20):
+    """
+    SQL expression for ``field`` converted into ``to_currency``. Rows in a
+    currency without a rate convert to NULL and so drop out of sums.
+    """
+    output_field = DecimalField(max_digits=max_digits, decimal_places=2)
+    whens = [
+        When(**{currency_field: currency}, then=MajorUnits(field))
+        if factor == 1 else
+        When(**{currency_field: currency}, then=MajorUnits(field) * Value(factor))
+        for currency, factor in conversion_factors(to_currency).items()
+    ]
+    return Case(*whens, default=Value(None), output_field=output_field)
+
+
+def factor_array(to_currency):
+    """
+    Conversion factors indexed by ``CURRENCY_CODES`` for vectorized use;
+    currencies without a rate are ``nan``.
+    """
+    factors = conversion_factors(to_currency)
+    return np.array(
+        [float(factors.get(currency, 'nan')) for currency in CURRENCIES], dtype=np.float64
+    )
@@ -0,0 +1,61 @@
+"""
+Keyset pagination for the expense list.
+
+Batches are ordered by ``(-date, -created_at, -id)``, the tail of the list
+indexes, and continue from an opaque cursor naming the last row shown. Each
+batch is one indexed range query however deep the user has scrolled; no
+OFFSET and no COUNT.
+"""
+import base64
+import binascii
+from datetime import date, datetime
+
+from django.db.models import Q
+
+ORDERING = ('-date', '-created_at', '-id')
+
+
+def encode_cursor(expense):
+    """Opaque cursor pointing just after ``expense``."""
+    raw = f'{expense.date.isoformat()}|{expense.created_at.isoformat()}|{expense.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    """
+    ``(date, created_at, id)`` from a cursor. Raises ``ValueError`` for
+    anything ``encode_cursor`` did not produce.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)).decode()
+        day, created_at, pk = raw.split('|')
+        return date.fromisoformat(day), datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError(f'Invalid cursor: {value!r}') from exc
+
+
+def batch_queryset(queryset, cursor, size):
+    """
+    The ``size`` rows of ``queryset`` after ``cursor`` (None for the
+    start), plus one more to tell whether another batch follows.
+    """
+    queryset = queryset.order_by(*ORDERING)
+    if cursor is not None:
+        day, created_at, pk = decode_cursor(cursor)
+        # The plain date bound keeps the index range tight; the rest only
+        # sorts out rows on the cursor's own day
+        queryset = queryset.filter(date__lte=day).filter(
+            Q(date__lt=day)
+            | Q(created_at__lt=created_at)
+            | Q(created_at=created_at, pk__lt=pk)
+        )
+    return queryset[:size + 1]
+
+
+def next_batch(queryset, cursor, size):
+    """``(rows, next_cursor)``; ``next_cursor`` is None after the last batch."""
+    rows = list(batch_queryset(queryset, cursor, size))
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor(rows[-1])
@@ -0,0 +1,158 @@
+"""
+Compact model fields: decimal amounts stored as integer minor units and
+string choices stored as small integer codes. Python code keeps seeing
+``Decimal`` amounts and choice strings; only the columns get smaller.
+SQL arithmetic on amounts should go through ``MajorUnits``.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django import forms
+from django.core import validators
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import F, Value
+from django.db.models.lookups import (
+    Exact, GreaterThan, GreaterThanOrEqual, LessThan, LessThanOrEqual,
+)
+from django.utils.functional import cached_property
+
+
+class MoneyField(models.BigIntegerField):
+    """
+    ``Decimal`` amount stored as a whole number of minor units, e.g. cents
+    with two decimal places. Sums and comparisons run on integers in SQL;
+    ``Sum()`` and other aggregates returning the field come back as
+    ``Decimal`` again. Averages and other float results stay in minor units.
+    """
+    description = 'Decimal amount stored in minor units'
+
+    def __init__(self, *args, max_digits=None, decimal_places=2, **kwargs):
+        self.max_digits = max_digits
+        self.decimal_places = decimal_places
+        super().__init__(*args, **kwargs)
+
+    @property
+    def scale(self):
+        """Minor units per major unit."""
+        return 10 ** self.decimal_places
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.max_digits is not None:
+            kwargs['max_digits'] = self.max_digits
+        if self.decimal_places != 2:
+            kwargs['decimal_places'] = self.decimal_places
+        return name, path, args, kwargs
+
+    @cached_property
+    def validators(self):
+        # Integer range validators would compare against major units
+        validators_ = [*self.default_validators, *self._validators]
+        if self.max_digits is not None:
+            validators_.append(
+                validators.DecimalValidator(self.max_digits, self.decimal_places)
+            )
+        return validators_
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            value = Decimal(repr(value) if isinstance(value, float) else value)
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValidationError(
+                '“%(value)s” value must be a decimal number.',
+                code='invalid',
+                params={'value': value},
+            )
+        if not value.is_finite():
+            raise ValidationError(
+                '“%(value)s” value must be a decimal number.',
+                code='invalid',
+                params={'value': value},
+            )
+        return value
+
+    def get_prep_value(self, value):
+        value = self.to_python(value)
+        if value is None:
+            return None
+        return int((value * self.scale).to_integral_value(ROUND_HALF_UP))
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(int(value)).scaleb(-self.decimal_places)
+
+    def formfield(self, **kwargs):
+        # Skip BigIntegerField's integer form field and range
+        return models.Field.formfield(self, **{
+            'form_class': forms.DecimalField,
+            'max_digits': self.max_digits,
+            'decimal_places': self.decimal_places,
+            **kwargs,
+        })
+
+
+# Plain comparisons: the integer lookups would round float values to whole
+# minor units before they are converted
+for lookup in (Exact, GreaterThan, GreaterThanOrEqual, LessThan, LessThanOrEqual):
+    MoneyField.register_lookup(lookup)
+
+
+class MajorUnits(F):
+    """
+    Reference to an amount field in major units: a ``MoneyField`` column is
+    scaled down from minor units, any other field is used as is.
+    """
+
+    def resolve_expression(self, *args, **kwargs):
+        resolved = super().resolve_expression(*args, **kwargs)
+        field = resolved.output_field
+        if not isinstance(field, MoneyField):
+            return resolved
+        return (resolved * Value(Decimal(1).scaleb(-field.decimal_places))).resolve_expression(
+            *args, **kwargs
+        )
+
+
+class ChoiceCodeField(models.SmallIntegerField):
+    """
+    String choice stored as the small integer from ``codes`` (value ->
+    code). Codes are part of the stored data: never renumber them, only add
+    new ones.
+    """
+    description = 'String choice stored as a small integer code'
+
+    def __init__(self, *args, codes=None, **kwargs):
+        self.codes = dict(codes or {})
+        self.values_by_code = {code: value for value, code in self.codes.items()}
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['codes'] = self.codes
+        return name, path, args, kwargs
+
+    @cached_property
+    def validators(self):
+        # Integer range validators do not apply to the string values
+        return [*self.default_validators, *self._validators]
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return self.values_by_code.get(value, value)
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return self.codes[str(value)]
+        except KeyError:
+            raise ValueError(f'Field {self.name!r} has no code for {value!r}.') from None
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.values_by_code.get(value, value)
@@ -0,0 +1,45 @@
+"""
+Expense list filters shared by the list view and anything that has to
+select the same expenses, such as monthly statements.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from .models import ExpenseCategory
+
+
+def filter_expenses(queryset, params):
+    """
+    Narrow ``queryset`` by the list filters in ``params`` (a ``QueryDict``
+    or plain dict): ``category``, ``date_from``, ``date_to`` and ``search``.
+    Unknown categories and empty values are ignored.
+    """
+    # Category filter
+    category = params.get('category')
+    if category in ExpenseCategory.values:
+        queryset = queryset.filter(category=category)
+
+    # Date range filter
+    date_from = params.get('date_from')
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+
+    date_to = params.get('date_to')
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+
+    # Search filter: numeric terms also match the amount exactly, which
+    # stays a comparison on the integer column
+    search = (params.get('search') or '').strip()
+    if search:
+        matches = Q(description__icontains=search)
+        try:
+            amount = Decimal(search)
+        except InvalidOperation:
+            amount = None
+        if amount is not None and amount.is_finite():
+            matches |= Q(amount=amount)
+        queryset = queryset.filter(matches)
+
+    return queryset
@@ -2,10 +2,11 @@
 Forms for the expenses app.
 """
 from django import forms
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from .models import Expense, ExpenseCategory
+from .models import Budget, Expense, ExpenseCategory, RecurringExpense, UserProfile
+from .users import email_taken
 
 
 class SignUpForm(UserCreationForm):
@@ -43,21 +44,52 @@ class SignUpForm(UserCreationForm):
         })
 
     def clean_email(self):
-        """Validate that the email is unique."""
+        """Validate that the email is unique, ignoring case."""
         email = self.cleaned_data.get('email')
-        if User.objects.filter(email=email).exists():
+        if email_taken(email):
             raise ValidationError('This email address is already registered.')
         return email
 
+    def save(self, commit=True, password_hash=None):
+        """Save the user, with ``password_hash`` if it was computed elsewhere."""
+        if password_hash is None:
+            return super().save(commit)
+        user = forms.ModelForm.save(self, commit=False)
+        user.password = password_hash
+        if commit:
+            user.save()
+        return user
 
-class ExpenseForm(forms.ModelForm):
+
+class LoginForm(AuthenticationForm):
+    """
+    Login form whose credentials are checked by ``LoginView``, which hashes
+    off the request thread, rather than by ``clean()``.
+    """
+
+    def clean(self):
+        return self.cleaned_data
+
+
+class PositiveAmountMixin:
+    """Reject zero and negative amounts on a form with an ``amount`` field."""
+
+    def clean_amount(self):
+        """Validate that amount is positive."""
+        amount = self.cleaned_data.get('amount')
+        if amount is not None and amount <= 0:
+            raise ValidationError('Amount must be greater than zero.')
+        return amount
+
+
+class ExpenseForm(PositiveAmountMixin, forms.ModelForm):
     """
     Form for creating and updating expenses.
     """
     
     class Meta:
         model = Expense
-        fields = ['amount', 'category', 'date', 'description']
+        fields = ['amount', 'currency', 'category', 'date', 'description']
         widgets = {
             'amount': forms.NumberInput(attrs={
                 'class': 'form-control',
@@ -65,6 +97,9 @@ class ExpenseForm(forms.ModelForm):
                 'step': '0.01',
                 'min': '0.01'
             }),
+            'currency': forms.Select(attrs={
+                'class': 'form-select'
+            }),
             'category': forms.Select(attrs={
                 'class': 'form-select'
             }),
@@ -79,15 +114,187 @@ class ExpenseForm(forms.ModelForm):
             }),
         }
         help_texts = {
-            'amount': 'Enter the expense amount in cedis.',
+            'amount': 'Enter the expense amount.',
+            'currency': 'The currency the expense was paid in.',
             'category': 'Select the category that best describes this expense.',
             'date': 'When did this expense occur?',
             'description': 'Add any additional details about this expense.',
         }
 
-    def clean_amount(self):
-        """Validate that amount is positive."""
-        amount = self.cleaned_data.get('amount')
-        if amount is not None and amount <= 0:
-            raise ValidationError('Amount must be greater than zero.')
-        return amount
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Omitted currencies fall back to the model default
+        self.fields['currency'].required = False
+
+
+class BudgetForm(PositiveAmountMixin, forms.ModelForm):
+    """
+    Form for setting a monthly budget for a category.
+    """
+
+    class Meta:
+        model = Budget
+        fields = ['category', 'amount']
+        widgets = {
+            'category': forms.Select(attrs={
+                'class': 'form-select'
+            }),
+            'amount': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Monthly limit',
+                'step': '0.01',
+                'min': '0.01'
+            }),
+        }
+        help_texts = {
+            'amount': 'Maximum amount to spend in this category each month, in your home currency.',
+        }
+
+
+class RecurringExpenseForm(PositiveAmountMixin, forms.ModelForm):
+    """
+    Form for creating recurring expense templates.
+    """
+
+    class Meta:
+        model = RecurringExpense
+        fields = [
+            'amount', 'currency', 'category', 'description',
+            'frequency', 'interval', 'start_date', 'end_date',
+        ]
+        widgets = {
+            'amount': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Enter amount',
+                'step': '0.01',
+                'min': '0.01'
+            }),
+            'currency': forms.Select(attrs={
+                'class': 'form-select'
+            }),
+            'category': forms.Select(attrs={
+                'class': 'form-select'
+            }),
+            'description': forms.Textarea(attrs={
+                'rows': 2,
+                'class': 'form-control',
+                'placeholder': 'e.g. Rent, Netflix subscription'
+            }),
+            'frequency': forms.Select(attrs={
+                'class': 'form-select'
+            }),
+            'interval': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': '1'
+            }),
+            'start_date': forms.DateInput(attrs={
+                'type': 'date',
+                'class': 'form-control'
+            }),
+            'end_date': forms.DateInput(attrs={
+                'type': 'date',
+                'class': 'form-control'
+            }),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['currency'].required = False
+
+    def clean(self):
+        """Validate that the schedule ends after it starts."""
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            raise ValidationError('End date must be on or after the start date.')
+        return cleaned_data
+
+
+class ProfileForm(forms.ModelForm):
+    """
+    Form for per-user preferences.
+    """
+
+    class Meta:
+        model = UserProfile
+        fields = ['home_currency']
+        widgets = {
+            'home_currency': forms.Select(attrs={
+                'class': 'form-select'
+            }),
+        }
+        help_texts = {
+            'home_currency': 'Totals, budgets and statistics are converted into this currency.',
+        }
+
+
+class ExpenseIdsField(forms.TypedMultipleChoiceField):
+    """
+    Expense IDs ticked in the list. Any ID is accepted here: bulk writes are
+    scoped to the user, so other users' IDs simply match nothing.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(coerce=int, **kwargs)
+
+    def valid_value(self, value):
+        return str(value).isdigit()
+
+
+class BulkExpenseForm(forms.Form):
+    """
+    Form for applying one action to the expenses selected in the list.
+    """
+    RECATEGORIZE = 'recategorize'
+    SHIFT_DATES = 'shift_dates'
+    DELETE = 'delete'
+    ACTIONS = [
+        (RECATEGORIZE, 'Change category'),
+        (SHIFT_DATES, 'Shift dates'),
+        (DELETE, 'Delete'),
+    ]
+    MAX_EXPENSES = 1000
+
+    action = forms.ChoiceField(
+        choices=ACTIONS,
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        })
+    )
+    expenses = ExpenseIdsField(
+        error_messages={'required': 'Select at least one expense.'}
+    )
+    category = forms.ChoiceField(
+        choices=ExpenseCategory.choices,
+        required=False,
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        })
+    )
+    days = forms.IntegerField(
+        required=False,
+        min_value=-3650,
+        max_value=3650,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Days (+/-)'
+        })
+    )
+
+    def clean_expenses(self):
+        """Limit the size of a single batch."""
+        expense_ids = self.cleaned_data['expenses']
+        if len(expense_ids) > self.MAX_EXPENSES:
+            raise ValidationError(f'Select at most {self.MAX_EXPENSES} expenses at a time.')
+        return expense_ids
+
+    def clean(self):
+        """Require the value the chosen action needs."""
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action == self.RECATEGORIZE and not cleaned_data.get('category'):
+            self.add_error('category', 'Choose the new category.')
+        if action == self.SHIFT_DATES and not cleaned_data.get('days'):
+            self.add_error('days', 'Enter a non-zero number of days.')
+        return cleaned_data
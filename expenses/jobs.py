@@ -0,0 +1,163 @@
+"""
+Database-backed background job queue.
+
+Jobs are rows in the ``Job`` table. Workers claim them with ``SELECT ...
+FOR UPDATE SKIP LOCKED`` where the database supports it; elsewhere (SQLite)
+a job is claimed with a conditional ``UPDATE ... WHERE status = 'QUEUED'``
+so two workers can never run the same job. Failed jobs are retried with
+exponential backoff until ``max_attempts`` is reached.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def register(kind):
+    """Register the decorated function as the handler for ``kind`` jobs."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, user=None, max_attempts=None, run_after=None):
+    """Add a job to the queue and return it."""
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        user=user,
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3),
+        run_after=run_after or timezone.now(),
+    )
+
+
+def worker_name():
+    """Identifier of the current worker thread."""
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def _due_jobs():
+    return (
+        Job.objects
+        .filter(status=JobStatus.QUEUED, run_after__lte=timezone.now())
+        .order_by('run_after', 'pk')
+    )
+
+
+def claim(worker, limit=1):
+    """Claim up to ``limit`` due jobs for ``worker`` and return them."""
+    now = timezone.now()
+    changes = {
+        'status': JobStatus.RUNNING,
+        'locked_by': worker,
+        'locked_at': now,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            jobs = list(_due_jobs().select_for_update(skip_locked=True)[:limit])
+            ids = [job.pk for job in jobs]
+            Job.objects.filter(pk__in=ids).update(**changes)
+    else:
+        ids = []
+        for pk in _due_jobs().values_list('pk', flat=True)[:limit]:
+            # Only one worker's conditional update can match the queued row
+            if Job.objects.filter(pk=pk, status=JobStatus.QUEUED).update(**changes):
+                ids.append(pk)
+
+    return list(Job.objects.filter(pk__in=ids).order_by('run_after', 'pk'))
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying a job that failed ``attempts`` times."""
+    return getattr(settings, 'JOB_RETRY_DELAY', 30) * 2 ** (attempts - 1)
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome."""
+    job.attempts += 1
+    try:
+        handler = HANDLERS[job.kind]
+        result = handler(job, **job.payload)
+    except Exception:
+        job.error = traceback.format_exc()
+        job.locked_by = ''
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            job.status = JobStatus.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            logger.warning('Job %s failed, retrying (attempt %s)', job.pk, job.attempts)
+        else:
+            job.status = JobStatus.FAILED
+            job.finished_at = timezone.now()
+            logger.error('Job %s failed permanently', job.pk)
+    else:
+        job.status = JobStatus.SUCCEEDED
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.save(update_fields=[
+        'attempts', 'status', 'result', 'error', 'run_after',
+        'locked_by', 'locked_at', 'finished_at',
+    ])
+    return job
+
+
+def requeue_stale(timeout=None):
+    """
+    Put jobs back on the queue whose worker died while running them.
+    Returns the number of jobs requeued.
+    """
+    timeout = timeout or getattr(settings, 'JOB_STALE_TIMEOUT', 600)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return Job.objects.filter(status=JobStatus.RUNNING, locked_at__lt=cutoff).update(
+        status=JobStatus.QUEUED, locked_by='', locked_at=None
+    )
+
+
+def work(stop_event=None, once=False, poll_interval=1.0, batch_size=1):
+    """
+    Process jobs until ``stop_event`` is set. With ``once`` the loop returns
+    as soon as the queue is empty. Stale jobs are requeued every
+    ``JOB_REQUEUE_INTERVAL`` seconds. Returns the number of jobs run.
+    """
+    stop_event = stop_event or threading.Event()
+    worker = worker_name()
+    processed = 0
+    next_requeue = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            if time.monotonic() >= next_requeue:
+                requeued = requeue_stale()
+                if requeued:
+                    logger.warning('Requeued %s stale jobs', requeued)
+                next_requeue = time.monotonic() + getattr(settings, 'JOB_REQUEUE_INTERVAL', 60)
+            jobs = claim(worker, batch_size)
+            if not jobs:
+                if once:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            for job in jobs:
+                run_job(job)
+                processed += 1
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+    return processed
@@ -0,0 +1,112 @@
+"""
+Management command to benchmark database connection handling under
+concurrency: a new connection per request, persistent per-thread
+connections (CONN_MAX_AGE) and the in-process connection pool.
+Usage: python manage.py benchmark_db_pool [--threads=8 --threads=32] [--requests=2000] [--pool-size=4]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from expense_tracker.db_backends.pool import close_pools, pool_stats
+
+POSTGRESQL_ENGINE = 'django.db.backends.postgresql'
+POOL_ENGINE = 'expense_tracker.db_backends.postgresql_pool'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark requests/sec with and without connection pooling (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            action='append',
+            help='Concurrent request threads (repeatable, default: 8 and 32)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Simulated requests per measurement'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=3,
+            help='Queries per simulated request'
+        )
+        parser.add_argument(
+            '--pool-size',
+            type=int,
+            default=4,
+            help='Maximum pool size for the pooled run'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias to benchmark'
+        )
+
+    def handle(self, *args, **options):
+        base_settings = connections[options['database']].settings_dict
+        if connections[options['database']].vendor != 'postgresql':
+            raise CommandError('benchmark_db_pool needs a PostgreSQL database')
+
+        modes = [
+            ('per request', POSTGRESQL_ENGINE, {'CONN_MAX_AGE': 0}),
+            ('persistent', POSTGRESQL_ENGINE, {'CONN_MAX_AGE': 600}),
+            ('pooled', POOL_ENGINE, {
+                'CONN_MAX_AGE': 0,
+                'POOL': {**(base_settings.get('POOL') or {}), 'MAX_SIZE': options['pool_size']},
+            }),
+        ]
+        for threads in options['threads'] or [8, 32]:
+            for label, engine, overrides in modes:
+                settings_dict = {**base_settings, 'ENGINE': engine, **overrides}
+                elapsed, opened = self._run(settings_dict, threads, options)
+                self.stdout.write(
+                    f'{threads:>4} threads  {label:<12} '
+                    f'{options["requests"] / elapsed:9.1f} req/s  '
+                    f'{opened:>6} connections opened'
+                )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def _run(self, settings_dict, threads, options):
+        """Serve ``--requests`` simulated requests; return (seconds, connections opened)."""
+        alias = f'benchmark_{threads}_{settings_dict["ENGINE"].rsplit(".", 1)[-1]}'
+        backend = load_backend(settings_dict['ENGINE'])
+        local = threading.local()
+        wrappers = []
+        opened = []
+
+        def handle_request(_):
+            db = getattr(local, 'db', None)
+            if db is None:
+                db = local.db = backend.DatabaseWrapper(dict(settings_dict), alias)
+                wrappers.append(db)
+            # The same hooks Django runs on request_started/request_finished
+            db.close_if_unusable_or_obsolete()
+            if db.connection is None:
+                opened.append(1)
+            with db.cursor() as cursor:
+                for _ in range(options['queries']):
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            db.close_if_unusable_or_obsolete()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(handle_request, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        stats = pool_stats().get(alias)
+        for db in wrappers:
+            db.inc_thread_sharing()
+            db.close()
+        close_pools(lambda key: key[0] == alias)
+        return elapsed, stats['connections_created'] if stats else len(opened)
@@ -0,0 +1,149 @@
+"""
+Management command to compare the old decimal/string expense columns with
+the compact integer ones: table plus index size and GROUP BY SUM speed.
+Usage: python manage.py benchmark_expense_storage [--rows=200000] [--users=100] [--repeat=5]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from decimal import Decimal
+import random
+import time
+
+from expenses.models import CATEGORY_STORAGE_CODES
+
+LAYOUTS = {
+    'decimal/string': {
+        'columns': 'amount NUMERIC(10, 2) NOT NULL, category VARCHAR(50) NOT NULL',
+        'amount': 'amount',
+        'category': 'category',
+        'indexes': [('user_id', 'category'), ('category',)],
+    },
+    'compact': {
+        'columns': 'amount_minor BIGINT NOT NULL, category_code SMALLINT NOT NULL',
+        'amount': 'amount_minor',
+        'category': 'category_code',
+        'indexes': [('user_id', 'category_code')],
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark decimal/string against compact integer expense storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=200000,
+            help='Expenses per table'
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=100,
+            help='Distinct users in the data'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Times each aggregation is run'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias to benchmark on (tables are dropped afterwards)'
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError('benchmark_expense_storage supports PostgreSQL and SQLite')
+
+        rng = random.Random(42)
+        categories = list(CATEGORY_STORAGE_CODES)
+        rows = [
+            (
+                rng.randrange(options['users']),
+                Decimal(rng.randrange(1, 50000)).scaleb(-2),
+                rng.choice(categories),
+            )
+            for _ in range(options['rows'])
+        ]
+
+        for label, layout in LAYOUTS.items():
+            table = f'bench_expense_{layout["amount"]}'
+            try:
+                indexes = self._create(connection, table, layout, rows)
+                size = self._size(connection, table, indexes)
+                elapsed = self._time_sum(connection, table, layout, options['repeat'])
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            self.stdout.write(
+                f'{label:<15} {size / 1024 / 1024:8.2f} MB table+indexes  '
+                f'{elapsed * 1000:8.1f} ms per GROUP BY SUM'
+            )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def _create(self, connection, table, layout, rows):
+        """Create and fill ``table``; return the names of its indexes."""
+        compact = layout['amount'] == 'amount_minor'
+        values = [
+            (
+                user_id,
+                int(amount * 100) if compact else str(amount),
+                CATEGORY_STORAGE_CODES[category] if compact else category,
+            )
+            for user_id, amount, category in rows
+        ]
+        indexes = []
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            primary_key = 'BIGSERIAL' if connection.vendor == 'postgresql' else 'INTEGER'
+            cursor.execute(
+                f'CREATE TABLE {table} (id {primary_key} PRIMARY KEY, user_id INTEGER NOT NULL, '
+                f'{layout["columns"]})'
+            )
+            insert = (
+                f'INSERT INTO {table} (user_id, {layout["amount"]}, {layout["category"]}) '
+                f'VALUES (%s, %s, %s)'
+            )
+            for start in range(0, len(values), 5000):
+                cursor.executemany(insert, values[start:start + 5000])
+            for columns in layout['indexes']:
+                name = f'{table}_{"_".join(columns)}_idx'
+                cursor.execute(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})')
+                indexes.append(name)
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'ANALYZE {table}')
+        return indexes
+
+    def _size(self, connection, table, indexes):
+        """Bytes used by ``table`` and its indexes."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+            else:
+                names = [table, *indexes]
+                cursor.execute(
+                    f'SELECT SUM(pgsize) FROM dbstat WHERE name IN ({", ".join(["%s"] * len(names))})',
+                    names
+                )
+            return cursor.fetchone()[0] or 0
+
+    def _time_sum(self, connection, table, layout, repeat):
+        """Average seconds for a per-user, per-category SUM over ``table``."""
+        sql = (
+            f'SELECT user_id, {layout["category"]}, SUM({layout["amount"]}) '
+            f'FROM {table} GROUP BY user_id, {layout["category"]}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            cursor.fetchall()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                cursor.execute(sql)
+                cursor.fetchall()
+        return (time.perf_counter() - start) / repeat
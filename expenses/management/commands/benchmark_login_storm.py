@@ -0,0 +1,160 @@
+"""
+Management command to measure expense list latency during a login storm.
+Usage: python manage.py benchmark_login_storm [--user=<username>] [--storm-threads=16] [--list-threads=2] [--requests=50] [--hash-threads=2]
+
+Signed-in threads load the expense list while storm threads post failed
+logins as fast as they can, first with passwords hashed inline on each
+request thread (AUTH_HASH_THREADS=0) and then in the bounded hashing pool.
+Requests go through the full middleware stack in this process, with
+throttling and load shedding switched off for the run.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def storm(login_url, user, stop, logins, failures):
+    """Post failed logins until ``stop`` is set or a login answers unexpectedly."""
+    client = Client(raise_request_exception=False)
+    try:
+        while not stop.is_set():
+            response = client.post(
+                login_url, {'username': user.username, 'password': 'not-the-password'}
+            )
+            # A refused login is 200 with a form error, or 503 from a full pool
+            if response.status_code not in (200, 503):
+                failures.append(response.status_code)
+                stop.set()
+            logins.append(1)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark expense list latency during a concurrent login storm'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Username whose expense list is loaded (defaults to the first user)'
+        )
+        parser.add_argument(
+            '--storm-threads',
+            type=int,
+            default=16,
+            help='Threads posting logins concurrently'
+        )
+        parser.add_argument(
+            '--list-threads',
+            type=int,
+            default=2,
+            help='Threads loading the expense list concurrently'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='List requests per list thread'
+        )
+        parser.add_argument(
+            '--hash-threads',
+            type=int,
+            default=getattr(settings, 'AUTH_HASH_THREADS', 2) or 2,
+            help='Hashing pool threads for the pooled run'
+        )
+
+    def handle(self, *args, **options):
+        if min(options['storm_threads'], options['list_threads'], options['requests'],
+               options['hash_threads']) < 1:
+            raise CommandError('Thread and request counts must be at least 1')
+        users = User.objects.order_by('pk')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to load the expense list for; run generate_test_data')
+
+        runs = [
+            ('no storm', 0, 0),
+            ('storm, inline hashing', options['storm_threads'], 0),
+            (f'storm, {options["hash_threads"]} hashing threads',
+             options['storm_threads'], options['hash_threads']),
+        ]
+        for label, storm_threads, hash_threads in runs:
+            latencies, logins = self._run(user, options, storm_threads, hash_threads)
+            line = (
+                f'{label:<28} list p50 {percentile(latencies, 0.5) * 1000:8.1f} ms  '
+                f'p95 {percentile(latencies, 0.95) * 1000:8.1f} ms  '
+                f'max {max(latencies) * 1000:8.1f} ms'
+            )
+            if storm_threads:
+                line += f'  {logins:7.1f} logins/s'
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def _run(self, user, options, storm_threads, hash_threads):
+        """Return (list latencies in seconds, logins per second)."""
+        list_url = reverse('expense_list')
+        login_url = reverse('login')
+        stop = threading.Event()
+        logins = []
+        failures = []
+
+        def read(_):
+            client = Client()
+            client.force_login(user)
+            latencies = []
+            try:
+                for _ in range(options['requests']):
+                    start = time.perf_counter()
+                    response = client.get(list_url)
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code != 200:
+                        raise CommandError(f'Expense list answered {response.status_code}')
+            finally:
+                connections.close_all()
+            return latencies
+
+        with override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            THROTTLE_ENABLED=False,
+            LOAD_SHED_ENABLED=False,
+            AUTH_HASH_THREADS=hash_threads,
+            # Queue every storm login so both runs hash the same work
+            AUTH_HASH_MAX_PENDING=storm_threads,
+        ):
+            stormers = [
+                threading.Thread(target=storm, args=(login_url, user, stop, logins, failures))
+                for _ in range(storm_threads)
+            ]
+            for thread in stormers:
+                thread.start()
+            start = time.perf_counter()
+            try:
+                with ThreadPoolExecutor(options['list_threads']) as executor:
+                    latencies = list(chain.from_iterable(
+                        executor.map(read, range(options['list_threads']))
+                    ))
+            finally:
+                stop.set()
+                for thread in stormers:
+                    thread.join()
+            elapsed = time.perf_counter() - start
+        if failures:
+            raise CommandError(f'Login storm answered {failures[0]}')
+        return latencies, len(logins) / elapsed
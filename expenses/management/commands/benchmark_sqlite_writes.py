@@ -0,0 +1,133 @@
+"""
+Management command to benchmark concurrent SQLite writes from several
+processes, comparing Django's default SQLite backend with the tuned one.
+Usage: python manage.py benchmark_sqlite_writes [--processes=4] [--writes=300] [--timeout=1]
+"""
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+from django.db.utils import load_backend
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import sqlite3
+import tempfile
+import time
+
+BACKENDS = [
+    ('default', 'django.db.backends.sqlite3'),
+    ('tuned', 'expense_tracker.db_backends.sqlite_tuned'),
+]
+
+SCHEMA = """
+    CREATE TABLE bench_totals (
+        user_id INTEGER PRIMARY KEY,
+        total NUMERIC NOT NULL,
+        count INTEGER NOT NULL
+    );
+    CREATE TABLE bench_expense (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        amount NUMERIC NOT NULL
+    );
+"""
+
+
+def run_writer(settings_dict, writes, worker):
+    """
+    Save ``writes`` expenses the way a request does: inside a transaction,
+    read the running total, insert the expense, update the total. Returns
+    (committed, locked errors).
+    """
+    backend = load_backend(settings_dict['ENGINE'])
+    db = backend.DatabaseWrapper(settings_dict, 'benchmark')
+    committed = locked = 0
+    for i in range(writes):
+        user_id = (worker * writes + i) % 20
+        try:
+            # Start the transaction the way transaction.atomic() does
+            db.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            with db.cursor() as cursor:
+                cursor.execute('SELECT total FROM bench_totals WHERE user_id = %s', [user_id])
+                cursor.fetchone()
+                cursor.execute(
+                    'INSERT INTO bench_expense (user_id, amount) VALUES (%s, %s)', [user_id, 12.5]
+                )
+                cursor.execute(
+                    'UPDATE bench_totals SET total = total + %s, count = count + 1 '
+                    'WHERE user_id = %s', [12.5, user_id]
+                )
+            db.commit()
+            committed += 1
+        except DatabaseError as exc:
+            if 'locked' not in str(exc):
+                raise
+            db.rollback()
+            locked += 1
+        finally:
+            db.set_autocommit(True)
+    db.close()
+    return committed, locked
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent SQLite writes with the default and tuned backends'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=4,
+            help='Concurrent writer processes (like gunicorn workers)'
+        )
+        parser.add_argument(
+            '--writes',
+            type=int,
+            default=300,
+            help='Transactions per process'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=1.0,
+            help='Seconds each connection waits for a lock'
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        writes = options['writes']
+        template = connections['default'].settings_dict
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for label, engine in BACKENDS:
+                path = Path(tmp) / f'{label}.sqlite3'
+                with sqlite3.connect(path) as conn:
+                    conn.executescript(SCHEMA)
+                    conn.executemany(
+                        'INSERT INTO bench_totals VALUES (?, 0, 0)', [(i,) for i in range(20)]
+                    )
+                settings_dict = {
+                    **template,
+                    'ENGINE': engine,
+                    'NAME': str(path),
+                    'OPTIONS': {'timeout': options['timeout']},
+                    'PRAGMAS': {'busy_timeout': int(options['timeout'] * 1000)},
+                }
+
+                start = time.perf_counter()
+                with ProcessPoolExecutor(processes) as executor:
+                    results = list(executor.map(
+                        run_writer,
+                        [settings_dict] * processes,
+                        [writes] * processes,
+                        range(processes),
+                    ))
+                elapsed = time.perf_counter() - start
+
+                committed = sum(result[0] for result in results)
+                locked = sum(result[1] for result in results)
+                self.stdout.write(
+                    f'{label:<8} {processes} processes  '
+                    f'{committed / elapsed:9.1f} commits/s  '
+                    f'{locked:>6} "database is locked" errors'
+                )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,90 @@
+"""
+Management command to benchmark expense list template rendering.
+Usage: python manage.py benchmark_templates [--rows=20 --rows=500] [--iterations=50]
+"""
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+from decimal import Decimal
+from datetime import date, timedelta
+import statistics
+import time
+
+from expenses.models import Expense, ExpenseCategory
+
+
+class Command(BaseCommand):
+    help = 'Benchmark rendering time of the expense list template'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            action='append',
+            help='Number of rows to render (repeatable, default: 20 and 500)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Number of renders per measurement'
+        )
+
+    def handle(self, *args, **options):
+        row_counts = options['rows'] or [20, 500]
+        iterations = options['iterations']
+
+        user = User(id=1, username='benchmark')
+        request = RequestFactory().get('/')
+        request.user = user
+
+        for rows in row_counts:
+            context = self._build_context(user, rows)
+            for label, timeout in (('uncached', 0), ('row cache', 3600)):
+                with override_settings(TEMPLATE_FRAGMENT_CACHE_TIMEOUT=timeout):
+                    cache.clear()
+                    render_to_string('expenses/expense_list.html', context, request)
+                    timings = []
+                    for _ in range(iterations):
+                        start = time.perf_counter()
+                        render_to_string('expenses/expense_list.html', context, request)
+                        timings.append((time.perf_counter() - start) * 1000)
+
+                self.stdout.write(
+                    f'{rows:>5} rows  {label:<10} '
+                    f'mean {statistics.mean(timings):8.2f} ms  '
+                    f'median {statistics.median(timings):8.2f} ms'
+                )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def _build_context(self, user, rows):
+        """Build an in-memory list page context with ``rows`` expenses."""
+        categories = list(ExpenseCategory.values)
+        now = timezone.now()
+        expenses = []
+        for i in range(rows):
+            expense = Expense(
+                id=i + 1,
+                user=user,
+                amount=Decimal('12.50') + i,
+                category=categories[i % len(categories)],
+                date=date.today() - timedelta(days=i % 90),
+                description=f'Benchmark expense {i}',
+            )
+            expense.updated_at = now
+            expenses.append(expense)
+
+        return {
+            'expenses': expenses,
+            'categories': ExpenseCategory.choices,
+            'selected_category': 'All',
+            'date_from': '',
+            'date_to': '',
+            'search': '',
+            'total_amount': sum(e.amount for e in expenses),
+        }
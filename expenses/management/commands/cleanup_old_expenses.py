@@ -1,12 +1,15 @@
 """
 Management command to clean up old expenses.
-Usage: python manage.py cleanup_old_expenses --days=365
+Usage: python manage.py cleanup_old_expenses --days=365 [--dry-run] [--background]
 """
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 
+from expenses.jobs import enqueue
 from expenses.models import Expense
+from expenses.sharding import shard_aliases
+from expenses.tasks import delete_expenses_before
 
 
 class Command(BaseCommand):
@@ -24,14 +27,28 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be deleted without actually deleting'
         )
+        parser.add_argument(
+            '--background',
+            action='store_true',
+            help='Queue the cleanup as a background job instead of running it now'
+        )
 
     def handle(self, *args, **options):
         days = options['days']
         dry_run = options['dry_run']
 
+        if options['background'] and not dry_run:
+            job = enqueue('cleanup_old_expenses', {'days': days})
+            self.stdout.write(
+                self.style.SUCCESS(f'Queued cleanup job #{job.pk}')
+            )
+            return
+
         cutoff_date = timezone.now().date() - timedelta(days=days)
-        old_expenses = Expense.objects.filter(date__lt=cutoff_date)
-        count = old_expenses.count()
+        count = sum(
+            Expense.objects.using(alias).filter(date__lt=cutoff_date).count()
+            for alias in shard_aliases()
+        )
 
         if count == 0:
             self.stdout.write(
@@ -47,7 +64,7 @@ class Command(BaseCommand):
                 )
             )
         else:
-            old_expenses.delete()
+            count = delete_expenses_before(cutoff_date)
             self.stdout.write(
                 self.style.SUCCESS(
                     f'Successfully deleted {count} expenses older than {days} days'
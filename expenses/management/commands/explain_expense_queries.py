@@ -0,0 +1,55 @@
+"""
+Management command to EXPLAIN every expense list filter combination and
+fail if any plan scans the whole expense table or sorts it.
+Usage: python manage.py explain_expense_queries [--user=<username>] [--database=<alias>] [--verbose]
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from urllib.parse import urlencode
+
+from expenses.query_plans import list_query_plans
+from expenses.sharding import shard_for_user
+
+
+class Command(BaseCommand):
+    help = 'Check that the expense list query is served by indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Username to build the queries for (defaults to the first user)'
+        )
+        parser.add_argument(
+            '--database',
+            help="Database alias to explain on (defaults to the user's shard)"
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Print every plan, not only the regressed ones'
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to build the list queries for')
+
+        using = options['database'] or shard_for_user(user)
+        vendor = connections[using].vendor
+        failed = 0
+        for params, plan, regressions in list_query_plans(user, using=using):
+            if not regressions and not options['verbose']:
+                continue
+            label = urlencode(params) or '(no filters)'
+            style = self.style.ERROR if regressions else self.style.NOTICE
+            self.stdout.write(style(label))
+            self.stdout.write(plan)
+            failed += bool(regressions)
+
+        if failed:
+            raise CommandError(f'{failed} list query plan(s) regressed on {vendor}')
+        self.stdout.write(self.style.SUCCESS(f'All list query plans use an index on {vendor}'))
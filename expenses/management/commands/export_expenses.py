@@ -1,13 +1,16 @@
 """
 Management command to export expenses to CSV.
-Usage: python manage.py export_expenses --user=username --output=expenses.csv
+Usage: python manage.py export_expenses [--user=username] --output=expenses.csv [--background]
 """
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
-import csv
-from pathlib import Path
 
+from expenses.currency import home_currency
+from expenses.jobs import enqueue
 from expenses.models import Expense
+from expenses.sharding import shard_aliases, shard_for_user
+from expenses.tasks import write_expenses_csv
 
 
 class Command(BaseCommand):
@@ -17,8 +20,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--user',
             type=str,
-            required=True,
-            help='Username to export expenses for'
+            help='Username to export expenses for (default: every user, from all shards)'
         )
         parser.add_argument(
             '--output',
@@ -26,17 +28,35 @@ class Command(BaseCommand):
             default='expenses.csv',
             help='Output CSV file path'
         )
+        parser.add_argument(
+            '--background',
+            action='store_true',
+            help='Queue the export as a background job instead of running it now'
+        )
 
     def handle(self, *args, **options):
         username = options['user']
         output_file = options['output']
 
+        if not username:
+            if options['background']:
+                raise CommandError('--background needs --user')
+            self._export_all(output_file)
+            return
+
         try:
             user = User.objects.get(username=username)
         except User.DoesNotExist:
             raise CommandError(f'User "{username}" does not exist')
 
-        expenses = Expense.objects.filter(user=user).order_by('-date')
+        if options['background']:
+            job = enqueue('export_expenses', {'user_id': user.pk}, user=user)
+            self.stdout.write(
+                self.style.SUCCESS(f'Queued export job #{job.pk} for user {username}')
+            )
+            return
+
+        expenses = Expense.objects.using(shard_for_user(user)).filter(user=user).order_by('-date')
 
         if not expenses.exists():
             self.stdout.write(
@@ -44,22 +64,25 @@ class Command(BaseCommand):
             )
             return
 
-        # Export to CSV
-        output_path = Path(output_file)
-        with output_path.open('w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['Date', 'Amount', 'Category', 'Description'])
+        count = write_expenses_csv(expenses, output_file, home_currency(user))
 
-            for expense in expenses:
-                writer.writerow([
-                    expense.date,
-                    expense.amount,
-                    expense.get_category_display(),
-                    expense.description
-                ])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully exported {count} expenses to {output_file}'
+            )
+        )
 
+    def _export_all(self, output_file):
+        """Export every user's expenses, merging the shards by date."""
+        expenses = [
+            Expense.objects.using(alias).order_by('-date') for alias in shard_aliases()
+        ]
+        count = write_expenses_csv(
+            expenses, output_file, settings.DEFAULT_CURRENCY, with_user=True
+        )
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully exported {expenses.count()} expenses to {output_file}'
+                f'Successfully exported {count} expenses from '
+                f'{len(expenses)} shards to {output_file}'
             )
         )
@@ -0,0 +1,118 @@
+"""
+Management command to write monthly expense statements for every user.
+Usage: python manage.py generate_statements [--month=YYYY-MM] [--user=<username>] [--processes=4] [--chunk-size=100] [--category=FOOD] [--search=<term>] [--force]
+
+Statements are split into chunks of users and rendered across a process
+pool. Statements whose inputs have not changed since the last run are
+left alone.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import os
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from expenses.models import ExpenseCategory
+from expenses.statements import generate_statements, previous_month
+
+
+def run_chunk(user_ids, month, filters, force):
+    try:
+        return generate_statements(user_ids, month, filters, force)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Generate monthly expense statements under STATEMENTS_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            help='Month to generate, as YYYY-MM (defaults to last month)'
+        )
+        parser.add_argument(
+            '--user',
+            help='Only generate the statement of this username'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Users handed to a worker at a time'
+        )
+        parser.add_argument(
+            '--category',
+            choices=ExpenseCategory.values,
+            help='Only include this category, as the list filter does'
+        )
+        parser.add_argument(
+            '--search',
+            help='Only include expenses matching this search, as the list filter does'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rewrite statements even if nothing changed'
+        )
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--month must look like YYYY-MM')
+        else:
+            month = previous_month()
+        processes = options['processes']
+        chunk_size = options['chunk_size']
+        if processes < 1 or chunk_size < 1:
+            raise CommandError('--processes and --chunk-size must be at least 1')
+
+        filters = {
+            name: options[name] for name in ('category', 'search') if options[name]
+        }
+        users = User.objects.filter(is_active=True).order_by('pk')
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f'User "{options["user"]}" does not exist')
+        user_ids = list(users.values_list('pk', flat=True))
+        chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+
+        self.stdout.write(
+            f'Generating {month:%Y-%m} statements for {len(user_ids)} users '
+            f'in {len(chunks)} chunks'
+        )
+        totals = {'written': 0, 'unchanged': 0}
+        if processes == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                self._add(totals, generate_statements(chunk, month, filters, options['force']))
+        else:
+            # Children must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(processes, initializer=django.setup) as executor:
+                futures = [
+                    executor.submit(run_chunk, chunk, month, filters, options['force'])
+                    for chunk in chunks
+                ]
+                for future in as_completed(futures):
+                    self._add(totals, future.result())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {totals["written"]} statements, '
+            f'{totals["unchanged"]} unchanged'
+        ))
+
+    def _add(self, totals, results):
+        for outcome, count in results.items():
+            totals[outcome] += count
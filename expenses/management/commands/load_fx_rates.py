@@ -0,0 +1,95 @@
+"""
+Management command to load exchange rates from local files.
+Usage: python manage.py load_fx_rates rates.csv [more.json ...]
+
+CSV files have ``date,currency,rate`` columns. JSON files hold an object
+(or a list of objects) like ``{"date": "2025-01-31", "base": "USD",
+"rates": {"GHS": 15.4, "EUR": 0.96}}``. Rates are units of currency per
+one unit of ``FX_BASE_CURRENCY``.
+"""
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.models import Currency, ExchangeRate
+from expenses.versioning import bump_fx_version
+
+
+def read_csv(path):
+    with path.open(newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield row['date'], row['currency'], row['rate']
+
+
+def read_json(path):
+    data = json.loads(path.read_text(encoding='utf-8'))
+    for entry in data if isinstance(data, list) else [data]:
+        base = entry.get('base', settings.FX_BASE_CURRENCY)
+        if base != settings.FX_BASE_CURRENCY:
+            raise CommandError(
+                f'{path}: rates are against {base}, expected {settings.FX_BASE_CURRENCY}'
+            )
+        for currency, rate in entry['rates'].items():
+            yield entry['date'], currency, str(rate)
+
+
+class Command(BaseCommand):
+    help = 'Load exchange rates from CSV or JSON files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='CSV or JSON files with exchange rates'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rates to write per query'
+        )
+
+    def handle(self, *args, **options):
+        supported = set(Currency.values)
+        rates = {}
+        skipped = 0
+
+        for name in options['paths']:
+            path = Path(name)
+            if not path.exists():
+                raise CommandError(f'File "{name}" does not exist')
+            reader = read_json if path.suffix.lower() == '.json' else read_csv
+            try:
+                for rate_date, currency, rate in reader(path):
+                    currency = currency.strip().upper()
+                    if currency not in supported:
+                        skipped += 1
+                        continue
+                    rates[(currency, date.fromisoformat(rate_date.strip()))] = Decimal(rate)
+            except (KeyError, ValueError, InvalidOperation) as exc:
+                raise CommandError(f'{name}: invalid rate data ({exc})')
+
+        ExchangeRate.objects.bulk_create(
+            [
+                ExchangeRate(currency=currency, date=rate_date, rate=rate)
+                for (currency, rate_date), rate in rates.items()
+            ],
+            batch_size=options['batch_size'],
+            update_conflicts=True,
+            unique_fields=['currency', 'date'],
+            update_fields=['rate'],
+        )
+        bump_fx_version()
+
+        if skipped:
+            self.stdout.write(
+                self.style.WARNING(f'Skipped {skipped} rates for unsupported currencies')
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully loaded {len(rates)} exchange rates')
+        )
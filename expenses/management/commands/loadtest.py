@@ -0,0 +1,380 @@
+"""
+Management command to load test the expense pages.
+Usage: python manage.py loadtest [--users=5] [--threads=8] [--processes=1] [--duration=30] [--requests=N] [--mix=list:70,add:10,edit:10,delete:10] [--url=http://127.0.0.1:8000]
+
+Each thread logs in as one of the users created by generate_test_data
+(testuser1, testuser2, ...) and then loads the expense list with random
+filters, adds expenses, and edits and deletes the ones its list pages
+showed, in the proportions of ``--mix``. Without ``--url`` requests go
+through the full middleware stack in this process (and in ``--processes``
+child processes), with throttling and load shedding switched off for the
+run; with ``--url`` they go over HTTP to a running server such as a local
+gunicorn, whose throttles still apply. The seeded users' expenses are
+changed. Reports throughput and p50/p95/p99 latency per endpoint.
+"""
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+import random
+import re
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from expenses.management.commands.benchmark_login_storm import percentile
+from expenses.models import ExpenseCategory
+
+ENDPOINTS = ('expense_list', 'add_expense', 'edit_expense', 'delete_expense')
+MIX_NAMES = {
+    'list': 'expense_list',
+    'add': 'add_expense',
+    'edit': 'edit_expense',
+    'delete': 'delete_expense',
+}
+# Status each endpoint answers when the request worked
+EXPECTED_STATUS = {
+    'expense_list': 200,
+    'add_expense': 302,
+    'edit_expense': 302,
+    'delete_expense': 302,
+}
+SEARCH_TERMS = ('coffee', 'shopping', 'bill', 'ride', 'dinner')
+HTTP_TIMEOUT = 30
+
+# Row checkboxes of the expense list carry the expense ids
+EXPENSE_ID = re.compile(r'name="expenses"\s+value="(\d+)"')
+
+
+def parse_mix(value):
+    """``list:70,add:10,...`` as {endpoint: weight}; raises ValueError."""
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.strip().partition(':')
+        endpoint = MIX_NAMES.get(name, name)
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f'Unknown endpoint "{name}" in the mix')
+        try:
+            weights[endpoint] = float(weight or 1)
+        except ValueError:
+            raise ValueError(f'Invalid weight "{weight}" for {name}')
+        if weights[endpoint] < 0:
+            raise ValueError(f'Negative weight for {name}')
+    if not sum(weights.values()):
+        raise ValueError('The mix needs at least one positive weight')
+    return weights
+
+
+def list_filters(rng):
+    """A random combination of the expense list filters."""
+    filters = {}
+    if rng.random() < 0.3:
+        filters['category'] = rng.choice(ExpenseCategory.values)
+    if rng.random() < 0.3:
+        filters['date_from'] = (date.today() - timedelta(days=rng.randint(7, 90))).isoformat()
+    if rng.random() < 0.2:
+        filters['search'] = rng.choice(SEARCH_TERMS)
+    return filters
+
+
+def expense_data(rng):
+    return {
+        'amount': f'{rng.uniform(5, 500):.2f}',
+        'category': rng.choice(ExpenseCategory.values),
+        'date': (date.today() - timedelta(days=rng.randint(0, 30))).isoformat(),
+        'description': 'Load test expense',
+    }
+
+
+class ClientSession:
+    """Requests through the WSGI handler in this process."""
+
+    def __init__(self):
+        self.client = Client()
+
+    def get(self, path, params=None):
+        response = self.client.get(path, params)
+        return response.status_code, response.content.decode()
+
+    def post(self, path, data):
+        response = self.client.post(path, data)
+        return response.status_code, response.content.decode()
+
+    def close(self):
+        connections.close_all()
+
+
+class NoRedirect(HTTPRedirectHandler):
+    """Report redirects as responses instead of following them."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPSession:
+    """Requests over HTTP to ``base_url``, keeping cookies like a browser."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request, timeout=HTTP_TIMEOUT) as response:
+                return response.status, response.read().decode()
+        except HTTPError as error:
+            return error.code, error.read().decode(errors='replace')
+        except OSError:
+            # Refused, reset or timed out
+            return 'error', ''
+
+    def get(self, path, params=None):
+        query = f'?{urlencode(params)}' if params else ''
+        return self._open(Request(f'{self.base_url}{path}{query}'))
+
+    def post(self, path, data):
+        # Login rotates the CSRF token, so always send the current cookie
+        token = next(
+            (cookie.value for cookie in self.cookies if cookie.name == settings.CSRF_COOKIE_NAME),
+            ''
+        )
+        url = f'{self.base_url}{path}'
+        body = urlencode({**data, 'csrfmiddlewaretoken': token}).encode()
+        return self._open(Request(url, body, headers={'Referer': url}))
+
+    def close(self):
+        pass
+
+
+def session_settings(url):
+    """Settings for the run: in-process requests skip throttles and shedding."""
+    if url:
+        return nullcontext()
+    return override_settings(
+        ALLOWED_HOSTS=['testserver'],
+        THROTTLE_ENABLED=False,
+        LOAD_SHED_ENABLED=False,
+    )
+
+
+def log_in(session, url, username, password):
+    if url:
+        # Picks up the CSRF cookie for the login form
+        session.get(reverse('login'))
+    status, _ = session.post(reverse('login'), {'username': username, 'password': password})
+    if status == 'error':
+        raise CommandError(f'Could not reach {url}')
+    if status != 302:
+        raise CommandError(
+            f'Could not log in as {username} ({status}); run generate_test_data first'
+        )
+
+
+def run_user(url, username, password, weights, stop_at, requests, seed):
+    """
+    Log in as ``username``, then send ``requests`` requests (or keep going
+    until ``time.time()`` passes ``stop_at``) in the proportions of
+    ``weights``. Returns ({endpoint: [(status, seconds), ...]}, start, end).
+    """
+    rng = random.Random(seed)
+    session = HTTPSession(url) if url else ClientSession()
+    endpoints, endpoint_weights = list(weights), list(weights.values())
+    list_url = reverse('expense_list')
+    results = defaultdict(list)
+    try:
+        log_in(session, url, username, password)
+        status, content = session.get(list_url)
+        ids = set(EXPENSE_ID.findall(content))
+
+        start = time.time()
+        sent = 0
+        while (sent < requests) if requests else (time.time() < stop_at):
+            endpoint = rng.choices(endpoints, endpoint_weights)[0]
+            if endpoint in ('edit_expense', 'delete_expense') and not ids:
+                # Nothing known to change; the list shows what there is
+                endpoint = 'expense_list'
+            began = time.perf_counter()
+            if endpoint == 'expense_list':
+                status, content = session.get(list_url, list_filters(rng))
+                ids.update(EXPENSE_ID.findall(content))
+            elif endpoint == 'add_expense':
+                status, _ = session.post(reverse('add_expense'), expense_data(rng))
+            else:
+                pk = rng.choice(sorted(ids))
+                if endpoint == 'edit_expense':
+                    path, data = reverse('edit_expense', args=[pk]), expense_data(rng)
+                else:
+                    path, data = reverse('delete_expense', args=[pk]), {}
+                    ids.discard(pk)
+                status, _ = session.post(path, data)
+            results[endpoint].append((status, time.perf_counter() - began))
+            sent += 1
+        return dict(results), start, time.time()
+    finally:
+        session.close()
+
+
+def run_process(url, usernames, password, weights, stop_at, requests, threads, seed):
+    """
+    Run ``run_user`` for each of ``usernames`` on ``threads`` threads.
+    Returns the merged results and the earliest start and latest end.
+    """
+    def work(index):
+        return run_user(
+            url, usernames[index], password, weights, stop_at, requests, seed + index
+        )
+
+    with session_settings(url), ThreadPoolExecutor(threads) as executor:
+        runs = list(executor.map(work, range(len(usernames))))
+
+    merged = defaultdict(list)
+    for results, _, _ in runs:
+        for endpoint, samples in results.items():
+            merged[endpoint].extend(samples)
+    return dict(merged), min(run[1] for run in runs), max(run[2] for run in runs)
+
+
+class Command(BaseCommand):
+    help = 'Load test the expense pages in-process or against a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=5,
+            help='Seeded users (testuser1..N from generate_test_data) to log in as'
+        )
+        parser.add_argument(
+            '--password',
+            default='testpass123',
+            help='Password of the seeded users'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Concurrent users per process'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Processes, each running --threads users'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Seconds to run for'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Requests per thread, instead of running for --duration'
+        )
+        parser.add_argument(
+            '--mix',
+            default='list:70,add:10,edit:10,delete:10',
+            help='Relative weights of list, add, edit and delete requests'
+        )
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, e.g. http://127.0.0.1:8000 '
+                 '(requests run in this process when omitted)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed, for repeatable request sequences'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            weights = parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(str(error))
+        threads, processes = options['threads'], options['processes']
+        if min(options['users'], threads, processes) < 1:
+            raise CommandError('Users, threads and processes must be at least 1')
+        if options['requests'] is not None and options['requests'] < 1:
+            raise CommandError('Requests must be at least 1')
+        if options['requests'] is None and options['duration'] <= 0:
+            raise CommandError('Duration must be positive')
+
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        usernames = [
+            f'testuser{index % options["users"] + 1}' for index in range(threads * processes)
+        ]
+        target = options['url'] or 'in-process'
+        self.stdout.write(
+            f'Load testing {target} with {threads * processes} users '
+            f'({processes} x {threads} threads), seed {seed}...'
+        )
+        # A first login may rehash an outdated password hash, which logs out
+        # the user's other sessions, so get that over with before the run
+        with session_settings(options['url']):
+            for username in sorted(set(usernames)):
+                session = HTTPSession(options['url']) if options['url'] else ClientSession()
+                log_in(session, options['url'], username, options['password'])
+                session.close()
+
+        stop_at = time.time() + options['duration']
+        jobs = [
+            (options['url'], usernames[i * threads:(i + 1) * threads], options['password'],
+             weights, stop_at, options['requests'], threads, seed + i * threads)
+            for i in range(processes)
+        ]
+        if processes == 1:
+            runs = [run_process(*jobs[0])]
+        else:
+            # Children must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(processes, initializer=django.setup) as executor:
+                runs = list(executor.map(run_process, *zip(*jobs)))
+
+        results = defaultdict(list)
+        for merged, _, _ in runs:
+            for endpoint, samples in merged.items():
+                results[endpoint].extend(samples)
+        elapsed = max(run[2] for run in runs) - min(run[1] for run in runs)
+        self._report(results, elapsed)
+        self.stdout.write(self.style.SUCCESS('Load test complete'))
+
+    def _report(self, results, elapsed):
+        self.stdout.write(
+            f'{"endpoint":<16}{"requests":>9}{"req/s":>9}{"p50 ms":>10}'
+            f'{"p95 ms":>10}{"p99 ms":>10}  errors'
+        )
+        total = 0
+        for endpoint in ENDPOINTS:
+            samples = results.get(endpoint)
+            if not samples:
+                continue
+            total += len(samples)
+            latencies = [seconds for _, seconds in samples]
+            errors = Counter(
+                status for status, _ in samples if status != EXPECTED_STATUS[endpoint]
+            )
+            line = (
+                f'{endpoint:<16}{len(samples):>9}{len(samples) / elapsed:>9.1f}'
+                f'{percentile(latencies, 0.5) * 1000:>10.1f}'
+                f'{percentile(latencies, 0.95) * 1000:>10.1f}'
+                f'{percentile(latencies, 0.99) * 1000:>10.1f}  {sum(errors.values())}'
+            )
+            if errors:
+                line += ' (' + ', '.join(
+                    f'{status}: {count}' for status, count in sorted(errors.items(), key=lambda item: str(item[0]))
+                ) + ')'
+            self.stdout.write(line)
+        self.stdout.write(f'{"total":<16}{total:>9}{total / elapsed:>9.1f}  in {elapsed:.1f} s')
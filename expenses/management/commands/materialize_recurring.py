@@ -0,0 +1,43 @@
+"""
+Management command to generate due recurring expenses.
+Usage: python manage.py materialize_recurring [--date=YYYY-MM-DD] [--batch-size=500]
+
+Safe to run repeatedly and from several nodes at once (e.g. from cron).
+"""
+from django.core.management.base import BaseCommand, CommandError
+from datetime import date
+
+from expenses.recurring import materialize_recurring
+
+
+class Command(BaseCommand):
+    help = 'Generate expenses for all due recurring expense templates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Generate occurrences up to this date (default: today)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of templates to claim per transaction'
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f'Invalid date "{options["date"]}", expected YYYY-MM-DD')
+
+        templates, created = materialize_recurring(today, options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully generated {created} expenses from {templates} recurring templates'
+            )
+        )
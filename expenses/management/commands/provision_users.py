@@ -0,0 +1,113 @@
+"""
+Management command to create user accounts in bulk from a CSV file.
+Usage: python manage.py provision_users <file.csv> [--processes=4] [--batch-size=1000] [--chunk-size=50] [--dry-run]
+
+The file needs ``username`` and ``email`` columns and may have a
+``password`` column; accounts without a password must reset it before
+logging in. Rows whose username or email (ignoring case) is already taken
+are skipped and reported. Password hashing dominates the cost, so it is
+spread across a process pool while rows are inserted in batches.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import chain, islice
+import os
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.users import create_users, hash_passwords, read_user_rows, validate_user_rows
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def hash_batch(passwords, executor, chunk_size):
+    """Hash ``passwords`` here, or in chunks across ``executor`` if given."""
+    if executor is None:
+        return hash_passwords(passwords)
+    return list(chain.from_iterable(
+        executor.map(hash_passwords, batches(passwords, chunk_size))
+    ))
+
+
+class Command(BaseCommand):
+    help = 'Create user accounts in bulk from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file',
+            help='CSV file with username, email and optional password columns'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of processes hashing passwords'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows validated and inserted at a time'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Passwords handed to a hashing process at a time'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file without creating accounts'
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        batch_size = options['batch_size']
+        chunk_size = options['chunk_size']
+        if processes < 1 or batch_size < 1 or chunk_size < 1:
+            raise CommandError('--processes, --batch-size and --chunk-size must be at least 1')
+
+        try:
+            file = open(options['file'], newline='', encoding='utf-8-sig')
+        except OSError as error:
+            raise CommandError(f'Cannot read {options["file"]}: {error.strerror}')
+
+        # Children hash passwords only and never touch the database
+        executor = None
+        if processes > 1 and not options['dry_run']:
+            executor = ProcessPoolExecutor(processes, initializer=django.setup)
+
+        with file, executor or nullcontext():
+            try:
+                rows = read_user_rows(file)
+            except ValueError as error:
+                raise CommandError(str(error))
+            created, skipped = self._provision(rows, executor, options)
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {created} users, skipped {skipped}'
+        ))
+
+    def _provision(self, rows, executor, options):
+        """Validate and create ``rows`` in batches; returns (created, skipped)."""
+        batch_size = options['batch_size']
+        created = skipped = offset = 0
+        for batch in batches(rows, batch_size):
+            valid, invalid = validate_user_rows(batch)
+            for line, reason in invalid:
+                self.stdout.write(self.style.WARNING(f'Line {line + offset}: {reason}'))
+            skipped += len(invalid)
+            offset += len(batch)
+            if options['dry_run']:
+                created += len(valid)
+                continue
+            hashes = hash_batch([row['password'] for row in valid], executor, options['chunk_size'])
+            created += len(create_users(valid, hashes, batch_size=batch_size))
+        return created, skipped
@@ -0,0 +1,130 @@
+"""
+Management command to move users between expense shards.
+Usage: python manage.py rebalance_shards (--user=username --to=shard1 | --balance) [--max-users=50] [--dry-run]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db.models import Count
+
+from expenses.models import Expense
+from expenses.sharding import move_user, shard_aliases, shard_for_user, sharding_enabled
+
+
+def shard_loads():
+    """Expense count per user on every shard: {alias: {user_id: count}}."""
+    loads = {}
+    for alias in shard_aliases():
+        rows = (
+            Expense.objects.using(alias)
+            .values('user_id')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        # A user's rows only count where the shard map says they live
+        loads[alias] = {
+            row['user_id']: row['count'] for row in rows
+            if shard_for_user(row['user_id']) == alias
+        }
+    return loads
+
+
+def plan_moves(loads, max_users):
+    """
+    Greedy plan of (user_id, source, target, expenses): repeatedly move the
+    largest user from the fullest shard that still narrows the gap to the
+    emptiest one.
+    """
+    loads = {alias: dict(users) for alias, users in loads.items()}
+    totals = {alias: sum(users.values()) for alias, users in loads.items()}
+    moves = []
+    while len(moves) < max_users:
+        source = max(totals, key=totals.get)
+        target = min(totals, key=totals.get)
+        gap = totals[source] - totals[target]
+        candidates = [
+            (count, user_id) for user_id, count in loads[source].items()
+            if 0 < count < gap
+        ]
+        if not candidates:
+            break
+        # Best fit: the user closest to half the gap
+        count, user_id = min(candidates, key=lambda item: abs(gap - 2 * item[0]))
+        del loads[source][user_id]
+        loads[target][user_id] = count
+        totals[source] -= count
+        totals[target] += count
+        moves.append((user_id, source, target, count))
+    return moves
+
+
+class Command(BaseCommand):
+    help = 'Move users between expense shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username to move'
+        )
+        parser.add_argument(
+            '--to',
+            type=str,
+            help='Shard to move --user to'
+        )
+        parser.add_argument(
+            '--balance',
+            action='store_true',
+            help='Move users from the fullest shards to the emptiest ones'
+        )
+        parser.add_argument(
+            '--max-users',
+            type=int,
+            default=50,
+            help='Maximum number of users to move with --balance'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Expenses copied per insert'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the moves without making them'
+        )
+
+    def handle(self, *args, **options):
+        if not sharding_enabled():
+            raise CommandError('Sharding is not enabled (set EXPENSE_SHARDS)')
+
+        moves = [move for move in self._plan(options) if move[1] != move[2]]
+        if options['dry_run']:
+            for user_id, source, target, count in moves:
+                self.stdout.write(f'Would move user {user_id} ({count} expenses) {source} -> {target}')
+            self.stdout.write(self.style.WARNING(f'DRY RUN: {len(moves)} users would be moved'))
+            return
+
+        for move in moves:
+            self._move(*move, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully moved {len(moves)} users'))
+
+    def _plan(self, options):
+        """The (user_id, source, target, expenses) moves the options ask for."""
+        if options['user']:
+            if options['to'] not in shard_aliases():
+                raise CommandError(f'--to must be one of: {", ".join(shard_aliases())}')
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["user"]}" does not exist')
+            source = shard_for_user(user)
+            count = Expense.objects.using(source).filter(user=user).count()
+            return [(user.pk, source, options['to'], count)]
+        if options['balance']:
+            return plan_moves(shard_loads(), options['max_users'])
+        raise CommandError('Pass --user and --to, or --balance')
+
+    def _move(self, user_id, source, target, count, batch_size):
+        count = move_user(User.objects.get(pk=user_id), target, batch_size)
+        self.stdout.write(f'Moved user {user_id} ({count} expenses) {source} -> {target}')
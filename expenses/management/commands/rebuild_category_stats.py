@@ -0,0 +1,52 @@
+"""
+Management command to rebuild the running category statistics used for
+anomaly detection.
+Usage: python manage.py rebuild_category_stats [--user=username] [--rescore]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from expenses.anomalies import rebuild_category_stats, rescore_expenses
+from expenses.sharding import shard_aliases, shard_for_user
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-category expense statistics from the expense table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Only rebuild statistics for this username'
+        )
+        parser.add_argument(
+            '--rescore',
+            action='store_true',
+            help='Also re-flag existing expenses against the rebuilt statistics'
+        )
+
+    def handle(self, *args, **options):
+        username = options['user']
+        user_ids = None
+        aliases = shard_aliases()
+
+        if username:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" does not exist')
+            user_ids = [user.pk]
+            aliases = [shard_for_user(user)]
+
+        count = sum(rebuild_category_stats(user_ids=user_ids, using=alias) for alias in aliases)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {count} category statistics')
+        )
+
+        if options['rescore']:
+            flagged = sum(
+                rescore_expenses(user_ids=user_ids, using=alias) for alias in aliases
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f'Re-scored expenses, {flagged} flagged as unusual')
+            )
@@ -0,0 +1,39 @@
+"""
+Management command to rebuild the precomputed monthly expense totals.
+Usage: python manage.py rebuild_expense_totals [--user=username]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from expenses.aggregates import rebuild_monthly_totals
+from expenses.sharding import shard_aliases, shard_for_user
+
+
+class Command(BaseCommand):
+    help = 'Rebuild monthly expense totals from the expense table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Only rebuild totals for this username'
+        )
+
+    def handle(self, *args, **options):
+        username = options['user']
+        user_ids = None
+        aliases = shard_aliases()
+
+        if username:
+            try:
+                user = User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" does not exist')
+            user_ids = [user.pk]
+            aliases = [shard_for_user(user)]
+
+        count = sum(rebuild_monthly_totals(user_ids=user_ids, using=alias) for alias in aliases)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {count} monthly totals')
+        )
@@ -0,0 +1,145 @@
+"""
+Management command to process background jobs.
+Usage: python manage.py run_workers [--processes=2] [--threads=4] [--poll-interval=1] [--once]
+
+Each process runs ``--threads`` worker threads that claim jobs from the
+database queue, so no external broker is needed.
+"""
+import multiprocessing
+import signal
+import threading
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from expenses.jobs import requeue_stale, work
+
+
+def run_threads(threads, once, poll_interval):
+    """Run ``threads`` worker loops until stopped. Returns jobs processed."""
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        stop_event.set()
+
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            previous[signum] = signal.signal(signum, stop)
+
+    try:
+        if threads == 1:
+            return work(stop_event, once=once, poll_interval=poll_interval)
+
+        processed = []
+        workers = [
+            threading.Thread(
+                target=lambda: processed.append(
+                    work(stop_event, once=once, poll_interval=poll_interval)
+                ),
+                daemon=True,
+            )
+            for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return sum(processed)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+def run_process(threads, once, poll_interval):
+    django.setup()
+    run_threads(threads, once, poll_interval)
+
+
+def run_children(processes, threads, once, poll_interval):
+    """
+    Run ``processes`` worker processes until they exit. SIGTERM or Ctrl-C
+    stops them: each finishes its running jobs first.
+    """
+    # Children must not share the parent's database connections
+    connections.close_all()
+    children = [
+        multiprocessing.Process(target=run_process, args=(threads, once, poll_interval))
+        for _ in range(processes)
+    ]
+    for child in children:
+        child.start()
+
+    def stop(signum=None, frame=None):
+        for child in children:
+            if child.is_alive():
+                child.terminate()
+
+    # Installed after the fork so the children keep their own handlers
+    previous = signal.signal(signal.SIGTERM, stop)
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        stop()
+        for child in children:
+            child.join()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Number of worker processes'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=1,
+            help='Number of worker threads per process'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls of an empty queue'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        threads = options['threads']
+        once = options['once']
+        poll_interval = options['poll_interval']
+
+        if processes < 1 or threads < 1:
+            raise CommandError('--processes and --threads must be at least 1')
+
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale jobs'))
+
+        self.stdout.write(
+            f'Starting {processes} worker processes with {threads} threads each'
+        )
+
+        if processes == 1:
+            processed = run_threads(threads, once, poll_interval)
+            self.stdout.write(
+                self.style.SUCCESS(f'Successfully processed {processed} jobs')
+            )
+            return
+
+        run_children(processes, threads, once, poll_interval)
+        self.stdout.write(self.style.SUCCESS('All worker processes stopped'))
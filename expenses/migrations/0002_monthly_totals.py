@@ -0,0 +1,58 @@
+# Generated by Django 5.0.14 on 2026-10-19 10:08
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_monthly_totals(apps, schema_editor):
+    Expense = apps.get_model('expenses', 'Expense')
+    ExpenseMonthlyTotal = apps.get_model('expenses', 'ExpenseMonthlyTotal')
+    db_alias = schema_editor.connection.alias
+    rows = (
+        Expense.objects.using(db_alias)
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    ExpenseMonthlyTotal.objects.using(db_alias).bulk_create(
+        (ExpenseMonthlyTotal(**row) for row in rows),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseMonthlyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('category', models.CharField(choices=[('FOOD', 'Food & Dining'), ('TRANSPORT', 'Transportation'), ('SHOPPING', 'Shopping'), ('BILLS', 'Bills & Utilities'), ('ENTERTAINMENT', 'Entertainment'), ('HEALTHCARE', 'Healthcare'), ('EDUCATION', 'Education'), ('OTHER', 'Other')], help_text='The category of the expenses', max_length=50)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of expense amounts for the month', max_digits=14)),
+                ('count', models.IntegerField(default=0, help_text='Number of expenses for the month')),
+                ('user', models.ForeignKey(help_text='The user these totals belong to', on_delete=django.db.models.deletion.CASCADE, related_name='monthly_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Monthly Total',
+                'verbose_name_plural': 'Monthly Totals',
+                'db_table': 'expenses_monthly_total',
+                'indexes': [models.Index(fields=['month', 'category'], name='expenses_mo_month_6398ca_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='expensemonthlytotal',
+            constraint=models.UniqueConstraint(fields=('user', 'month', 'category'), name='unique_monthly_total'),
+        ),
+        migrations.RunPython(backfill_monthly_totals, migrations.RunPython.noop),
+    ]
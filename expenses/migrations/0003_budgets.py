@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-19 10:11
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0002_monthly_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Budget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('FOOD', 'Food & Dining'), ('TRANSPORT', 'Transportation'), ('SHOPPING', 'Shopping'), ('BILLS', 'Bills & Utilities'), ('ENTERTAINMENT', 'Entertainment'), ('HEALTHCARE', 'Healthcare'), ('EDUCATION', 'Education'), ('OTHER', 'Other')], help_text='The category this budget applies to', max_length=50)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Maximum spend per month', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(help_text='The user who set this budget', on_delete=django.db.models.deletion.CASCADE, related_name='budgets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Budget',
+                'verbose_name_plural': 'Budgets',
+                'db_table': 'expenses_budget',
+                'ordering': ['category'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='budget',
+            constraint=models.UniqueConstraint(fields=('user', 'category'), name='unique_budget_per_category'),
+        ),
+    ]
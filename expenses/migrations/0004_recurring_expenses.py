@@ -0,0 +1,56 @@
+# Generated by Django 5.0.14 on 2026-10-19 10:13
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_budgets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringExpense',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, help_text='The amount of each occurrence', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('category', models.CharField(choices=[('FOOD', 'Food & Dining'), ('TRANSPORT', 'Transportation'), ('SHOPPING', 'Shopping'), ('BILLS', 'Bills & Utilities'), ('ENTERTAINMENT', 'Entertainment'), ('HEALTHCARE', 'Healthcare'), ('EDUCATION', 'Education'), ('OTHER', 'Other')], default='BILLS', help_text='The category of each occurrence', max_length=50)),
+                ('description', models.TextField(blank=True, help_text='Description copied to each occurrence', max_length=500)),
+                ('frequency', models.CharField(choices=[('DAILY', 'Daily'), ('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly'), ('YEARLY', 'Yearly')], default='MONTHLY', help_text='How often the expense repeats', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Repeat every N periods', validators=[django.core.validators.MinValueValidator(1)])),
+                ('start_date', models.DateField(default=django.utils.timezone.now, help_text='Date of the first occurrence')),
+                ('end_date', models.DateField(blank=True, help_text='Optional date of the last occurrence', null=True)),
+                ('next_date', models.DateField(help_text='Date of the next occurrence to generate')),
+                ('is_active', models.BooleanField(default=True, help_text='Inactive templates no longer generate expenses')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(help_text='The user who owns this recurring expense', on_delete=django.db.models.deletion.CASCADE, related_name='recurring_expenses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Recurring Expense',
+                'verbose_name_plural': 'Recurring Expenses',
+                'db_table': 'expenses_recurring_expense',
+                'ordering': ['next_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='recurring',
+            field=models.ForeignKey(blank=True, help_text='The recurring expense this occurrence was generated from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='expenses.recurringexpense'),
+        ),
+        migrations.AddConstraint(
+            model_name='expense',
+            constraint=models.UniqueConstraint(fields=('recurring', 'date'), name='unique_recurring_occurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringexpense',
+            index=models.Index(fields=['is_active', 'next_date'], name='expenses_re_is_acti_b3a482_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.0.14 on 2026-10-19 10:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, StdDev
+
+
+def backfill_category_stats(apps, schema_editor):
+    Expense = apps.get_model('expenses', 'Expense')
+    CategoryStats = apps.get_model('expenses', 'CategoryStats')
+    db_alias = schema_editor.connection.alias
+    rows = (
+        Expense.objects.using(db_alias)
+        .values('user_id', 'category')
+        .annotate(count=Count('id'), mean=Avg('amount'), stddev=StdDev('amount'))
+        .order_by()
+    )
+    CategoryStats.objects.using(db_alias).bulk_create(
+        (
+            CategoryStats(
+                user_id=row['user_id'],
+                category=row['category'],
+                count=row['count'],
+                mean=float(row['mean']),
+                m2=float(row['stddev'] or 0) ** 2 * row['count'],
+            )
+            for row in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0005_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='anomaly_score',
+            field=models.FloatField(blank=True, help_text='Standard deviations from the category mean when saved', null=True),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='is_anomaly',
+            field=models.BooleanField(default=False, help_text='Amount is far outside the usual range for the category'),
+        ),
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('FOOD', 'Food & Dining'), ('TRANSPORT', 'Transportation'), ('SHOPPING', 'Shopping'), ('BILLS', 'Bills & Utilities'), ('ENTERTAINMENT', 'Entertainment'), ('HEALTHCARE', 'Healthcare'), ('EDUCATION', 'Education'), ('OTHER', 'Other')], help_text='The category of the expenses', max_length=50)),
+                ('count', models.IntegerField(default=0, help_text='Number of expenses')),
+                ('mean', models.FloatField(default=0.0, help_text='Mean expense amount')),
+                ('m2', models.FloatField(default=0.0, help_text='Sum of squared differences from the mean')),
+                ('user', models.ForeignKey(help_text='The user these statistics belong to', on_delete=django.db.models.deletion.CASCADE, related_name='category_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Category Statistics',
+                'verbose_name_plural': 'Category Statistics',
+                'db_table': 'expenses_category_stats',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='categorystats',
+            constraint=models.UniqueConstraint(fields=('user', 'category'), name='unique_category_stats'),
+        ),
+        migrations.RunPython(backfill_category_stats, migrations.RunPython.noop),
+    ]
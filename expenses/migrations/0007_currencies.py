@@ -0,0 +1,96 @@
+# Generated by Django 5.0.14 on 2026-10-19 10:22
+
+import django.core.validators
+import django.db.models.deletion
+import expenses.models
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0006_anomaly_detection'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(choices=[('GHS', 'Ghanaian Cedi'), ('USD', 'US Dollar'), ('EUR', 'Euro'), ('GBP', 'British Pound'), ('NGN', 'Nigerian Naira'), ('KES', 'Kenyan Shilling'), ('ZAR', 'South African Rand'), ('CAD', 'Canadian Dollar')], max_length=3)),
+                ('date', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=10, max_digits=20, validators=[django.core.validators.MinValueValidator(Decimal('1E-10'))])),
+            ],
+            options={
+                'verbose_name': 'Exchange Rate',
+                'verbose_name_plural': 'Exchange Rates',
+                'db_table': 'expenses_exchange_rate',
+                'ordering': ['-date', 'currency'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('home_currency', models.CharField(choices=[('GHS', 'Ghanaian Cedi'), ('USD', 'US Dollar'), ('EUR', 'Euro'), ('GBP', 'British Pound'), ('NGN', 'Nigerian Naira'), ('KES', 'Kenyan Shilling'), ('ZAR', 'South African Rand'), ('CAD', 'Canadian Dollar')], default=expenses.models.default_currency, help_text='Currency totals and budgets are shown in', max_length=3)),
+            ],
+            options={
+                'verbose_name': 'User Profile',
+                'verbose_name_plural': 'User Profiles',
+                'db_table': 'expenses_user_profile',
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='categorystats',
+            name='unique_category_stats',
+        ),
+        migrations.RemoveConstraint(
+            model_name='expensemonthlytotal',
+            name='unique_monthly_total',
+        ),
+        migrations.AddField(
+            model_name='categorystats',
+            name='currency',
+            field=models.CharField(choices=[('GHS', 'Ghanaian Cedi'), ('USD', 'US Dollar'), ('EUR', 'Euro'), ('GBP', 'British Pound'), ('NGN', 'Nigerian Naira'), ('KES', 'Kenyan Shilling'), ('ZAR', 'South African Rand'), ('CAD', 'Canadian Dollar')], default=expenses.models.default_currency, help_text='The currency of the expenses', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='currency',
+            field=models.CharField(choices=[('GHS', 'Ghanaian Cedi'), ('USD', 'US Dollar'), ('EUR', 'Euro'), ('GBP', 'British Pound'), ('NGN', 'Nigerian Naira'), ('KES', 'Kenyan Shilling'), ('ZAR', 'South African Rand'), ('CAD', 'Canadian Dollar')], default=expenses.models.default_currency, help_text='The currency of the amount', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='expensemonthlytotal',
+            name='currency',
+            field=models.CharField(choices=[('GHS', 'Ghanaian Cedi'), ('USD', 'US Dollar'), ('EUR', 'Euro'), ('GBP', 'British Pound'), ('NGN', 'Nigerian Naira'), ('KES', 'Kenyan Shilling'), ('ZAR', 'South African Rand'), ('CAD', 'Canadian Dollar')], default=expenses.models.default_currency, help_text='The currency of the expenses', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='recurringexpense',
+            name='currency',
+            field=models.CharField(choices=[('GHS', 'Ghanaian Cedi'), ('USD', 'US Dollar'), ('EUR', 'Euro'), ('GBP', 'British Pound'), ('NGN', 'Nigerian Naira'), ('KES', 'Kenyan Shilling'), ('ZAR', 'South African Rand'), ('CAD', 'Canadian Dollar')], default=expenses.models.default_currency, help_text='The currency of each occurrence', max_length=3),
+        ),
+        migrations.AlterField(
+            model_name='budget',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, help_text="Maximum spend per month, in the user's home currency", max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))]),
+        ),
+        migrations.AddConstraint(
+            model_name='categorystats',
+            constraint=models.UniqueConstraint(fields=('user', 'category', 'currency'), name='unique_category_stats'),
+        ),
+        migrations.AddConstraint(
+            model_name='expensemonthlytotal',
+            constraint=models.UniqueConstraint(fields=('user', 'month', 'category', 'currency'), name='unique_monthly_total'),
+        ),
+        migrations.AddConstraint(
+            model_name='exchangerate',
+            constraint=models.UniqueConstraint(fields=('currency', 'date'), name='unique_exchange_rate'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='expense_profile', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-19 10:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('expenses', '0007_currencies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='expense_shard', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('alias', models.CharField(help_text='Database alias from EXPENSE_SHARDS', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User Shard',
+                'verbose_name_plural': 'User Shards',
+                'db_table': 'expenses_user_shard',
+                'indexes': [models.Index(fields=['alias'], name='expenses_us_alias_956617_idx')],
+            },
+        ),
+    ]
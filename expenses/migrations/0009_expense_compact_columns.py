@@ -0,0 +1,168 @@
+# Generated by Django 5.0.14 on 2026-10-19 11:02
+#
+# Expand step of the compact expense storage rollout (see README): add
+# amount_minor/category_code next to amount/category and keep both pairs
+# in sync with triggers, so old and new code can run side by side.
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+CATEGORY_CODES = {
+    'FOOD': 1,
+    'TRANSPORT': 2,
+    'SHOPPING': 3,
+    'BILLS': 4,
+    'ENTERTAINMENT': 5,
+    'HEALTHCARE': 6,
+    'EDUCATION': 7,
+    'OTHER': 8,
+}
+
+
+def code_sql(column):
+    whens = ' '.join(f"WHEN '{value}' THEN {code}" for value, code in CATEGORY_CODES.items())
+    return f'CASE {column} {whens} END'
+
+
+def value_sql(column):
+    whens = ' '.join(f"WHEN {code} THEN '{value}'" for value, code in CATEGORY_CODES.items())
+    return f'CASE {column} {whens} END'
+
+
+def postgresql_triggers():
+    return [
+        f"""
+        CREATE OR REPLACE FUNCTION expenses_expense_compact_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                IF NEW.amount_minor IS NULL THEN
+                    NEW.amount_minor := ROUND(NEW.amount * 100);
+                    NEW.category_code := {code_sql('NEW.category')};
+                ELSIF NEW.amount IS NULL THEN
+                    NEW.amount := NEW.amount_minor / 100.0;
+                    NEW.category := {value_sql('NEW.category_code')};
+                END IF;
+            ELSIF NEW.amount IS DISTINCT FROM OLD.amount
+                    OR NEW.category IS DISTINCT FROM OLD.category THEN
+                NEW.amount_minor := ROUND(NEW.amount * 100);
+                NEW.category_code := {code_sql('NEW.category')};
+            ELSIF NEW.amount_minor IS DISTINCT FROM OLD.amount_minor
+                    OR NEW.category_code IS DISTINCT FROM OLD.category_code THEN
+                NEW.amount := NEW.amount_minor / 100.0;
+                NEW.category := {value_sql('NEW.category_code')};
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER expenses_expense_compact_sync
+        BEFORE INSERT OR UPDATE ON expenses_expense
+        FOR EACH ROW EXECUTE FUNCTION expenses_expense_compact_sync()
+        """,
+    ]
+
+
+def sqlite_triggers():
+    mismatch = (
+        f"(NEW.amount_minor IS NOT CAST(ROUND(NEW.amount * 100) AS INTEGER) "
+        f"OR NEW.category_code IS NOT {code_sql('NEW.category')})"
+    )
+    return [
+        f"""
+        CREATE TRIGGER expenses_expense_compact_insert
+        AFTER INSERT ON expenses_expense
+        WHEN NEW.amount_minor IS NULL OR NEW.amount IS NULL
+        BEGIN
+            UPDATE expenses_expense SET
+                amount_minor = COALESCE(amount_minor, CAST(ROUND(amount * 100) AS INTEGER)),
+                category_code = COALESCE(category_code, {code_sql('category')}),
+                amount = COALESCE(amount, amount_minor / 100.0),
+                category = COALESCE(category, {value_sql('category_code')})
+            WHERE id = NEW.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER expenses_expense_compact_update_old
+        AFTER UPDATE OF amount, category ON expenses_expense
+        WHEN {mismatch}
+            AND NEW.amount_minor IS OLD.amount_minor AND NEW.category_code IS OLD.category_code
+        BEGIN
+            UPDATE expenses_expense SET
+                amount_minor = CAST(ROUND(amount * 100) AS INTEGER),
+                category_code = {code_sql('category')}
+            WHERE id = NEW.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER expenses_expense_compact_update_new
+        AFTER UPDATE OF amount_minor, category_code ON expenses_expense
+        WHEN {mismatch}
+            AND NEW.amount IS OLD.amount AND NEW.category IS OLD.category
+        BEGIN
+            UPDATE expenses_expense SET
+                amount = amount_minor / 100.0,
+                category = {value_sql('category_code')}
+            WHERE id = NEW.id;
+        END
+        """,
+    ]
+
+
+def drop_triggers_sql(vendor):
+    if vendor == 'postgresql':
+        return [
+            'DROP TRIGGER IF EXISTS expenses_expense_compact_sync ON expenses_expense',
+            'DROP FUNCTION IF EXISTS expenses_expense_compact_sync()',
+        ]
+    if vendor == 'sqlite':
+        return [
+            f'DROP TRIGGER IF EXISTS expenses_expense_compact_{name}'
+            for name in ('insert', 'update_old', 'update_new')
+        ]
+    return []
+
+
+def create_sync_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': postgresql_triggers, 'sqlite': sqlite_triggers}.get(vendor)
+    for statement in statements() if statements else []:
+        schema_editor.execute(statement, None)
+
+
+def drop_sync_triggers(apps, schema_editor):
+    for statement in drop_triggers_sql(schema_editor.connection.vendor):
+        schema_editor.execute(statement, None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0008_user_shards'),
+    ]
+
+    operations = [
+        # Code written for the compact columns no longer fills these in
+        migrations.AlterField(
+            model_name='expense',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, help_text='The expense amount (must be positive)', max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))]),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='category',
+            field=models.CharField(choices=[('FOOD', 'Food & Dining'), ('TRANSPORT', 'Transportation'), ('SHOPPING', 'Shopping'), ('BILLS', 'Bills & Utilities'), ('ENTERTAINMENT', 'Entertainment'), ('HEALTHCARE', 'Healthcare'), ('EDUCATION', 'Education'), ('OTHER', 'Other')], db_index=True, default='OTHER', help_text='The category of the expense', max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='amount_minor',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='category_code',
+            field=models.SmallIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_sync_triggers, drop_sync_triggers),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.14 on 2026-10-19 11:04
+#
+# Backfill the compact expense columns in short batches, each committed on
+# its own, while the application keeps running.
+
+from django.db import migrations, models
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Cast, Round
+
+BATCH_SIZE = 5000
+
+CATEGORY_CODES = {
+    'FOOD': 1,
+    'TRANSPORT': 2,
+    'SHOPPING': 3,
+    'BILLS': 4,
+    'ENTERTAINMENT': 5,
+    'HEALTHCARE': 6,
+    'EDUCATION': 7,
+    'OTHER': 8,
+}
+
+
+def backfill_compact_columns(apps, schema_editor):
+    Expense = apps.get_model('expenses', 'Expense')
+    expenses = Expense.objects.using(schema_editor.connection.alias)
+    category_code = Case(
+        *[When(category=value, then=Value(code)) for value, code in CATEGORY_CODES.items()],
+        output_field=models.SmallIntegerField(),
+    )
+    last_pk = 0
+    while True:
+        pks = list(
+            expenses.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not pks:
+            break
+        last_pk = pks[-1]
+        expenses.filter(pk__gte=pks[0], pk__lte=last_pk, amount_minor__isnull=True).update(
+            amount_minor=Cast(Round(F('amount') * 100), models.BigIntegerField()),
+            category_code=category_code,
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('expenses', '0009_expense_compact_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_compact_columns, migrations.RunPython.noop),
+    ]
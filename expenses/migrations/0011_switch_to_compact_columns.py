@@ -0,0 +1,61 @@
+# Generated by Django 5.0.14 on 2026-10-19 11:06
+#
+# Switch Expense.amount and Expense.category to the compact columns. Only
+# Django's model state changes here, plus the (user, category) index on the
+# new column; the old columns and the sync triggers stay until 0012. The
+# index is built without blocking writes on PostgreSQL.
+
+import django.core.validators
+import expenses.fields
+from decimal import Decimal
+from django.db import migrations, models
+
+from expenses.operations import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('expenses', '0010_backfill_compact_columns'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                AddIndexOnline(
+                    model_name='expense',
+                    index=models.Index(fields=['user', 'category_code'], name='expenses_ex_user_id_b4409f_idx'),
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='expense',
+                    name='expenses_ex_user_id_207090_idx',
+                ),
+                migrations.RemoveField(
+                    model_name='expense',
+                    name='amount_minor',
+                ),
+                migrations.RemoveField(
+                    model_name='expense',
+                    name='category_code',
+                ),
+                migrations.AlterField(
+                    model_name='expense',
+                    name='amount',
+                    field=expenses.fields.MoneyField(db_column='amount_minor', help_text='The expense amount (must be positive), stored in minor units', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))]),
+                ),
+                migrations.AlterField(
+                    model_name='expense',
+                    name='category',
+                    field=expenses.fields.ChoiceCodeField(choices=[('FOOD', 'Food & Dining'), ('TRANSPORT', 'Transportation'), ('SHOPPING', 'Shopping'), ('BILLS', 'Bills & Utilities'), ('ENTERTAINMENT', 'Entertainment'), ('HEALTHCARE', 'Healthcare'), ('EDUCATION', 'Education'), ('OTHER', 'Other')], codes={'BILLS': 4, 'EDUCATION': 7, 'ENTERTAINMENT': 5, 'FOOD': 1, 'HEALTHCARE': 6, 'OTHER': 8, 'SHOPPING': 3, 'TRANSPORT': 2}, db_column='category_code', default='OTHER', help_text='The category of the expense, stored as a code'),
+                ),
+                migrations.AddIndex(
+                    model_name='expense',
+                    index=models.Index(fields=['user', 'category'], name='expenses_ex_user_id_b4409f_idx'),
+                ),
+            ],
+        ),
+    ]
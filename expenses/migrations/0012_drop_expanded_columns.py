@@ -0,0 +1,62 @@
+# Generated by Django 5.0.14 on 2026-10-19 11:08
+#
+# Contract step of the compact expense storage rollout: once no code reads
+# or writes the old amount/category columns, drop them with their indexes
+# and the sync triggers. Apply only after every instance runs code from
+# 0011 onwards. Irreversible.
+
+from django.db import migrations
+
+OLD_COLUMNS = {'amount', 'category'}
+
+
+def drop_old_columns(apps, schema_editor):
+    connection = schema_editor.connection
+    table = 'expenses_expense'
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS expenses_expense_compact_sync ON {table}', None)
+        schema_editor.execute('DROP FUNCTION IF EXISTS expenses_expense_compact_sync()', None)
+    elif connection.vendor == 'sqlite':
+        for name in ('insert', 'update_old', 'update_new'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS expenses_expense_compact_{name}', None)
+
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    for name, info in constraints.items():
+        if info['index'] and not info['primary_key'] and OLD_COLUMNS & set(info['columns']):
+            schema_editor.execute(f'DROP INDEX {schema_editor.quote_name(name)}', None)
+    for column in sorted(OLD_COLUMNS):
+        schema_editor.execute(
+            f'ALTER TABLE {table} DROP COLUMN {schema_editor.quote_name(column)}', None
+        )
+
+    if connection.vendor == 'postgresql':
+        # Validate under a weak lock first so SET NOT NULL skips the scan;
+        # SQLite cannot tighten a column without rebuilding the table
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT expenses_expense_compact_not_null '
+            f'CHECK (amount_minor IS NOT NULL AND category_code IS NOT NULL) NOT VALID', None
+        )
+        schema_editor.execute(
+            f'ALTER TABLE {table} VALIDATE CONSTRAINT expenses_expense_compact_not_null', None
+        )
+        schema_editor.execute(
+            f'ALTER TABLE {table} ALTER COLUMN amount_minor SET NOT NULL, '
+            f'ALTER COLUMN category_code SET NOT NULL', None
+        )
+        schema_editor.execute(
+            f'ALTER TABLE {table} DROP CONSTRAINT expenses_expense_compact_not_null', None
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('expenses', '0011_switch_to_compact_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_old_columns),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.14 on 2026-10-19 11:06
+#
+# Replace the Expense indexes with one per ExpenseListView filter shape.
+# The new indexes are built before the old ones are dropped so the list
+# query always has an index to use.
+# On PostgreSQL indexes are built and dropped without blocking writes.
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from expenses.operations import AddIndexOnline, RemoveIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('expenses', '0012_drop_expanded_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='expense',
+            index=models.Index(fields=['user', '-date', '-created_at'], name='expenses_ex_user_id_19a12b_idx'),
+        ),
+        AddIndexOnline(
+            model_name='expense',
+            index=models.Index(fields=['user', 'category', '-date', '-created_at'], name='expenses_ex_user_id_4789fc_idx'),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='user',
+            field=models.ForeignKey(db_index=False, help_text='The user who created this expense', on_delete=django.db.models.deletion.CASCADE, related_name='expenses', to=settings.AUTH_USER_MODEL),
+        ),
+        RemoveIndexOnline(
+            model_name='expense',
+            name='expenses_ex_date_840b41_idx',
+        ),
+        RemoveIndexOnline(
+            model_name='expense',
+            name='expenses_ex_user_id_4af51e_idx',
+        ),
+        RemoveIndexOnline(
+            model_name='expense',
+            name='expenses_ex_user_id_b4409f_idx',
+        ),
+    ]
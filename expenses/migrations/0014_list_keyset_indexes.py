@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-19 11:17
+#
+# Extend the list indexes with the id tie-breaker used by keyset batches.
+# New indexes are built before the old ones are dropped.
+# On PostgreSQL indexes are built and dropped without blocking writes.
+
+from django.conf import settings
+from django.db import migrations, models
+
+from expenses.operations import AddIndexOnline, RemoveIndexOnline
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('expenses', '0013_list_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='expense',
+            index=models.Index(fields=['user', '-date', '-created_at', '-id'], name='expenses_ex_user_id_d6bb84_idx'),
+        ),
+        AddIndexOnline(
+            model_name='expense',
+            index=models.Index(fields=['user', 'category', '-date', '-created_at', '-id'], name='expenses_ex_user_id_1d1539_idx'),
+        ),
+        RemoveIndexOnline(
+            model_name='expense',
+            name='expenses_ex_user_id_19a12b_idx',
+        ),
+        RemoveIndexOnline(
+            model_name='expense',
+            name='expenses_ex_user_id_4789fc_idx',
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:02
+#
+# Case-insensitive unique index on auth_user.email, so signup checks are
+# answered from an index. Accounts without an email are not constrained.
+# auth.User belongs to another app, so the index is created directly
+# instead of through the model state.
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
+
+EMAIL_UNIQUE = models.UniqueConstraint(
+    Lower('email'), condition=~Q(email=''), name='auth_user_email_ci_unique'
+)
+
+
+def add_email_index(apps, schema_editor):
+    # Users on shards are copies; the primary enforces uniqueness
+    if schema_editor.connection.alias != DEFAULT_DB_ALIAS:
+        return
+    User = apps.get_model('auth', 'User')
+    duplicates = list(
+        User.objects.using(DEFAULT_DB_ALIAS)
+        .exclude(email='')
+        .values(key=Lower('email'))
+        .annotate(accounts=Count('id'))
+        .filter(accounts__gt=1)
+        .values_list('key', flat=True)[:10]
+    )
+    if duplicates:
+        raise IntegrityError(
+            'Merge or change accounts sharing an email address before migrating: '
+            + ', '.join(duplicates)
+        )
+    schema_editor.add_constraint(User, EMAIL_UNIQUE)
+
+
+def remove_email_index(apps, schema_editor):
+    if schema_editor.connection.alias != DEFAULT_DB_ALIAS:
+        return
+    schema_editor.remove_constraint(apps.get_model('auth', 'User'), EMAIL_UNIQUE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0014_list_keyset_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0015_user_email_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usershard',
+            name='moving_until',
+            field=models.DateTimeField(blank=True, help_text='Writes are refused until then while the data is being moved', null=True),
+        ),
+    ]
@@ -1,9 +1,15 @@
+import calendar
+from datetime import date, timedelta
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from decimal import Decimal
 
+from .fields import ChoiceCodeField, MoneyField
+
 
 class ExpenseCategory(models.TextChoices):
     """Choices for expense categories."""
@@ -15,8 +21,67 @@ class ExpenseCategory(models.TextChoices):
     HEALTHCARE = 'HEALTHCARE', 'Healthcare'
     EDUCATION = 'EDUCATION', 'Education'
     OTHER = 'OTHER', 'Other'
+
+
+# Stored codes of the categories in Expense.category; never renumber
+CATEGORY_STORAGE_CODES = {
+    'FOOD': 1,
+    'TRANSPORT': 2,
+    'SHOPPING': 3,
+    'BILLS': 4,
+    'ENTERTAINMENT': 5,
+    'HEALTHCARE': 6,
+    'EDUCATION': 7,
+    'OTHER': 8,
+}
     
     
+class Currency(models.TextChoices):
+    """Supported ISO 4217 currencies."""
+    GHS = 'GHS', 'Ghanaian Cedi'
+    USD = 'USD', 'US Dollar'
+    EUR = 'EUR', 'Euro'
+    GBP = 'GBP', 'British Pound'
+    NGN = 'NGN', 'Nigerian Naira'
+    KES = 'KES', 'Kenyan Shilling'
+    ZAR = 'ZAR', 'South African Rand'
+    CAD = 'CAD', 'Canadian Dollar'
+
+
+CURRENCY_SYMBOLS = {
+    Currency.GHS: '₵',
+    Currency.USD: '$',
+    Currency.EUR: '€',
+    Currency.GBP: '£',
+    Currency.NGN: '₦',
+    Currency.KES: 'KSh',
+    Currency.ZAR: 'R',
+    Currency.CAD: 'C$',
+}
+
+
+def default_currency():
+    return settings.DEFAULT_CURRENCY
+
+
+def currency_symbol(currency):
+    """Display symbol for ``currency``, falling back to its code."""
+    return CURRENCY_SYMBOLS.get(currency, f'{currency} ')
+
+
+class UserDataQuerySet(models.QuerySet):
+    """
+    Queryset for per-user rows. Without an explicit database, ``create()``
+    lets the router pick one from the new row itself, so the row lands on
+    its user's shard when sharding is enabled.
+    """
+
+    def create(self, **kwargs):
+        if self._db is not None:
+            return super().create(**kwargs)
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+        return obj
 
 
 class Expense(models.Model):
@@ -25,20 +90,28 @@ class Expense(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='expenses',
+        db_index=False,
         help_text='The user who created this expense'
     )
-    amount = models.DecimalField(
+    amount = MoneyField(
         max_digits=10,
         decimal_places=2,
+        db_column='amount_minor',
         validators=[MinValueValidator(Decimal('0.01'))],
-        help_text='The expense amount (must be positive)'
+        help_text='The expense amount (must be positive), stored in minor units'
     )
-    category = models.CharField(
-        max_length=50,
+    currency = models.CharField(
+        max_length=3,
+        choices=Currency.choices,
+        default=default_currency,
+        help_text='The currency of the amount'
+    )
+    category = ChoiceCodeField(
+        codes=CATEGORY_STORAGE_CODES,
         choices=ExpenseCategory.choices,
         default=ExpenseCategory.OTHER,
-        db_index=True,
-        help_text='The category of the expense'
+        db_column='category_code',
+        help_text='The category of the expense, stored as a code'
     )
     date = models.DateField(
         default=timezone.now,
@@ -58,23 +131,507 @@ class Expense(models.Model):
         auto_now=True,
         help_text='When this expense record was last updated'
     )
+    recurring = models.ForeignKey(
+        'RecurringExpense',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        help_text='The recurring expense this occurrence was generated from'
+    )
+    is_anomaly = models.BooleanField(
+        default=False,
+        help_text='Amount is far outside the usual range for the category'
+    )
+    anomaly_score = models.FloatField(
+        null=True,
+        blank=True,
+        help_text='Standard deviations from the category mean when saved'
+    )
+
+    objects = UserDataQuerySet.as_manager()
 
     class Meta:
         ordering = ['-date', '-created_at']
+        # One index per filter shape of ExpenseListView, each ending in the
+        # keyset order of its batches (expenses/cursors.py) so rows are read
+        # in index order without a sort. Both lead with user, so the plain
+        # foreign key index is left out. Checked by expenses/query_plans.py
+        # and test_query_plans.py.
         indexes = [
-            models.Index(fields=['-date', '-created_at']),
-            models.Index(fields=['user', '-date']),
-            models.Index(fields=['user', 'category']),
+            models.Index(fields=['user', '-date', '-created_at', '-id']),
+            models.Index(fields=['user', 'category', '-date', '-created_at', '-id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recurring', 'date'],
+                name='unique_recurring_occurrence'
+            ),
         ]
         verbose_name = 'Expense'
         verbose_name_plural = 'Expenses'
         db_table = 'expenses_expense'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember loaded values so derived data can be updated on save."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
-        return f"{self.user.username} - ${self.amount} ({self.get_category_display()})"
+        return (
+            f"{self.user.username} - {currency_symbol(self.currency)}{self.amount} "
+            f"({self.get_category_display()})"
+        )
 
     def __repr__(self):
         return (
             f"<Expense(id={self.id}, user={self.user.username}, "
             f"amount={self.amount}, category={self.category}, date={self.date})>"
         )
+
+
+class ExpenseMonthlyTotal(models.Model):
+    """
+    Running per-user, per-category monthly totals.
+    Maintained incrementally on every expense write so reports never
+    need to scan the expense table.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='monthly_totals',
+        help_text='The user these totals belong to'
+    )
+    month = models.DateField(
+        help_text='First day of the month'
+    )
+    category = models.CharField(
+        max_length=50,
+        choices=ExpenseCategory.choices,
+        help_text='The category of the expenses'
+    )
+    currency = models.CharField(
+        max_length=3,
+        choices=Currency.choices,
+        default=default_currency,
+        help_text='The currency of the expenses'
+    )
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Sum of expense amounts for the month'
+    )
+    count = models.IntegerField(
+        default=0,
+        help_text='Number of expenses for the month'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'month', 'category', 'currency'],
+                name='unique_monthly_total'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['month', 'category']),
+        ]
+        verbose_name = 'Monthly Total'
+        verbose_name_plural = 'Monthly Totals'
+        db_table = 'expenses_monthly_total'
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.category}: {self.total} {self.currency}"
+
+
+class CategoryStats(models.Model):
+    """
+    Running amount statistics per user, category and currency (Welford's
+    algorithm), maintained incrementally on every expense write.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='category_stats',
+        help_text='The user these statistics belong to'
+    )
+    category = models.CharField(
+        max_length=50,
+        choices=ExpenseCategory.choices,
+        help_text='The category of the expenses'
+    )
+    currency = models.CharField(
+        max_length=3,
+        choices=Currency.choices,
+        default=default_currency,
+        help_text='The currency of the expenses'
+    )
+    count = models.IntegerField(default=0, help_text='Number of expenses')
+    mean = models.FloatField(default=0.0, help_text='Mean expense amount')
+    m2 = models.FloatField(
+        default=0.0,
+        help_text='Sum of squared differences from the mean'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'currency'], name='unique_category_stats'
+            ),
+        ]
+        verbose_name = 'Category Statistics'
+        verbose_name_plural = 'Category Statistics'
+        db_table = 'expenses_category_stats'
+
+    def __str__(self):
+        return (
+            f"{self.user.username} - {self.category} ({self.currency}): "
+            f"n={self.count} mean={self.mean:.2f}"
+        )
+
+
+class Budget(models.Model):
+    """Monthly spending limit for one category."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='budgets',
+        help_text='The user who set this budget'
+    )
+    category = models.CharField(
+        max_length=50,
+        choices=ExpenseCategory.choices,
+        help_text='The category this budget applies to'
+    )
+    amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        help_text="Maximum spend per month, in the user's home currency"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UserDataQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['category']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category'],
+                name='unique_budget_per_category'
+            ),
+        ]
+        verbose_name = 'Budget'
+        verbose_name_plural = 'Budgets'
+        db_table = 'expenses_budget'
+
+    def __str__(self):
+        return f"{self.user.username} - {self.get_category_display()}: {self.amount}/month"
+
+
+class UserProfile(models.Model):
+    """Per-user preferences."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='expense_profile',
+    )
+    home_currency = models.CharField(
+        max_length=3,
+        choices=Currency.choices,
+        default=default_currency,
+        help_text='Currency totals and budgets are shown in'
+    )
+
+    class Meta:
+        verbose_name = 'User Profile'
+        verbose_name_plural = 'User Profiles'
+        db_table = 'expenses_user_profile'
+
+    def __str__(self):
+        return f"{self.user.username} ({self.home_currency})"
+
+
+class ExchangeRate(models.Model):
+    """
+    Daily exchange rate: units of ``currency`` per one unit of
+    ``FX_BASE_CURRENCY``.
+    """
+
+    currency = models.CharField(
+        max_length=3,
+        choices=Currency.choices,
+    )
+    date = models.DateField()
+    rate = models.DecimalField(
+        max_digits=20,
+        decimal_places=10,
+        validators=[MinValueValidator(Decimal('0.0000000001'))],
+    )
+
+    class Meta:
+        ordering = ['-date', 'currency']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['currency', 'date'],
+                name='unique_exchange_rate'
+            ),
+        ]
+        verbose_name = 'Exchange Rate'
+        verbose_name_plural = 'Exchange Rates'
+        db_table = 'expenses_exchange_rate'
+
+    def __str__(self):
+        return f"{self.currency} {self.rate} ({self.date})"
+
+
+class RecurrenceFrequency(models.TextChoices):
+    """Choices for how often a recurring expense repeats."""
+    DAILY = 'DAILY', 'Daily'
+    WEEKLY = 'WEEKLY', 'Weekly'
+    MONTHLY = 'MONTHLY', 'Monthly'
+    YEARLY = 'YEARLY', 'Yearly'
+
+
+def add_months(value, months):
+    """Add ``months`` to ``value``, clamping the day to the month's length."""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+class RecurringExpense(models.Model):
+    """Template for an expense that repeats on a schedule."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recurring_expenses',
+        help_text='The user who owns this recurring expense'
+    )
+    amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        help_text='The amount of each occurrence'
+    )
+    currency = models.CharField(
+        max_length=3,
+        choices=Currency.choices,
+        default=default_currency,
+        help_text='The currency of each occurrence'
+    )
+    category = models.CharField(
+        max_length=50,
+        choices=ExpenseCategory.choices,
+        default=ExpenseCategory.BILLS,
+        help_text='The category of each occurrence'
+    )
+    description = models.TextField(
+        blank=True,
+        max_length=500,
+        help_text='Description copied to each occurrence'
+    )
+    frequency = models.CharField(
+        max_length=10,
+        choices=RecurrenceFrequency.choices,
+        default=RecurrenceFrequency.MONTHLY,
+        help_text='How often the expense repeats'
+    )
+    interval = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text='Repeat every N periods'
+    )
+    start_date = models.DateField(
+        default=timezone.now,
+        help_text='Date of the first occurrence'
+    )
+    end_date = models.DateField(
+        null=True,
+        blank=True,
+        help_text='Optional date of the last occurrence'
+    )
+    next_date = models.DateField(
+        help_text='Date of the next occurrence to generate'
+    )
+    is_active = models.BooleanField(
+        default=True,
+        help_text='Inactive templates no longer generate expenses'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UserDataQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['next_date']
+        indexes = [
+            models.Index(fields=['is_active', 'next_date']),
+        ]
+        verbose_name = 'Recurring Expense'
+        verbose_name_plural = 'Recurring Expenses'
+        db_table = 'expenses_recurring_expense'
+
+    def __str__(self):
+        return (
+            f"{self.user.username} - {self.amount} "
+            f"{self.get_frequency_display().lower()} ({self.get_category_display()})"
+        )
+
+    def save(self, *args, **kwargs):
+        if self.next_date is None:
+            self.next_date = self.start_date
+        super().save(*args, **kwargs)
+
+    def occurrence(self, index):
+        """Date of the ``index``-th occurrence, anchored on ``start_date``."""
+        start = self.start_date
+        step = index * self.interval
+        if self.frequency == RecurrenceFrequency.DAILY:
+            return start + timedelta(days=step)
+        if self.frequency == RecurrenceFrequency.WEEKLY:
+            return start + timedelta(weeks=step)
+        if self.frequency == RecurrenceFrequency.MONTHLY:
+            return add_months(start, step)
+        return add_months(start, step * 12)
+
+    def occurrence_index(self, value):
+        """Index of the first occurrence on or after ``value``."""
+        start = self.start_date
+        if value <= start:
+            return 0
+        if self.frequency == RecurrenceFrequency.DAILY:
+            return -(-(value - start).days // self.interval)
+        if self.frequency == RecurrenceFrequency.WEEKLY:
+            return -(-(value - start).days // (7 * self.interval))
+        months = (value.year - start.year) * 12 + value.month - start.month
+        unit = self.interval * (12 if self.frequency == RecurrenceFrequency.YEARLY else 1)
+        index = max(months // unit - 1, 0)
+        while self.occurrence(index) < value:
+            index += 1
+        return index
+
+    def due_dates(self, until):
+        """
+        Occurrence dates from ``next_date`` through ``until`` (inclusive),
+        and the next date after them.
+        """
+        last = min(until, self.end_date) if self.end_date else until
+        index = self.occurrence_index(self.next_date)
+        dates = []
+        current = self.occurrence(index)
+        while current <= last:
+            dates.append(current)
+            index += 1
+            current = self.occurrence(index)
+        return dates, current
+
+
+class JobStatus(models.TextChoices):
+    """Lifecycle states of a background job."""
+    QUEUED = 'QUEUED', 'Queued'
+    RUNNING = 'RUNNING', 'Running'
+    SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+    FAILED = 'FAILED', 'Failed'
+
+
+class Job(models.Model):
+    """A unit of background work stored in the database queue."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        help_text='The user who requested the job, if any'
+    )
+    kind = models.CharField(
+        max_length=100,
+        help_text='Registered handler that runs the job'
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Keyword arguments passed to the handler'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=JobStatus.choices,
+        default=JobStatus.QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        help_text='The job is not picked up before this time'
+    )
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['user', '-created_at']),
+        ]
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        db_table = 'expenses_job'
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+class UserShard(models.Model):
+    """
+    Database alias holding a user's expense data when sharding is enabled.
+    Always stored on the primary database.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='expense_shard',
+    )
+    alias = models.CharField(
+        max_length=64,
+        help_text='Database alias from EXPENSE_SHARDS'
+    )
+    moving_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Writes are refused until then while the data is being moved'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['alias']),
+        ]
+        verbose_name = 'User Shard'
+        verbose_name_plural = 'User Shards'
+        db_table = 'expenses_user_shard'
+
+    def __str__(self):
+        return f"{self.user.username} -> {self.alias}"
@@ -0,0 +1,109 @@
+"""
+Password hashing off the request thread.
+
+PBKDF2 is slow by design, so a burst of logins or signups can occupy every
+worker on CPU while other pages wait. The async login and signup views hash
+through a ``HashingPool``: a small per-process thread pool (``hashlib``
+releases the GIL, so hashes run in parallel with other requests) that runs
+at most ``AUTH_HASH_THREADS`` hashes at once and lets at most
+``AUTH_HASH_MAX_PENDING`` more wait. Beyond that ``HashingBusy`` is raised
+and the view answers 503 at once instead of queueing behind the storm.
+Under ASGI the event loop keeps serving other requests meanwhile; under
+WSGI the request waits, but the CPU a process spends hashing is capped.
+``AUTH_HASH_THREADS = 0`` hashes on the request's sync thread instead.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections
+
+
+class HashingBusy(Exception):
+    """Too many password hashes are already running or waiting."""
+
+
+class HashingPool:
+    """Bounded thread pool for password hashing, one per process."""
+
+    def __init__(self, threads, max_pending):
+        self.threads = threads
+        self.max_pending = max_pending
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def executor(self):
+        # A forked gunicorn worker must not reuse its parent's threads
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix='hashing')
+                self._pid = os.getpid()
+            return self._executor
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def run(self, func, *args):
+        """Run ``func(*args)`` in the pool, or raise ``HashingBusy``."""
+        if not self.threads:
+            # Inline, but still off the event loop: ``func`` may query the database
+            return await sync_to_async(func)(*args)
+        with self._lock:
+            if self.pending >= self.threads + self.max_pending:
+                raise HashingBusy
+            self.pending += 1
+        try:
+            return await asyncio.wrap_future(self.executor().submit(func, *args))
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def hashing_pool():
+    """The process's pool, rebuilt if its settings changed."""
+    global _pool
+    threads = getattr(settings, 'AUTH_HASH_THREADS', 2)
+    max_pending = getattr(settings, 'AUTH_HASH_MAX_PENDING', 16)
+    with _pool_lock:
+        if _pool is None or (_pool.threads, _pool.max_pending) != (threads, max_pending):
+            if _pool is not None:
+                _pool.close()
+            _pool = HashingPool(threads, max_pending)
+        return _pool
+
+
+def _authenticate(request, credentials):
+    # Pool threads open their own connections; close them like a request would
+    try:
+        return auth.authenticate(request, **credentials)
+    finally:
+        close_old_connections()
+
+
+async def authenticate(request, username, password):
+    """
+    ``django.contrib.auth.authenticate`` in the hashing pool, so the
+    configured backends, the ``user_login_failed`` signal, inactive-user
+    checks and hash upgrades all behave as for a synchronous login.
+    """
+    credentials = {'username': username, 'password': password}
+    return await hashing_pool().run(_authenticate, request, credentials)
+
+
+async def hash_password(password):
+    """``make_password`` in the hashing pool."""
+    return await hashing_pool().run(make_password, password)
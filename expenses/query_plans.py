@@ -0,0 +1,100 @@
+"""
+EXPLAIN checks for the expense list query.
+
+``ExpenseListView`` filters on the user plus any mix of category, date range
+and search, and reads keyset batches ordered by ``-date, -created_at, -id``
+from the start or from a cursor. Each combination should be answered by one
+of the ``Expense.Meta.indexes`` without reading the whole table or sorting
+it. ``list_query_plans()`` runs ``EXPLAIN`` for every combination and
+``plan_regressions()`` picks out the steps that mean an index no longer
+fits: a full scan of the expense table or an explicit sort. On PostgreSQL
+sequential scans and sorts are switched off for the EXPLAIN, so a small or
+unanalysed table still shows the index plan and only a missing index falls
+back to them.
+"""
+from itertools import product
+import re
+
+from django.db import connections, transaction
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .cursors import batch_queryset
+from .models import Expense, ExpenseCategory
+from .views import ExpenseListView
+
+# Values tried for each list query parameter; None leaves it out
+LIST_FILTERS = {
+    'category': [None, ExpenseCategory.FOOD],
+    'date_from': [None, '2024-01-01'],
+    'date_to': [None, '2024-12-31'],
+    'search': [None, 'lunch', '12.50'],
+    'cursor': [None, 'MjAyNC0wNi0wMXwyMDI0LTA2LTAxVDEyOjAwOjAwKzAwOjAwfDEwMA'],
+}
+
+TABLE = Expense._meta.db_table
+
+REGRESSIONS = {
+    'sqlite': [
+        re.compile(rf'\bSCAN {TABLE}\b'),
+        re.compile(r'\bUSE TEMP B-TREE FOR\b.*\bORDER BY\b'),
+    ],
+    'postgresql': [
+        re.compile(rf'\bSeq Scan on {TABLE}\b'),
+        re.compile(r'\bSort\s+\(cost='),
+    ],
+}
+
+
+def list_filter_combinations():
+    """Every combination of ``LIST_FILTERS`` as GET parameters."""
+    for values in product(*LIST_FILTERS.values()):
+        yield {
+            name: value
+            for name, value in zip(LIST_FILTERS, values)
+            if value is not None
+        }
+
+
+def list_queryset(user, params, using=None):
+    """The batch ``ExpenseListView`` reads for ``user`` with ``params``."""
+    request = RequestFactory().get(reverse('expense_list'), params)
+    request.user = user
+    view = ExpenseListView()
+    view.setup(request)
+    queryset = view.get_queryset()
+    if using is not None:
+        queryset = queryset.using(using)
+    return batch_queryset(queryset, params.get('cursor'), view.batch_size)
+
+
+def explain(queryset):
+    """EXPLAIN output for ``queryset`` on its database."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    with transaction.atomic(using=queryset.db):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+        return queryset.explain()
+
+
+def plan_regressions(plan, vendor):
+    """Lines of ``plan`` showing a full table scan or an explicit sort."""
+    patterns = REGRESSIONS.get(vendor, [])
+    return [
+        line.strip()
+        for line in plan.splitlines()
+        if any(pattern.search(line) for pattern in patterns)
+    ]
+
+
+def list_query_plans(user, using=None):
+    """
+    Yield ``(params, plan, regressions)`` for every list filter combination.
+    """
+    for params in list_filter_combinations():
+        queryset = list_queryset(user, params, using=using)
+        plan = explain(queryset)
+        yield params, plan, plan_regressions(plan, connections[queryset.db].vendor)
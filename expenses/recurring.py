@@ -0,0 +1,95 @@
+"""
+Batched generation of recurring expense occurrences.
+
+Due templates are claimed in batches with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` (where the database supports it) so several nodes can run the
+scheduler at once. All missed occurrences of a batch are inserted with one
+``bulk_create``; the unique ``(recurring, date)`` constraint makes the
+insert idempotent. Each shard is processed in turn.
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+
+from .models import Expense, RecurringExpense
+from .sharding import moving_users, shard_aliases
+from .signals import resync_derived_data
+
+
+def claim_due_templates(today, batch_size, using=DEFAULT_DB_ALIAS, exclude_users=()):
+    """Lock and return up to ``batch_size`` due templates."""
+    return list(
+        RecurringExpense.objects.using(using)
+        .select_for_update(skip_locked=True)
+        .filter(is_active=True, next_date__lte=today)
+        .exclude(user_id__in=exclude_users)
+        .order_by('next_date', 'pk')[:batch_size]
+    )
+
+
+def materialize_batch(today, batch_size=500, using=DEFAULT_DB_ALIAS):
+    """
+    Generate occurrences for one batch of due templates.
+    Returns ``(templates, created, user_ids)``.
+    """
+    with transaction.atomic(using=using):
+        # Users being moved to another shard are left for the next run
+        skipped = set()
+        while True:
+            templates = claim_due_templates(today, batch_size, using, skipped)
+            moving = moving_users(template.user_id for template in templates)
+            if not moving:
+                break
+            skipped |= moving
+        if not templates:
+            return 0, 0, set()
+
+        occurrences = []
+        for template in templates:
+            dates, next_date = template.due_dates(today)
+            occurrences.extend(
+                Expense(
+                    user_id=template.user_id,
+                    amount=template.amount,
+                    currency=template.currency,
+                    category=template.category,
+                    description=template.description,
+                    date=occurrence,
+                    recurring=template,
+                )
+                for occurrence in dates
+            )
+            template.next_date = next_date
+            if template.end_date and next_date > template.end_date:
+                template.is_active = False
+
+        template_ids = [template.pk for template in templates]
+        expenses = Expense.objects.using(using)
+        existing = expenses.filter(recurring_id__in=template_ids).count()
+        expenses.bulk_create(occurrences, batch_size=1000, ignore_conflicts=True)
+        created = expenses.filter(recurring_id__in=template_ids).count() - existing
+
+        RecurringExpense.objects.using(using).bulk_update(
+            templates, ['next_date', 'is_active'], batch_size=1000
+        )
+
+    user_ids = {template.user_id for template in templates}
+    return len(templates), created, user_ids
+
+
+def materialize_recurring(today=None, batch_size=500):
+    """
+    Generate all due occurrences up to ``today``.
+    Returns ``(templates, created)`` totals.
+    """
+    today = today or timezone.localdate()
+    total_templates = total_created = 0
+    for alias in shard_aliases():
+        while True:
+            templates, created, user_ids = materialize_batch(today, batch_size, alias)
+            if not templates:
+                break
+            if created:
+                resync_derived_data(user_ids, using=alias)
+            total_templates += templates
+            total_created += created
+    return total_templates, total_created
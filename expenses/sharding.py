@@ -0,0 +1,269 @@
+"""
+Horizontal sharding of per-user expense data.
+
+With ``EXPENSE_SHARDS`` set, each user's expenses, recurring templates,
+budgets and derived rows (``SHARDED_MODELS``) live on one database alias,
+recorded in the ``UserShard`` table on the primary and cached for
+``SHARD_CACHE_TIMEOUT`` seconds. ``ShardRouter`` sends
+per-user reads and writes there; cross-user work (admin analytics, exports,
+maintenance commands) runs once per shard and merges the results. Users
+without an assignment stay on the primary, where their data lived before
+sharding was enabled. A copy of each user's ``auth_user`` row is kept on
+their shard so foreign keys and joins on ``user`` keep working.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .models import Budget, Expense, RecurringExpense, UserShard
+
+
+def sharding_enabled():
+    return bool(getattr(settings, 'EXPENSE_SHARDS', None))
+
+
+def shard_aliases():
+    """Every alias holding expense data."""
+    return list(getattr(settings, 'EXPENSE_SHARDS', None) or [DEFAULT_DB_ALIAS])
+
+
+def shard_cache_key(user_id):
+    return f'expenses:shard_state:{user_id}'
+
+
+def shard_cache_timeout():
+    return getattr(settings, 'SHARD_CACHE_TIMEOUT', 5)
+
+
+def _shard_state(user_id):
+    """
+    ``(alias, moving_until)`` of ``user_id`` from the ``UserShard`` table.
+    Cached only briefly, so every process sees moves whatever its cache.
+    """
+    key = shard_cache_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = (
+            UserShard.objects.using(DEFAULT_DB_ALIAS)
+            .filter(user_id=user_id)
+            .values_list('alias', 'moving_until')
+            .first()
+        ) or (DEFAULT_DB_ALIAS, None)
+        cache.set(key, state, shard_cache_timeout())
+    return state
+
+
+class UserMoving(Exception):
+    """The user's data is being moved between shards; retry the write later."""
+
+
+def moving_users(user_ids):
+    """The users among ``user_ids`` whose data is being moved."""
+    return set(
+        UserShard.objects.using(DEFAULT_DB_ALIAS)
+        .filter(user_id__in=set(user_ids), moving_until__gt=timezone.now())
+        .values_list('user_id', flat=True)
+    )
+
+
+def check_writable(user_id):
+    """Raise ``UserMoving`` while ``move_user`` is moving ``user_id``."""
+    if user_id is None or not sharding_enabled():
+        return
+    moving_until = _shard_state(user_id)[1]
+    if moving_until is not None and moving_until > timezone.now():
+        raise UserMoving(f'User {user_id} is being moved to another shard')
+
+
+def shard_for_write(user):
+    """``shard_for_user`` for writes; raises ``UserMoving`` during a move."""
+    user_id = getattr(user, 'pk', user)
+    check_writable(user_id)
+    return shard_for_user(user_id)
+
+
+def shard_for_user(user):
+    """Alias holding the expense data of ``user`` (a user or user ID)."""
+    user_id = getattr(user, 'pk', user)
+    if user_id is None or not sharding_enabled():
+        return DEFAULT_DB_ALIAS
+    return _shard_state(user_id)[0]
+
+
+def pick_shard(user_id):
+    """Shard for a new user, spreading users round-robin by ID."""
+    aliases = shard_aliases()
+    return aliases[user_id % len(aliases)]
+
+
+def mirror_users(users, alias):
+    """Insert or refresh the copies of ``users``' rows on ``alias``."""
+    if alias == DEFAULT_DB_ALIAS or not users:
+        return
+    fields = User._meta.concrete_fields
+    User.objects.using(alias).bulk_create(
+        [User(**{field.attname: getattr(user, field.attname) for field in fields}) for user in users],
+        update_conflicts=True,
+        unique_fields=['id'],
+        update_fields=[field.name for field in fields if not field.primary_key],
+    )
+
+
+def mirror_user(user, alias):
+    """Insert or refresh the copy of ``user``'s row on ``alias``."""
+    mirror_users([user], alias)
+
+
+def assign_shard(user, alias):
+    """Record ``alias`` as the shard of ``user``."""
+    mirror_user(user, alias)
+    UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        user_id=user.pk, defaults={'alias': alias}
+    )
+    cache.delete(shard_cache_key(user.pk))
+
+
+def assign_shards(users):
+    """
+    Place newly created ``users`` on shards as ``pick_shard`` would, with
+    one insert per shard instead of one per user. For users created with
+    ``bulk_create``, which sends no ``post_save`` signals.
+    """
+    if not sharding_enabled():
+        return
+    placed = defaultdict(list)
+    for user in users:
+        placed[pick_shard(user.pk)].append(user)
+    for alias, members in placed.items():
+        mirror_users(members, alias)
+    UserShard.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+        [UserShard(user_id=user.pk, alias=alias) for alias, members in placed.items() for user in members]
+    )
+    cache.set_many(
+        {
+            shard_cache_key(user.pk): (alias, None)
+            for alias, members in placed.items() for user in members
+        },
+        shard_cache_timeout(),
+    )
+
+
+def scatter(func, aliases=None):
+    """
+    Call ``func(alias)`` for every shard and return the results in shard
+    order. Shards are queried in parallel unless the caller holds an open
+    transaction, whose uncommitted writes other threads could not see.
+    """
+    aliases = list(aliases or shard_aliases())
+    if len(aliases) == 1 or any(connections[alias].in_atomic_block for alias in aliases):
+        return [func(alias) for alias in aliases]
+
+    def run(alias):
+        try:
+            return func(alias)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+        return list(executor.map(run, aliases))
+
+
+def _bulk_copy(model, objs, target):
+    """Insert ``objs`` on ``target`` keeping their original timestamps."""
+    stamps = [(obj.created_at, obj.updated_at) for obj in objs]
+    model.objects.using(target).bulk_create(objs)
+    for obj, (created_at, updated_at) in zip(objs, stamps):
+        obj.created_at, obj.updated_at = created_at, updated_at
+    model.objects.using(target).bulk_update(objs, ['created_at', 'updated_at'])
+
+
+def _copy_user_data(user_id, source, target, batch_size):
+    """Copy a user's source rows to ``target`` under new primary keys."""
+    recurring_ids = {}
+    for template in RecurringExpense.objects.using(source).filter(user_id=user_id).order_by('pk'):
+        old_pk = template.pk
+        template.pk = None
+        template._state.adding = True
+        template.save(using=target)
+        recurring_ids[old_pk] = template.pk
+
+    budgets = list(Budget.objects.using(source).filter(user_id=user_id))
+    for budget in budgets:
+        budget.pk = None
+    _bulk_copy(Budget, budgets, target)
+
+    copied = []
+    batch = []
+    expenses = Expense.objects.using(source).filter(user_id=user_id).order_by('pk')
+    for expense in expenses.iterator(chunk_size=batch_size):
+        copied.append(expense.pk)
+        expense.pk = None
+        expense.recurring_id = recurring_ids.get(expense.recurring_id)
+        batch.append(expense)
+        if len(batch) >= batch_size:
+            _bulk_copy(Expense, batch, target)
+            batch = []
+    if batch:
+        _bulk_copy(Expense, batch, target)
+    return copied
+
+
+def _block_writes(user_id, alias, until):
+    UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        user_id=user_id, defaults={'alias': alias, 'moving_until': until}
+    )
+    cache.delete(shard_cache_key(user_id))
+
+
+def move_user(user, target, batch_size=1000):
+    """
+    Move ``user``'s expense data to the shard ``target``: block the user's
+    writes, copy the data, switch the shard map and delete the old rows.
+    Returns the number of expenses moved.
+
+    Writes for the user raise ``UserMoving`` (a 503 for requests) until
+    the move is over, so nothing written to the old shard is lost. The
+    block and the shard map live in ``UserShard``; other processes pick up
+    each change once their cached copy expires, so the move waits
+    ``SHARD_CACHE_TIMEOUT`` before copying and again before deleting.
+    Copied rows get new primary keys on ``target``.
+    """
+    from .signals import resync_derived_data, tracking_suspended
+
+    if target not in shard_aliases():
+        raise ValueError(f'Unknown shard: {target}')
+    source = shard_for_user(user)
+    if source == target:
+        return 0
+
+    mirror_user(user, target)
+    timeout = getattr(settings, 'SHARD_MOVE_TIMEOUT', 3600)
+    _block_writes(user.pk, source, timezone.now() + timedelta(seconds=timeout))
+    try:
+        # Writes that checked the block just before it was set finish first
+        time.sleep(getattr(settings, 'SHARD_MOVE_GRACE', 2) + shard_cache_timeout())
+        with tracking_suspended():
+            with transaction.atomic(using=target):
+                copied = _copy_user_data(user.pk, source, target, batch_size)
+            assign_shard(user, target)
+            # Processes still reading the old shard see unchanged rows meanwhile
+            time.sleep(shard_cache_timeout())
+
+            with transaction.atomic(using=source):
+                for model in (Expense, RecurringExpense, Budget):
+                    model.objects.using(source).filter(user_id=user.pk).delete()
+                if source != DEFAULT_DB_ALIAS:
+                    User.objects.using(source).filter(pk=user.pk).delete()
+        resync_derived_data([user.pk], using=source)
+        resync_derived_data([user.pk], using=target)
+    finally:
+        UserShard.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user.pk).update(moving_until=None)
+        cache.delete(shard_cache_key(user.pk))
+    return len(copied)
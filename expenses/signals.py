@@ -0,0 +1,146 @@
+"""
+Signal handlers that keep derived expense data in sync with writes.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import aggregates, anomalies, sharding
+from .analytics import frame_cache
+from .currency import home_currency_key
+from .models import Expense, UserProfile
+from .versioning import bump_data_version
+
+_tracking_suspended = ContextVar('expense_tracking_suspended', default=False)
+
+
+@contextmanager
+def tracking_suspended():
+    """
+    Skip per-row derived data updates, e.g. for bulk operations that
+    resync aggregates once per batch afterwards.
+    """
+    token = _tracking_suspended.set(True)
+    try:
+        yield
+    finally:
+        _tracking_suspended.reset(token)
+
+
+def _previous_state(instance, using):
+    """State of ``instance`` as currently stored in the database."""
+    loaded = getattr(instance, '_loaded_values', None)
+    state = aggregates.expense_state(loaded) if loaded else None
+    if state is None:
+        values = (
+            Expense.objects.using(using)
+            .filter(pk=instance.pk)
+            .values(*aggregates.TRACKED_FIELDS)
+            .first()
+        )
+        state = aggregates.expense_state(values) if values else None
+    return state
+
+
+def _invalidate(user_ids):
+    for user_id in user_ids:
+        bump_data_version(user_id)
+        frame_cache.invalidate(user_id)
+
+
+def data_changed(*user_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Invalidate cached per-user data after expense writes, once the write
+    on ``using`` commits. Invalidating earlier would let a concurrent
+    request cache data read before the commit under the new version.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(partial(_invalidate, user_ids), using=using)
+
+
+def resync_derived_data(user_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Rebuild derived data for ``user_ids`` once after a bulk write that
+    bypassed the per-row signal handlers.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+    aggregates.rebuild_monthly_totals(user_ids=sorted(user_ids), using=using)
+    anomalies.rebuild_category_stats(user_ids=sorted(user_ids), using=using)
+    data_changed(*user_ids, using=using)
+
+
+@receiver(pre_save, sender=Expense)
+def capture_previous_state(sender, instance, raw, using, update_fields, **kwargs):
+    if raw or _tracking_suspended.get():
+        return
+    if instance._state.adding or instance.pk is None:
+        instance._previous_state = None
+    else:
+        instance._previous_state = _previous_state(instance, using)
+    if update_fields is None or {'amount', 'category'} & set(update_fields):
+        anomalies.score_expense(instance, instance._previous_state, using)
+
+
+@receiver(post_save, sender=Expense)
+def update_aggregates_on_save(sender, instance, created, raw, using, **kwargs):
+    if raw or _tracking_suspended.get():
+        return
+    new = aggregates.expense_state(instance)
+    old = None if created else getattr(instance, '_previous_state', None)
+    aggregates.record_expense_change(old, new, using)
+    anomalies.record_stats_change(old, new, using)
+    data_changed(instance.user_id, old.user_id if old else None, using=using)
+    instance._loaded_values = {
+        name: getattr(instance, name) for name in aggregates.TRACKED_FIELDS
+    }
+
+
+@receiver(post_delete, sender=Expense)
+def update_aggregates_on_delete(sender, instance, using, **kwargs):
+    if _tracking_suspended.get():
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    old = aggregates.expense_state(loaded or instance)
+    aggregates.record_expense_change(old, None, using)
+    anomalies.record_stats_change(old, None, using)
+    data_changed(instance.user_id, using=using)
+
+
+@receiver(post_save, sender=UserProfile)
+def home_currency_changed(sender, instance, raw, using, **kwargs):
+    if raw:
+        return
+    cache.delete(home_currency_key(instance.user_id))
+    data_changed(instance.user_id, using=using)
+
+
+@receiver(post_save, sender=User)
+def place_user_on_shard(sender, instance, created, raw, using, **kwargs):
+    """Assign new users a shard and keep the copy of the user there current."""
+    if raw or using != DEFAULT_DB_ALIAS or not sharding.sharding_enabled():
+        return
+    if created:
+        sharding.assign_shard(instance, sharding.pick_shard(instance.pk))
+    else:
+        sharding.mirror_user(instance, sharding.shard_for_user(instance))
+
+
+@receiver(pre_delete, sender=User)
+def delete_user_shard_data(sender, instance, using, **kwargs):
+    """Remove a deleted user's data from their shard."""
+    if using != DEFAULT_DB_ALIAS or not sharding.sharding_enabled():
+        return
+    alias = sharding.shard_for_user(instance)
+    if alias != DEFAULT_DB_ALIAS:
+        with tracking_suspended():
+            User.objects.using(alias).filter(pk=instance.pk).delete()
+    cache.delete(sharding.shard_cache_key(instance.pk))
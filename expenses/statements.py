@@ -0,0 +1,155 @@
+"""
+Monthly expense statements: one self-contained HTML file per user and
+month, laid out for printing or HTML-to-PDF conversion.
+
+Each statement selects expenses with the list view's filters and is built
+from aggregate queries only (totals by category and by day, converted
+into the user's home currency). Files carry a fingerprint of their inputs
+in the first line, so regenerating a month only rewrites statements whose
+expenses, currency, rates or filters changed.
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, Max, Sum
+from django.template.loader import render_to_string
+
+from expense_tracker.routers import replica_reads, routing_user
+
+from .currency import conversion_factors, converted, home_currency
+from .filters import filter_expenses
+from .models import Expense
+
+# Bump when the template or the statement data changes shape
+STATEMENT_FORMAT = 1
+STATEMENT_TEMPLATE = 'expenses/statement.html'
+FINGERPRINT_PREFIX = '<!-- statement:'
+
+
+def month_bounds(month):
+    """First and last day of ``month`` (any date in it)."""
+    first = month.replace(day=1)
+    return first, first.replace(day=monthrange(first.year, first.month)[1])
+
+
+def statement_path(user_id, month):
+    """
+    Location of a user's statement for ``month`` under ``STATEMENTS_ROOT``,
+    which is private: statements are only served by ``StatementView``.
+    """
+    return Path(settings.STATEMENTS_ROOT) / f'{month:%Y-%m}' / f'{user_id}.html'
+
+
+def statement_expenses(user_id, month, filters=None):
+    """The user's expenses for ``month``, narrowed like the list view."""
+    first, last = month_bounds(month)
+    params = {**(filters or {}), 'date_from': first.isoformat(), 'date_to': last.isoformat()}
+    return filter_expenses(Expense.objects.filter(user_id=user_id), params)
+
+
+def statement_fingerprint(expenses, currency, filters):
+    """
+    Digest of everything a statement depends on. Saves move ``updated_at``,
+    deletions the count, bulk amount updates the sum. The conversion
+    factors themselves are included rather than the cached FX version,
+    which is not stable across processes or cache restarts.
+    """
+    state = expenses.aggregate(
+        count=Count('pk'), changed=Max('updated_at'), amount=Sum('amount')
+    )
+    payload = json.dumps([
+        STATEMENT_FORMAT, state['count'], str(state['changed']), str(state['amount']), currency,
+        sorted((code, str(factor)) for code, factor in conversion_factors(currency).items()),
+        sorted((filters or {}).items()),
+    ])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def stored_fingerprint(path):
+    """Fingerprint written into an existing statement, if any."""
+    try:
+        with path.open(encoding='utf-8') as statement:
+            first_line = statement.readline().strip()
+    except FileNotFoundError:
+        return None
+    if first_line.startswith(FINGERPRINT_PREFIX):
+        return first_line[len(FINGERPRINT_PREFIX):].removesuffix('-->').strip()
+    return None
+
+
+def statement_context(user, month, expenses, currency):
+    """Template context built from two GROUP BY queries."""
+    amount = converted(currency)
+    categories = list(
+        expenses.order_by().values('category')
+        .annotate(total=Sum(amount), count=Count('pk'))
+    )
+    days = list(
+        expenses.order_by('date').values('date')
+        .annotate(total=Sum(amount), count=Count('pk'))
+    )
+    labels = dict(Expense._meta.get_field('category').choices)
+    total = sum(row['total'] or 0 for row in categories)
+    for row in categories:
+        row['label'] = labels.get(row['category'], row['category'])
+        row['share'] = round((row['total'] or 0) / total * 100, 1) if total else 0
+    categories.sort(key=lambda row: row['total'] or 0, reverse=True)
+    first, last = month_bounds(month)
+    return {
+        'user': user,
+        'month': first,
+        'period_end': last,
+        'currency': currency,
+        'categories': categories,
+        'days': days,
+        'total': total,
+        'count': sum(row['count'] for row in categories),
+    }
+
+
+def write_statement(path, fingerprint, html):
+    """Replace ``path`` atomically so readers never see half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp_path.write_text(f'{FINGERPRINT_PREFIX}{fingerprint} -->\n{html}', encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def generate_statement(user_id, month, filters=None, force=False):
+    """
+    Write the statement of ``user_id`` for ``month``. Returns ``'written'``
+    or ``'unchanged'`` when the stored statement is still current.
+    """
+    path = statement_path(user_id, month)
+    with routing_user(user_id), replica_reads():
+        user = User.objects.get(pk=user_id)
+        currency = home_currency(user)
+        expenses = statement_expenses(user_id, month, filters)
+        fingerprint = statement_fingerprint(expenses, currency, filters)
+        if not force and stored_fingerprint(path) == fingerprint:
+            return 'unchanged'
+        html = render_to_string(
+            STATEMENT_TEMPLATE, statement_context(user, month, expenses, currency)
+        )
+    write_statement(path, fingerprint, html)
+    return 'written'
+
+
+def generate_statements(user_ids, month, filters=None, force=False):
+    """Generate statements for ``user_ids``; returns counts per outcome."""
+    results = {'written': 0, 'unchanged': 0}
+    for user_id in user_ids:
+        results[generate_statement(user_id, month, filters, force)] += 1
+    return results
+
+
+def previous_month(today=None):
+    """First day of the month before ``today``."""
+    first = (today or date.today()).replace(day=1)
+    return (first - timedelta(days=1)).replace(day=1)
@@ -0,0 +1,120 @@
+"""
+Rolling spending statistics and month-end forecasts.
+
+Statistics are computed in one vectorized batch for every category from
+the user's columnar ``ExpenseFrame`` and memoized in the cache under the
+user's data version, so they are only recomputed after the user writes.
+"""
+import calendar
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from .analytics import CATEGORIES, get_frame
+from .models import ExpenseCategory
+from .versioning import get_data_version, versions_shared
+
+HISTORY_WEEKS = 12
+ROLLING_WEEKS = 4
+FORECAST_LOOKBACK_DAYS = 90
+PERCENTILES = (10, 50, 90)
+
+
+def _money(cents):
+    return (Decimal(int(round(float(cents)))) / 100).quantize(Decimal('0.01'))
+
+
+def weekly_matrix(frame, today, weeks=HISTORY_WEEKS):
+    """
+    Spend per category and week as a ``(categories, weeks)`` array of cents,
+    oldest week first, ending with the week containing ``today``.
+    """
+    current_week = today.toordinal() - today.weekday()
+    first_week = current_week - 7 * (weeks - 1)
+    week_index = (frame.ordinals - (frame.ordinals - 1) % 7 - first_week) // 7
+    mask = (week_index >= 0) & (week_index < weeks) & (frame.categories >= 0)
+    flat = frame.categories[mask].astype(np.int64) * weeks + week_index[mask]
+    totals = np.bincount(flat, weights=frame.cents[mask], minlength=len(CATEGORIES) * weeks)
+    return totals.reshape(len(CATEGORIES), weeks)
+
+
+def month_forecast(frame, today, lookback_days=FORECAST_LOOKBACK_DAYS):
+    """
+    Spent-so-far and projected month-end spend per category (cents).
+    The projection adds the trailing daily rate for the remaining days.
+    """
+    month_start = today.replace(day=1).toordinal()
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    remaining_days = days_in_month - today.day
+    lookback_start = (today - timedelta(days=lookback_days - 1)).toordinal()
+    valid = (frame.categories >= 0) & (frame.ordinals <= today.toordinal())
+    codes = frame.categories.astype(np.int64)
+
+    in_month = valid & (frame.ordinals >= month_start)
+    spent = np.bincount(codes[in_month], weights=frame.cents[in_month], minlength=len(CATEGORIES))
+
+    in_lookback = valid & (frame.ordinals >= lookback_start)
+    recent = np.bincount(
+        codes[in_lookback], weights=frame.cents[in_lookback], minlength=len(CATEGORIES)
+    )
+    daily_rate = recent / lookback_days
+    return spent, spent + daily_rate * remaining_days
+
+
+def compute_statistics(frame, today):
+    """Compute the spending summary for ``frame`` as of ``today``."""
+    weekly = weekly_matrix(frame, today)
+    rolling = weekly[:, -ROLLING_WEEKS:].mean(axis=1)
+    averages = weekly.mean(axis=1)
+    medians = np.median(weekly, axis=1)
+    bands = np.percentile(weekly, PERCENTILES, axis=1)
+    spent, forecast = month_forecast(frame, today)
+
+    overall = weekly.sum(axis=0)
+    overall_bands = np.percentile(overall, PERCENTILES)
+
+    labels = dict(ExpenseCategory.choices)
+    categories = [
+        {
+            'category': category,
+            'label': labels[category],
+            'weekly_average': _money(averages[code]),
+            'weekly_median': _money(medians[code]),
+            'rolling_average': _money(rolling[code]),
+            'percentiles': [_money(band[code]) for band in bands],
+            'month_spent': _money(spent[code]),
+            'month_forecast': _money(forecast[code]),
+        }
+        for code, category in enumerate(CATEGORIES)
+        if weekly[code].any() or spent[code] or forecast[code]
+    ]
+
+    return {
+        'as_of': today,
+        'currency': frame.currency,
+        'weeks': weekly.shape[1],
+        'weekly_average': _money(overall.mean()),
+        'weekly_median': _money(np.median(overall)),
+        'rolling_average': _money(overall[-ROLLING_WEEKS:].mean()),
+        'percentiles': [_money(value) for value in overall_bands],
+        'month_spent': _money(spent.sum()),
+        'month_forecast': _money(forecast.sum()),
+        'categories': categories,
+    }
+
+
+def get_spending_statistics(user_id, today=None):
+    """Spending summary for ``user_id``, memoized per data version and day."""
+    today = today or timezone.localdate()
+    if not versions_shared():
+        return compute_statistics(get_frame(user_id), today)
+    version = get_data_version(user_id)
+    cache_key = f'expenses:statistics:{user_id}:{version}:{today.isoformat()}'
+    summary = cache.get(cache_key)
+    if summary is None:
+        summary = compute_statistics(get_frame(user_id), today)
+        cache.set(cache_key, summary, 60 * 60 * 24)
+    return summary
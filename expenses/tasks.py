@@ -0,0 +1,170 @@
+"""
+Heavy expense operations, runnable inline or as background jobs.
+"""
+import csv
+import heapq
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import DateField, F
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from expense_tracker.routers import replica_reads, routing_user
+
+from .anomalies import rescore_expenses
+from .currency import converted, home_currency
+from .jobs import register
+from .models import Expense
+from .sharding import moving_users, shard_aliases, shard_for_write
+from .signals import resync_derived_data, tracking_suspended
+
+EXPORT_HEADER = ['Date', 'Amount', 'Category', 'Description', 'Currency']
+
+
+def write_expenses_csv(expenses, output_path, currency, with_user=False):
+    """
+    Write ``expenses`` to ``output_path`` as CSV, with each amount also
+    converted into ``currency`` by the database. ``expenses`` may also be a
+    list of querysets ordered by ``-date`` (one per shard), which are
+    streamed together newest first. Returns the row count.
+    """
+    querysets = expenses if isinstance(expenses, (list, tuple)) else [expenses]
+    fields = ['date', 'amount', 'category', 'description', 'currency', 'converted_amount']
+    header = [*EXPORT_HEADER, f'Amount ({currency})']
+    if with_user:
+        fields.insert(0, 'user__username')
+        header.insert(0, 'User')
+    streams = [
+        queryset.annotate(converted_amount=converted(currency))
+        .values_list(*fields)
+        .iterator(chunk_size=2000)
+        for queryset in querysets
+    ]
+    date_index = fields.index('date')
+    rows = heapq.merge(*streams, key=lambda row: row[date_index], reverse=True)
+
+    count = 0
+    with Path(output_path).open('w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(header)
+        labels = dict(Expense._meta.get_field('category').choices)
+        for row in rows:
+            *user, expense_date, amount, category, description, expense_currency, home_amount = row
+            writer.writerow([
+                *user, expense_date, amount, labels.get(category, category), description,
+                expense_currency, '' if home_amount is None else f'{home_amount:.2f}',
+            ])
+            count += 1
+    return count
+
+
+def delete_expenses_before(cutoff_date, batch_size=1000):
+    """
+    Delete expenses dated before ``cutoff_date`` on every shard in batches
+    and resync derived data once per batch. Returns the number of deleted
+    expenses.
+    """
+    deleted = 0
+    for alias in shard_aliases():
+        expenses = Expense.objects.using(alias)
+        # Users being moved to another shard are left for the next run
+        skipped = set()
+        while True:
+            batch = list(
+                expenses.filter(date__lt=cutoff_date)
+                .exclude(user_id__in=skipped)
+                .order_by('pk')
+                .values_list('pk', 'user_id')[:batch_size]
+            )
+            if not batch:
+                break
+            moving = moving_users(user_id for _, user_id in batch)
+            if moving:
+                skipped |= moving
+                continue
+            with tracking_suspended():
+                expenses.filter(pk__in=[pk for pk, _ in batch]).delete()
+            resync_derived_data((user_id for _, user_id in batch), using=alias)
+            deleted += len(batch)
+    return deleted
+
+
+def _selected_expenses(user_id, expense_ids, using):
+    return Expense.objects.using(using).filter(user_id=user_id, pk__in=expense_ids)
+
+
+def bulk_recategorize(user_id, expense_ids, category):
+    """
+    Move the user's ``expense_ids`` to ``category`` with one UPDATE, then
+    rebuild the user's totals once and re-score the categories the rows
+    left and joined. Returns the number of updated expenses.
+    """
+    using = shard_for_write(user_id)
+    with transaction.atomic(using=using), tracking_suspended():
+        selected = _selected_expenses(user_id, expense_ids, using)
+        touched = set(selected.values_list('category', flat=True).distinct()) | {category}
+        updated = selected.update(category=category, updated_at=timezone.now())
+        if updated:
+            resync_derived_data([user_id], using=using)
+            rescore_expenses(user_ids=[user_id], using=using, categories=sorted(touched))
+    return updated
+
+
+def bulk_shift_dates(user_id, expense_ids, days):
+    """
+    Move the user's ``expense_ids`` by ``days`` with one UPDATE, then
+    rebuild the user's totals once. Returns the number of updated expenses.
+    Raises ``IntegrityError`` if a recurring occurrence would land on a date
+    its template already has.
+    """
+    using = shard_for_write(user_id)
+    with transaction.atomic(using=using), tracking_suspended():
+        updated = _selected_expenses(user_id, expense_ids, using).update(
+            date=Cast(F('date') + timedelta(days=days), DateField()),
+            updated_at=timezone.now(),
+        )
+        if updated:
+            resync_derived_data([user_id], using=using)
+    return updated
+
+
+def bulk_delete(user_id, expense_ids):
+    """
+    Delete the user's ``expense_ids`` with one DELETE, then rebuild the
+    user's totals once. Returns the number of deleted expenses.
+    """
+    using = shard_for_write(user_id)
+    with transaction.atomic(using=using), tracking_suspended():
+        deleted, _ = _selected_expenses(user_id, expense_ids, using).delete()
+        if deleted:
+            resync_derived_data([user_id], using=using)
+    return deleted
+
+
+def export_path(job):
+    """Location of the CSV file produced by an export job."""
+    return Path(settings.JOB_OUTPUT_DIR) / f'expenses-{job.pk}.csv'
+
+
+@register('export_expenses')
+def export_expenses_job(job, user_id):
+    path = export_path(job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # The replica must have caught up with writes made before the export was queued
+    max_lag = (timezone.now() - job.created_at).total_seconds()
+    with routing_user(user_id), replica_reads(max_lag=max_lag):
+        user = User.objects.get(pk=user_id)
+        count = write_expenses_csv(
+            Expense.objects.filter(user=user).order_by('-date'), path, home_currency(user)
+        )
+    return {'count': count, 'filename': path.name}
+
+
+@register('cleanup_old_expenses')
+def cleanup_old_expenses_job(job, days):
+    cutoff_date = timezone.now().date() - timedelta(days=days)
+    return {'deleted': delete_expenses_before(cutoff_date), 'cutoff': cutoff_date.isoformat()}
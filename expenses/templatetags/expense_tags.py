@@ -0,0 +1,85 @@
+"""
+Template tags for rendering expenses.
+
+``expense_rows`` renders the expense table body from a single compiled
+row template and, when ``TEMPLATE_FRAGMENT_CACHE_TIMEOUT`` is set, caches
+each rendered row keyed by ``(id, updated_at)`` so edits invalidate it.
+
+``crispy_cached`` wraps crispy's ``|crispy`` filter and memoizes the output
+for unbound forms per form class when ``CRISPY_RENDER_CACHE`` is enabled.
+
+``money`` formats an amount with its currency symbol.
+"""
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+from crispy_forms.templatetags.crispy_forms_filters import as_crispy_form
+
+from expenses.currency import format_money
+
+register = template.Library()
+
+ROW_TEMPLATE = 'expenses/_expense_row.html'
+
+_crispy_cache = {}
+
+
+def row_cache_key(expense):
+    """Cache key for a rendered expense row."""
+    return f'expense_row:{expense.pk}:{expense.updated_at.timestamp()}'
+
+
+@register.simple_tag(takes_context=True)
+def expense_rows(context, expenses):
+    """Render table rows for ``expenses`` using one batched cache lookup."""
+    row_template = get_template(ROW_TEMPLATE)
+    timeout = getattr(settings, 'TEMPLATE_FRAGMENT_CACHE_TIMEOUT', 0)
+    expenses = list(expenses)
+    request = context.get('request')
+
+    if not timeout:
+        return mark_safe(''.join(
+            row_template.render({'expense': expense}, request)
+            for expense in expenses
+        ))
+
+    fragment_cache = caches['default']
+    keys = [row_cache_key(expense) for expense in expenses]
+    cached = fragment_cache.get_many(keys)
+    missing = {}
+    rows = []
+    for key, expense in zip(keys, expenses):
+        row = cached.get(key)
+        if row is None:
+            row = row_template.render({'expense': expense}, request)
+            missing[key] = row
+        rows.append(row)
+
+    if missing:
+        fragment_cache.set_many(missing, timeout)
+    return mark_safe(''.join(rows))
+
+
+@register.filter
+def crispy_cached(form, template_pack=settings.CRISPY_TEMPLATE_PACK):
+    """Render ``form`` with crispy, reusing the output for unbound forms."""
+    if (
+        not getattr(settings, 'CRISPY_RENDER_CACHE', False)
+        or form.is_bound
+        or form.initial
+    ):
+        return as_crispy_form(form, template_pack)
+
+    key = (type(form).__module__, type(form).__qualname__, form.prefix, template_pack)
+    html = _crispy_cache.get(key)
+    if html is None:
+        html = _crispy_cache[key] = as_crispy_form(form, template_pack)
+    return html
+
+
+@register.filter
+def money(amount, currency):
+    """Format ``amount`` with the symbol of ``currency``."""
+    return format_money(amount, currency)
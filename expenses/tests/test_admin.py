@@ -0,0 +1,125 @@
+"""
+Tests for the Expense admin.
+"""
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+
+from expenses.admin import AmountFilter, EstimatedCountPaginator, UserIdFilter
+from expenses.models import Expense, ExpenseCategory
+
+
+@pytest.fixture
+def admin_client(client, db, settings):
+    settings.STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+    User.objects.create_superuser(
+        username='admin',
+        email='admin@example.com',
+        password='adminpass123'
+    )
+    client.login(username='admin', password='adminpass123')
+    cache.clear()
+    return client
+
+
+@pytest.mark.django_db
+class TestExpenseAdmin:
+    """Test cases for the ExpenseAdmin changelist."""
+
+    def make_expenses(self, user):
+        other = User.objects.create_user(username='other', password='otherpass')
+        mine = Expense.objects.create(
+            user=user,
+            amount=Decimal('12.34'),
+            category=ExpenseCategory.FOOD,
+            date=date.today()
+        )
+        theirs = Expense.objects.create(
+            user=other,
+            amount=Decimal('99.00'),
+            category=ExpenseCategory.BILLS,
+            date=date.today()
+        )
+        return mine, theirs
+
+    def test_changelist_loads(self, admin_client, user):
+        """The changelist renders with the scalable filters."""
+        self.make_expenses(user)
+        response = admin_client.get(reverse('admin:expenses_expense_changelist'))
+        assert response.status_code == 200
+        assert response.context['cl'].result_count == 2
+
+    def test_user_filter_by_id_and_username(self, admin_client, user):
+        """The user filter accepts an ID or an exact username."""
+        mine, _ = self.make_expenses(user)
+        url = reverse('admin:expenses_expense_changelist')
+        for value in (str(user.pk), user.username):
+            response = admin_client.get(url, {'user': value})
+            assert list(response.context['cl'].result_list) == [mine]
+
+    def test_search_by_id(self, admin_client, user):
+        """Numeric search terms match the expense ID only, never the amount."""
+        _, theirs = self.make_expenses(user)
+        url = reverse('admin:expenses_expense_changelist')
+        response = admin_client.get(url, {'q': str(theirs.pk)})
+        assert list(response.context['cl'].result_list) == [theirs]
+        response = admin_client.get(url, {'q': '99.00'})
+        assert list(response.context['cl'].result_list) == []
+
+    def test_amount_filter(self, admin_client, user):
+        """The amount filter matches exactly and ignores values it cannot parse."""
+        mine, theirs = self.make_expenses(user)
+        url = reverse('admin:expenses_expense_changelist')
+        response = admin_client.get(url, {'amount': '99.00'})
+        assert list(response.context['cl'].result_list) == [theirs]
+        response = admin_client.get(url, {'amount': '12.34', 'user': user.username})
+        assert list(response.context['cl'].result_list) == [mine]
+        response = admin_client.get(url, {'amount': 'lots'})
+        assert response.context['cl'].result_count == 2
+
+    def test_search_by_username(self, admin_client, user):
+        """Text search terms match the exact username."""
+        mine, _ = self.make_expenses(user)
+        url = reverse('admin:expenses_expense_changelist')
+        response = admin_client.get(url, {'q': user.username})
+        assert list(response.context['cl'].result_list) == [mine]
+
+    def test_input_filters_keep_other_filters(self, admin_client, user):
+        """Typing into one input filter keeps the other filters and the search."""
+        mine, _ = self.make_expenses(user)
+        Expense.objects.create(
+            user=user, amount=Decimal('99.00'), category=ExpenseCategory.FOOD, date=date.today()
+        )
+        url = reverse('admin:expenses_expense_changelist')
+        response = admin_client.get(url, {
+            'user': user.username, 'category__exact': ExpenseCategory.FOOD, 'amount': '12.34',
+        })
+        assert list(response.context['cl'].result_list) == [mine]
+
+        response = admin_client.get(url, {'user': user.username, 'category__exact': 'FOOD', 'q': '7'})
+        specs = {type(spec): spec for spec in response.context['cl'].filter_specs}
+        assert sorted(specs[UserIdFilter].hidden_params) == [('category__exact', 'FOOD'), ('q', '7')]
+        assert sorted(specs[AmountFilter].hidden_params) == [
+            ('category__exact', 'FOOD'), ('q', '7'), ('user', user.username),
+        ]
+        content = response.content.decode()
+        assert '<input type="hidden" name="category__exact" value="FOOD">' in content
+        assert 'placeholder="Exact amount, e.g. 12.50"' in content
+
+    def test_paginator_count_is_capped(self, user, settings):
+        """Counts stop at ADMIN_COUNT_CAP on non-PostgreSQL databases."""
+        settings.ADMIN_COUNT_CAP = 1
+        self.make_expenses(user)
+        paginator = EstimatedCountPaginator(Expense.objects.all(), 20)
+        assert paginator.count == 1
+
+    def test_analytics_page(self, admin_client, user):
+        """The analytics page renders from precomputed totals."""
+        self.make_expenses(user)
+        url = reverse('admin:expenses_expense_analytics')
+        response = admin_client.get(url, {'month': date.today().strftime('%Y-%m')})
+        assert response.status_code == 200
+        assert response.context['leaderboard'][0]['user__username'] == 'other'
@@ -0,0 +1,103 @@
+"""
+Tests for incrementally maintained expense aggregates.
+"""
+import pytest
+from decimal import Decimal
+from datetime import date
+
+from expenses.aggregates import rebuild_monthly_totals, spending_analytics
+from expenses.models import Expense, ExpenseCategory, ExpenseMonthlyTotal
+from expenses.signals import tracking_suspended
+
+
+def totals_for(user):
+    return {
+        (row.month, row.category): (row.total, row.count)
+        for row in ExpenseMonthlyTotal.objects.filter(user=user, count__gt=0)
+    }
+
+
+@pytest.mark.django_db
+class TestMonthlyTotals:
+    """Test cases for the ExpenseMonthlyTotal counters."""
+
+    def test_create_updates_totals(self, user):
+        """Creating expenses adds to the month's counter."""
+        for amount in ('10.00', '15.50'):
+            Expense.objects.create(
+                user=user,
+                amount=Decimal(amount),
+                category=ExpenseCategory.FOOD,
+                date=date(2025, 3, 14)
+            )
+        assert totals_for(user) == {
+            (date(2025, 3, 1), ExpenseCategory.FOOD): (Decimal('25.50'), 2)
+        }
+
+    def test_update_moves_amount_between_buckets(self, user):
+        """Changing category and date moves the amount to the new bucket."""
+        expense = Expense.objects.create(
+            user=user,
+            amount=Decimal('10.00'),
+            category=ExpenseCategory.FOOD,
+            date=date(2025, 3, 14)
+        )
+        expense = Expense.objects.get(pk=expense.pk)
+        expense.category = ExpenseCategory.BILLS
+        expense.date = date(2025, 4, 2)
+        expense.amount = Decimal('12.00')
+        expense.save()
+        assert totals_for(user) == {
+            (date(2025, 4, 1), ExpenseCategory.BILLS): (Decimal('12.00'), 1)
+        }
+
+    def test_delete_subtracts(self, user):
+        """Deleting an expense subtracts it from its month."""
+        expense = Expense.objects.create(
+            user=user,
+            amount=Decimal('10.00'),
+            category=ExpenseCategory.FOOD,
+            date=date(2025, 3, 14)
+        )
+        expense.delete()
+        assert totals_for(user) == {}
+
+    def test_rebuild_matches_incremental(self, user):
+        """A rebuild picks up writes made while tracking was suspended."""
+        Expense.objects.create(
+            user=user,
+            amount=Decimal('10.00'),
+            category=ExpenseCategory.FOOD,
+            date=date(2025, 3, 14)
+        )
+        with tracking_suspended():
+            Expense.objects.create(
+                user=user,
+                amount=Decimal('5.00'),
+                category=ExpenseCategory.FOOD,
+                date=date(2025, 3, 20)
+            )
+        rebuild_monthly_totals(user_ids=[user.pk])
+        assert totals_for(user) == {
+            (date(2025, 3, 1), ExpenseCategory.FOOD): (Decimal('15.00'), 2)
+        }
+
+    def test_spending_analytics(self, user):
+        """Analytics are computed from the monthly totals."""
+        Expense.objects.create(
+            user=user,
+            amount=Decimal('30.00'),
+            category=ExpenseCategory.FOOD,
+            date=date(2025, 2, 10)
+        )
+        Expense.objects.create(
+            user=user,
+            amount=Decimal('45.00'),
+            category=ExpenseCategory.TRANSPORT,
+            date=date(2025, 3, 10)
+        )
+        data = spending_analytics(date(2025, 3, 1))
+        assert data['leaderboard'][0]['user__username'] == user.username
+        assert data['month_total'] == Decimal('45.00')
+        assert [row['total'] for row in data['growth']] == [Decimal('30.00'), Decimal('45.00')]
+        assert data['growth'][1]['change'] == Decimal('50')
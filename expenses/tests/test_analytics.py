@@ -0,0 +1,117 @@
+"""
+Tests for the columnar expense analytics engine.
+"""
+import pytest
+from django.core.cache import cache
+from decimal import Decimal
+from datetime import date
+
+from expenses.analytics import ExpenseFrame, FrameCache
+from expenses.models import Expense, ExpenseCategory
+from expenses.versioning import get_data_version
+
+
+@pytest.fixture
+def expenses(user):
+    cache.clear()
+    rows = [
+        ('10.00', ExpenseCategory.FOOD, date(2025, 3, 3)),     # Monday
+        ('20.50', ExpenseCategory.FOOD, date(2025, 3, 5)),     # Wednesday
+        ('99.99', ExpenseCategory.BILLS, date(2025, 3, 10)),   # Monday
+        ('250.00', ExpenseCategory.SHOPPING, date(2025, 4, 1)),
+    ]
+    return [
+        Expense.objects.create(user=user, amount=Decimal(amount), category=category, date=day)
+        for amount, category, day in rows
+    ]
+
+
+@pytest.mark.django_db
+class TestExpenseFrame:
+    """Test cases for ExpenseFrame."""
+
+    def test_load_columns(self, user, expenses):
+        """Expenses are loaded into compact typed arrays."""
+        frame = ExpenseFrame.load(user.pk)
+        assert len(frame) == 4
+        assert frame.cents.sum() == 38049
+        assert frame.categories.dtype.itemsize == 1
+
+    def test_group_by_category(self, user, expenses):
+        """Group-by returns totals and counts per category."""
+        rows = ExpenseFrame.load(user.pk).summarize('category')
+        by_key = {row['key']: (row['total'], row['count']) for row in rows}
+        assert by_key[ExpenseCategory.FOOD] == (Decimal('30.50'), 2)
+        assert by_key[ExpenseCategory.BILLS] == (Decimal('99.99'), 1)
+
+    def test_group_by_week_with_filter(self, user, expenses):
+        """Filters are applied before grouping."""
+        rows = ExpenseFrame.load(user.pk).summarize(
+            'week', date_to=date(2025, 3, 31), categories=[ExpenseCategory.FOOD]
+        )
+        assert rows == [
+            {'key': date(2025, 3, 3), 'total': Decimal('30.50'), 'count': 2}
+        ]
+
+    def test_group_by_weekday_month_and_bucket(self, user, expenses):
+        """Weekday, month and amount bucket groupings."""
+        frame = ExpenseFrame.load(user.pk)
+        weekdays = {row['key']: row['count'] for row in frame.summarize('weekday')}
+        assert weekdays['Monday'] == 2
+        months = [row['key'] for row in frame.summarize('month')]
+        assert months == [date(2025, 3, 1), date(2025, 4, 1)]
+        buckets = {row['key']: row['count'] for row in frame.summarize('amount_bucket')}
+        assert buckets[(Decimal('0'), Decimal('10'))] == 1
+        assert buckets[(Decimal('100'), Decimal('500'))] == 1
+
+
+@pytest.mark.django_db
+class TestFrameCache:
+    """Test cases for the LRU frame cache."""
+
+    def test_reuses_frame_until_write(self, user, expenses, django_capture_on_commit_callbacks):
+        """Frames are reused until an expense write bumps the version."""
+        frames = FrameCache(maxsize=2)
+        first = frames.get(user.pk)
+        assert frames.get(user.pk) is first
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Expense.objects.create(
+                user=user, amount=Decimal('5.00'), category=ExpenseCategory.OTHER,
+                date=date(2025, 4, 2)
+            )
+        refreshed = frames.get(user.pk)
+        assert refreshed is not first
+        assert len(refreshed) == 5
+
+    def test_invalidated_after_commit(self, user, expenses, django_capture_on_commit_callbacks):
+        """Writes bump the data version only once their transaction commits."""
+        version = get_data_version(user.pk)
+        with django_capture_on_commit_callbacks() as callbacks:
+            Expense.objects.create(
+                user=user, amount=Decimal('5.00'), category=ExpenseCategory.OTHER,
+                date=date(2025, 4, 2)
+            )
+            # Anything cached before the commit stays under the old version
+            assert get_data_version(user.pk) == version
+        assert len(callbacks) == 1
+        callbacks[0]()
+        assert get_data_version(user.pk) != version
+
+    def test_disabled_without_shared_versions(self, user, expenses, settings):
+        """Without a shared cache frames are loaded fresh, so writes elsewhere show."""
+        settings.DATA_VERSION_CACHES = False
+        frames = FrameCache(maxsize=2)
+        first = frames.get(user.pk)
+        # As if another process wrote: no version is bumped here
+        Expense.objects.filter(pk=expenses[0].pk).delete()
+        assert len(frames.get(user.pk)) == len(first) - 1
+        assert len(frames) == 0
+
+    def test_evicts_least_recently_used(self, user, expenses, django_user_model):
+        """The cache holds at most maxsize frames."""
+        frames = FrameCache(maxsize=1)
+        other = django_user_model.objects.create_user(username='other', password='pass')
+        frames.get(user.pk)
+        frames.get(other.pk)
+        assert len(frames) == 1
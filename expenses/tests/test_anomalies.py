@@ -0,0 +1,153 @@
+"""
+Tests for streaming anomaly detection.
+"""
+import pytest
+import statistics
+from django.core.management import call_command
+from django.template import Context, Template
+from decimal import Decimal
+from datetime import date
+from io import StringIO
+
+from expenses.anomalies import (
+    rebuild_category_stats, rescore_expenses, welford_add, welford_remove,
+)
+from expenses.models import CategoryStats, Expense, ExpenseCategory
+
+
+@pytest.fixture
+def add_expenses(expense_factory):
+    """Create one expense per amount, all on the same day."""
+    def create(user, amounts, category=ExpenseCategory.FOOD):
+        return [
+            expense_factory(user, amount, category=category, date=date(2025, 1, 1))
+            for amount in amounts
+        ]
+    return create
+
+
+def assert_stats_match(user, category, amounts):
+    stats = CategoryStats.objects.get(user=user, category=category)
+    values = [float(amount) for amount in amounts]
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.m2 == pytest.approx(statistics.pvariance(values) * len(values))
+
+
+class TestWelford:
+    """Test cases for the running statistics helpers."""
+
+    def test_add_then_remove(self):
+        """Removing a value restores the previous statistics."""
+        state = (0, 0.0, 0.0)
+        for value in (10.0, 12.0, 9.0, 11.0):
+            state = welford_add(*state, value)
+        count, mean, m2 = welford_remove(*welford_add(*state, 500.0), 500.0)
+        assert count == state[0]
+        assert mean == pytest.approx(state[1])
+        assert m2 == pytest.approx(state[2])
+
+
+@pytest.mark.django_db
+class TestAnomalyDetection:
+    """Test cases for flagging expenses on save."""
+
+    def test_stats_follow_writes(self, user, add_expenses):
+        """Creates, updates and deletes keep the stats exact."""
+        expenses = add_expenses(user, ['10.00', '20.00', '30.00'])
+        assert_stats_match(user, ExpenseCategory.FOOD, ['10', '20', '30'])
+
+        expenses[0].amount = Decimal('40.00')
+        expenses[0].save()
+        assert_stats_match(user, ExpenseCategory.FOOD, ['40', '20', '30'])
+
+        expenses[1].category = ExpenseCategory.TRANSPORT
+        expenses[1].save()
+        assert_stats_match(user, ExpenseCategory.FOOD, ['40', '30'])
+        assert_stats_match(user, ExpenseCategory.TRANSPORT, ['20'])
+
+        expenses[2].delete()
+        assert_stats_match(user, ExpenseCategory.FOOD, ['40'])
+
+    def test_outlier_flagged(self, user, add_expenses):
+        """An amount far above the usual range is flagged."""
+        add_expenses(user, ['10.00', '12.00', '9.50', '11.00', '10.50', '12.50'])
+        expense = add_expenses(user, ['150.00'])[0]
+        assert expense.is_anomaly
+        assert expense.anomaly_score > 3
+        expense.refresh_from_db()
+        assert expense.is_anomaly
+
+    def test_normal_amount_not_flagged(self, user, add_expenses):
+        """Amounts within the usual range are not flagged."""
+        add_expenses(user, ['10.00', '12.00', '9.50', '11.00', '10.50', '12.50'])
+        expense = add_expenses(user, ['11.75'])[0]
+        assert not expense.is_anomaly
+
+    def test_too_few_samples(self, user, add_expenses):
+        """Nothing is flagged until the category has enough history."""
+        expense = add_expenses(user, ['10.00', '1000.00'])[1]
+        assert expense.anomaly_score is None
+        assert not expense.is_anomaly
+
+    def test_scoring_uses_stats_only(self, user, django_assert_max_num_queries, add_expenses):
+        """Scoring reads one stats row instead of the user's history."""
+        add_expenses(user, ['10.00'] * 20)
+        with django_assert_max_num_queries(10):
+            add_expenses(user, ['500.00'])
+
+    def test_edit_excludes_own_previous_amount(self, user, add_expenses):
+        """An edited expense is scored against the other expenses only."""
+        add_expenses(user, ['10.00', '12.00', '9.50', '11.00', '10.50'])
+        expense = add_expenses(user, ['11.00'])[0]
+        expense.amount = Decimal('200.00')
+        expense.save()
+        assert expense.is_anomaly
+
+
+@pytest.mark.django_db
+class TestRebuildCategoryStats:
+    """Test cases for the statistics backfill."""
+
+    def test_rebuild_matches_incremental(self, user, add_expenses):
+        """A rebuild produces the same stats as incremental updates."""
+        add_expenses(user, ['5.00', '7.25', '100.00'])
+        add_expenses(user, ['40.00'], category=ExpenseCategory.BILLS)
+        CategoryStats.objects.all().delete()
+        assert rebuild_category_stats() == 2
+        assert_stats_match(user, ExpenseCategory.FOOD, ['5.00', '7.25', '100.00'])
+        assert_stats_match(user, ExpenseCategory.BILLS, ['40.00'])
+
+    def test_command_rescores(self, user, add_expenses):
+        """The command can re-flag existing expenses."""
+        add_expenses(user, ['10.00', '12.00', '9.50', '11.00', '10.50'])
+        outlier = add_expenses(user, ['150.00'])[0]
+        Expense.objects.update(is_anomaly=False, anomaly_score=None)
+        out = StringIO()
+        call_command('rebuild_category_stats', '--rescore', stdout=out)
+        assert '1 flagged' in out.getvalue()
+        outlier.refresh_from_db()
+        assert outlier.is_anomaly
+
+    def test_rescore_refreshes_cached_rows(self, user, settings, add_expenses):
+        """Re-flagged rows get a new updated_at, so cached rows re-render."""
+        settings.TEMPLATE_FRAGMENT_CACHE_TIMEOUT = 60
+        template = Template('{% load expense_tags %}{% expense_rows expenses %}')
+        add_expenses(user, ['10.00', '12.00', '9.50', '11.00', '10.50'])
+        outlier = add_expenses(user, ['150.00'])[0]
+        Expense.objects.filter(pk=outlier.pk).update(is_anomaly=False, anomaly_score=None)
+        outlier.refresh_from_db()
+        assert 'Unusual amount' not in template.render(Context({'expenses': [outlier]}))
+
+        rescore_expenses()
+        outlier.refresh_from_db()
+        assert 'Unusual amount' in template.render(Context({'expenses': [outlier]}))
+
+    def test_rescore_skips_unchanged_rows(self, user, add_expenses):
+        """Rows whose flag and score are current are not rewritten."""
+        expenses = add_expenses(user, ['10.00', '12.00', '9.50', '11.00', '10.50', '150.00'])
+        assert rescore_expenses() == 1
+        before = dict(Expense.objects.values_list('pk', 'updated_at'))
+        assert rescore_expenses() == 1
+        assert dict(Expense.objects.values_list('pk', 'updated_at')) == before
+        assert Expense.objects.get(pk=expenses[-1].pk).is_anomaly
@@ -0,0 +1,92 @@
+"""
+Tests for monthly budgets.
+"""
+import pytest
+from django.contrib.messages import get_messages
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+
+from expenses.budgets import budget_status
+from expenses.models import Budget, Expense, ExpenseCategory
+
+
+@pytest.mark.django_db
+class TestBudgetStatus:
+    """Test cases for budget evaluation."""
+
+    def test_status_uses_monthly_counters(self, user, django_assert_num_queries):
+        """All budgets are evaluated in a single query."""
+        Budget.objects.create(user=user, category=ExpenseCategory.FOOD, amount=Decimal('50.00'))
+        Budget.objects.create(user=user, category=ExpenseCategory.BILLS, amount=Decimal('100.00'))
+        Expense.objects.create(
+            user=user, amount=Decimal('60.00'), category=ExpenseCategory.FOOD, date=date.today()
+        )
+        # Warm the home currency and exchange rate caches
+        budget_status(user)
+        with django_assert_num_queries(1):
+            statuses = {budget.category: budget for budget in budget_status(user)}
+
+        assert statuses[ExpenseCategory.FOOD].spent == Decimal('60.00')
+        assert statuses[ExpenseCategory.FOOD].is_over
+        assert statuses[ExpenseCategory.BILLS].spent == Decimal('0.00')
+        assert not statuses[ExpenseCategory.BILLS].is_over
+
+    def test_other_months_not_counted(self, user):
+        """Only the requested month's spend counts against the budget."""
+        Budget.objects.create(user=user, category=ExpenseCategory.FOOD, amount=Decimal('50.00'))
+        Expense.objects.create(
+            user=user, amount=Decimal('60.00'), category=ExpenseCategory.FOOD, date=date(2025, 1, 5)
+        )
+        budget = budget_status(user, date(2025, 2, 1))[0]
+        assert budget.spent == Decimal('0.00')
+
+
+@pytest.mark.django_db
+class TestBudgetViews:
+    """Test cases for budget views and warnings."""
+
+    def test_set_budget(self, authenticated_client, user):
+        """Posting a budget creates or replaces it."""
+        url = reverse('budgets')
+        for amount in ('50.00', '75.00'):
+            response = authenticated_client.post(
+                url, {'category': ExpenseCategory.FOOD, 'amount': amount}
+            )
+            assert response.status_code == 302
+        budget = Budget.objects.get(user=user)
+        assert budget.amount == Decimal('75.00')
+
+    def test_over_budget_warning_on_create(self, authenticated_client, user):
+        """Saving an expense that exceeds the budget shows a warning."""
+        Budget.objects.create(user=user, category=ExpenseCategory.FOOD, amount=Decimal('50.00'))
+        response = authenticated_client.post(reverse('add_expense'), {
+            'amount': '75.50',
+            'category': ExpenseCategory.FOOD,
+            'date': date.today().isoformat(),
+        })
+        assert response.status_code == 302
+        levels = [message.level_tag for message in get_messages(response.wsgi_request)]
+        assert 'warning' in levels
+
+    def test_delete_other_users_budget_forbidden(self, authenticated_client, django_user_model):
+        """Users cannot delete other users' budgets."""
+        other = django_user_model.objects.create_user(username='other', password='otherpass')
+        budget = Budget.objects.create(
+            user=other, category=ExpenseCategory.FOOD, amount=Decimal('50.00')
+        )
+        response = authenticated_client.post(reverse('delete_budget', kwargs={'pk': budget.pk}))
+        assert response.status_code == 404
+
+    def test_list_shows_budgets(self, authenticated_client, user):
+        """The expense list renders the budget status."""
+        Budget.objects.create(user=user, category=ExpenseCategory.FOOD, amount=Decimal('50.00'))
+        response = authenticated_client.get(reverse('expense_list'))
+        assert len(response.context['budgets']) == 1
+        assert 'Budgets this month' in response.content.decode()
+
+    def test_budget_page(self, authenticated_client):
+        """The budget page renders the form."""
+        response = authenticated_client.get(reverse('budgets'))
+        assert response.status_code == 200
+        assert 'form' in response.context
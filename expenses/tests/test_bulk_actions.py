@@ -0,0 +1,177 @@
+"""
+Tests for bulk edit and bulk delete from the expense list.
+"""
+import pytest
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+from functools import partial
+
+from expenses import sharding
+from expenses.models import (
+    Expense, ExpenseCategory, ExpenseMonthlyTotal, RecurrenceFrequency, RecurringExpense,
+)
+
+URL = reverse('bulk_expenses')
+
+
+@pytest.fixture
+def add_expense(expense_factory):
+    """Create an expense, by default on 10 March 2024."""
+    return partial(expense_factory, date=date(2024, 3, 10))
+
+
+def totals(user):
+    return {
+        (row.month, row.category): row.total
+        for row in ExpenseMonthlyTotal.objects.filter(user=user)
+    }
+
+
+def selection_writes(queries):
+    """
+    UPDATE and DELETE statements applying the action to the expense table,
+    leaving out the anomaly rescoring that follows a recategorize.
+    """
+    return [
+        query['sql'] for query in queries
+        if query['sql'].startswith(('UPDATE "expenses_expense"', 'DELETE FROM "expenses_expense"'))
+        and '"anomaly_score"' not in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+class TestBulkActions:
+    """Test cases for the bulk action view."""
+
+    def test_recategorize(self, authenticated_client, user, add_expense):
+        """Selected expenses move category in one UPDATE and totals follow."""
+        expenses = [add_expense(user), add_expense(user, '5.00')]
+        other = add_expense(User.objects.create_user(username='other'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.post(URL, {
+                'action': 'recategorize',
+                'category': ExpenseCategory.BILLS,
+                'expenses': [expense.pk for expense in expenses] + [other.pk],
+            })
+        assert response.status_code == 302
+        assert len(selection_writes(queries)) == 1
+        assert set(Expense.objects.filter(user=user).values_list('category', flat=True)) == {
+            ExpenseCategory.BILLS
+        }
+        other.refresh_from_db()
+        assert other.category == ExpenseCategory.FOOD
+        assert totals(user) == {(date(2024, 3, 1), ExpenseCategory.BILLS): Decimal('15.00')}
+
+    def test_recategorize_rescores_touched_categories(self, authenticated_client, user, add_expense):
+        """Only the categories rows left and joined are re-scored."""
+        moved = add_expense(user)
+        add_expense(user, '12.00')
+        untouched = [
+            add_expense(user, amount, category=ExpenseCategory.SHOPPING)
+            for amount in ('10.00', '12.00', '9.50', '11.00', '10.50', '150.00')
+        ]
+        Expense.objects.filter(pk__in=[e.pk for e in untouched]).update(anomaly_score=None)
+        before = dict(Expense.objects.filter(category=ExpenseCategory.SHOPPING)
+                      .values_list('pk', 'updated_at'))
+
+        authenticated_client.post(URL, {
+            'action': 'recategorize', 'category': ExpenseCategory.BILLS, 'expenses': [moved.pk],
+        })
+        shopping = Expense.objects.filter(category=ExpenseCategory.SHOPPING)
+        assert dict(shopping.values_list('pk', 'updated_at')) == before
+        assert not shopping.filter(anomaly_score__isnull=False).exists()
+
+    def test_shift_dates(self, authenticated_client, user, add_expense):
+        """Dates move by the given number of days and totals change month."""
+        expense = add_expense(user, date=date(2024, 3, 30))
+        updated_at = expense.updated_at
+        authenticated_client.post(URL, {
+            'action': 'shift_dates', 'days': '3', 'expenses': [expense.pk],
+        })
+        expense.refresh_from_db()
+        assert expense.date == date(2024, 4, 2)
+        assert expense.updated_at > updated_at
+        assert totals(user) == {(date(2024, 4, 1), ExpenseCategory.FOOD): Decimal('10.00')}
+
+    def test_shift_onto_existing_occurrence(self, authenticated_client, user, add_expense):
+        """A recurring occurrence cannot be moved onto a taken date."""
+        template = RecurringExpense.objects.create(
+            user=user, amount=Decimal('5.00'), category=ExpenseCategory.BILLS,
+            frequency=RecurrenceFrequency.DAILY, start_date=date(2024, 3, 1),
+            next_date=date(2024, 3, 3),
+        )
+        first = add_expense(user, date=date(2024, 3, 1), recurring=template)
+        add_expense(user, date=date(2024, 3, 2), recurring=template)
+
+        response = authenticated_client.post(URL, {
+            'action': 'shift_dates', 'days': '1', 'expenses': [first.pk],
+        }, follow=True)
+        assert 'Dates not changed' in response.content.decode()
+        first.refresh_from_db()
+        assert first.date == date(2024, 3, 1)
+
+    def test_delete(self, authenticated_client, user, add_expense):
+        """Selected expenses go in one DELETE; others stay."""
+        doomed = [add_expense(user), add_expense(user, '5.00')]
+        kept = add_expense(user, '7.00')
+        other = add_expense(User.objects.create_user(username='other'))
+
+        with CaptureQueriesContext(connection) as queries:
+            authenticated_client.post(URL, {
+                'action': 'delete', 'expenses': [e.pk for e in doomed] + [other.pk],
+            })
+        assert len(selection_writes(queries)) == 1
+        assert list(Expense.objects.filter(user=user)) == [kept]
+        assert Expense.objects.filter(pk=other.pk).exists()
+        assert totals(user) == {(date(2024, 3, 1), ExpenseCategory.FOOD): Decimal('7.00')}
+
+    def test_requires_selection_and_value(self, authenticated_client, user, add_expense):
+        """Missing selections or values are reported and nothing changes."""
+        expense = add_expense(user)
+        response = authenticated_client.post(URL, {'action': 'delete'}, follow=True)
+        assert 'Select at least one expense.' in response.content.decode()
+        response = authenticated_client.post(URL, {
+            'action': 'recategorize', 'expenses': [expense.pk],
+        }, follow=True)
+        assert 'Choose the new category.' in response.content.decode()
+        assert Expense.objects.filter(pk=expense.pk, category=ExpenseCategory.FOOD).exists()
+
+    def test_returns_to_filtered_list(self, authenticated_client, user, add_expense):
+        """The redirect keeps the list filters but never leaves the site."""
+        expense = add_expense(user)
+        data = {'action': 'delete', 'expenses': [expense.pk]}
+        response = authenticated_client.post(URL, {**data, 'next': '/?category=FOOD'})
+        assert response.url == '/?category=FOOD'
+        response = authenticated_client.post(URL, {**data, 'next': 'https://evil.example/'})
+        assert response.url == reverse('expense_list')
+
+    def test_list_has_checkboxes(self, authenticated_client, user, add_expense):
+        """Each row gets a checkbox tied to the bulk form."""
+        expense = add_expense(user)
+        response = authenticated_client.get(reverse('expense_list'))
+        content = response.content.decode()
+        assert 'id="bulk-form"' in content
+        assert f'value="{expense.pk}" form="bulk-form"' in content
+
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, 'shard1'])
+class TestShardedBulkActions:
+    """Test cases for bulk actions on a sharded user."""
+
+    def test_writes_go_to_users_shard(self, client, settings, add_expense):
+        """Bulk writes run on the shard holding the user's expenses."""
+        settings.EXPENSE_SHARDS = [DEFAULT_DB_ALIAS, 'shard1']
+        user = User.objects.create_user(username='sharded', password='testpass123')
+        sharding.assign_shard(user, 'shard1')
+        expense = add_expense(user)
+        client.login(username='sharded', password='testpass123')
+        client.post(URL, {
+            'action': 'recategorize', 'category': ExpenseCategory.HEALTHCARE,
+            'expenses': [expense.pk],
+        })
+        assert Expense.objects.using('shard1').get().category == ExpenseCategory.HEALTHCARE
@@ -0,0 +1,112 @@
+"""
+Tests for integer-cents amounts and coded categories.
+"""
+import pytest
+from django.db import connection
+from django.db.models import Avg, Sum
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+
+from expenses.fields import MajorUnits
+from expenses.forms import ExpenseForm
+from expenses.models import CATEGORY_STORAGE_CODES, Expense, ExpenseCategory
+
+
+def stored_row(expense):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT amount_minor, category_code FROM expenses_expense WHERE id = %s',
+            [expense.pk]
+        )
+        return cursor.fetchone()
+
+
+@pytest.mark.django_db
+class TestMoneyField:
+    """Test cases for amounts stored in minor units."""
+
+    def test_stored_as_cents(self, user, expense_factory):
+        """Amounts are written as whole cents and read back as Decimal."""
+        expense = expense_factory(user, '12.34')
+        assert stored_row(expense)[0] == 1234
+        expense.refresh_from_db()
+        assert expense.amount == Decimal('12.34')
+        assert str(expense.amount) == '12.34'
+
+    def test_sum_returns_decimal(self, user, expense_factory):
+        """Sum runs on integers and comes back in major units."""
+        for amount in ('0.10', '0.20', '1999.99'):
+            expense_factory(user, amount)
+        total = Expense.objects.aggregate(total=Sum('amount'))['total']
+        assert total == Decimal('2000.29')
+
+    def test_lookups_use_major_units(self, user, expense_factory):
+        """Filters take amounts in major units, including floats."""
+        expense = expense_factory(user, '12.50')
+        assert list(Expense.objects.filter(amount=Decimal('12.50'))) == [expense]
+        assert list(Expense.objects.filter(amount=12.5)) == [expense]
+        assert not Expense.objects.filter(amount__gt=12.5).exists()
+        assert Expense.objects.filter(amount__lte='12.50').exists()
+
+    def test_major_units_expression(self, user, expense_factory):
+        """MajorUnits scales the column inside SQL arithmetic."""
+        expense_factory(user, '10.00')
+        expense_factory(user, '20.00')
+        average = Expense.objects.aggregate(average=Avg(MajorUnits('amount')))['average']
+        assert Decimal(average) == Decimal('15')
+
+    def test_form_validates_decimals(self, user):
+        """The form field is still a two-place decimal input."""
+        data = {
+            'amount': '10.999', 'currency': 'GHS', 'category': ExpenseCategory.FOOD,
+            'date': date.today().isoformat(), 'description': '',
+        }
+        assert 'amount' in ExpenseForm(data=data).errors
+        data['amount'] = '10.99'
+        form = ExpenseForm(data=data)
+        assert form.is_valid(), form.errors
+        assert form.cleaned_data['amount'] == Decimal('10.99')
+
+
+@pytest.mark.django_db
+class TestChoiceCodeField:
+    """Test cases for categories stored as small integers."""
+
+    def test_stored_as_code(self, user, expense_factory):
+        """Categories are written as their code and read back as strings."""
+        expense = expense_factory(user, '5.00', category=ExpenseCategory.ENTERTAINMENT)
+        assert stored_row(expense)[1] == CATEGORY_STORAGE_CODES['ENTERTAINMENT']
+        expense.refresh_from_db()
+        assert expense.category == ExpenseCategory.ENTERTAINMENT
+        assert expense.get_category_display() == 'Entertainment'
+
+    def test_filter_and_group_by_category(self, user, expense_factory):
+        """Queries and GROUP BY results use the category strings."""
+        expense_factory(user, '5.00', category=ExpenseCategory.FOOD)
+        expense_factory(user, '7.00', category=ExpenseCategory.FOOD)
+        expense_factory(user, '1.00', category=ExpenseCategory.BILLS)
+        assert Expense.objects.filter(category=ExpenseCategory.FOOD).count() == 2
+        assert Expense.objects.filter(category__in=['BILLS']).count() == 1
+        totals = dict(
+            Expense.objects.values('category').annotate(total=Sum('amount'))
+            .values_list('category', 'total')
+        )
+        assert totals == {'FOOD': Decimal('12.00'), 'BILLS': Decimal('1.00')}
+
+    def test_unknown_category_rejected(self, user):
+        """Values without a code raise instead of silently matching nothing."""
+        with pytest.raises(ValueError):
+            Expense.objects.filter(category='GROCERIES').exists()
+
+    def test_list_view_ignores_unknown_category(self, authenticated_client, user, expense_factory):
+        """An unknown category filter shows everything instead of failing."""
+        expense_factory(user, '5.00')
+        response = authenticated_client.get(reverse('expense_list'), {'category': 'bogus'})
+        assert response.status_code == 200
+        assert len(response.context['expenses']) == 1
+
+    def test_codes_cover_every_category(self):
+        """Every category has exactly one stored code."""
+        assert set(CATEGORY_STORAGE_CODES) == set(ExpenseCategory.values)
+        assert len(set(CATEGORY_STORAGE_CODES.values())) == len(CATEGORY_STORAGE_CODES)
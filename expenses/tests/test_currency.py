@@ -0,0 +1,144 @@
+"""
+Tests for multi-currency support.
+"""
+import json
+import pytest
+from django.core.management import call_command
+from django.db.models import Sum
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+from io import StringIO
+
+from expenses.analytics import ExpenseFrame
+from expenses.budgets import budget_status
+from expenses.currency import conversion_factors, converted, home_currency
+from expenses.models import (
+    Budget, CategoryStats, Expense, ExpenseCategory, ExchangeRate, UserProfile,
+)
+from expenses.tasks import write_expenses_csv
+
+
+@pytest.fixture
+def rates(db):
+    """1 USD = 15 GHS = 0.5 GBP."""
+    for currency, rate in (('GHS', '15'), ('GBP', '0.5')):
+        ExchangeRate.objects.create(currency=currency, date=date(2025, 1, 1), rate=Decimal(rate))
+    # Older rates are ignored
+    ExchangeRate.objects.create(currency='GHS', date=date(2024, 1, 1), rate=Decimal('10'))
+
+
+@pytest.mark.django_db
+class TestConversion:
+    """Test cases for SQL and vectorized conversion."""
+
+    def test_factors_use_latest_rates(self, rates):
+        """Factors convert via the base currency at the latest rate."""
+        factors = conversion_factors('GHS')
+        assert factors['GHS'] == 1
+        assert factors['USD'] == Decimal('15')
+        assert factors['GBP'] == Decimal('30')
+
+    def test_sql_sum_converts_mixed_currencies(self, user, rates, expense_factory):
+        """Totals over mixed currencies are converted in a single query."""
+        expense_factory(user, '10.00', currency='GHS')
+        expense_factory(user, '2.00', currency='USD')
+        expense_factory(user, '1.00', currency='GBP')
+        total = Expense.objects.filter(user=user).aggregate(
+            total=Sum(converted('GHS'))
+        )['total']
+        assert Decimal(total).quantize(Decimal('0.01')) == Decimal('70.00')
+
+    def test_missing_rate_excluded(self, user, rates, expense_factory):
+        """Currencies without a rate drop out instead of being misread."""
+        expense_factory(user, '5.00', currency='EUR')
+        row = Expense.objects.annotate(home=converted('GHS')).values('home').get()
+        assert row['home'] is None
+
+    def test_frame_converts_vectorized(self, user, rates, expense_factory):
+        """The analytics frame holds amounts in the home currency."""
+        expense_factory(user, '10.00', currency='GHS')
+        expense_factory(user, '2.00', currency='USD')
+        expense_factory(user, '3.00', currency='EUR')
+        frame = ExpenseFrame.load(user.pk)
+        assert frame.currency == 'GHS'
+        assert sorted(frame.cents.tolist()) == [1000, 3000]
+
+    def test_budget_spent_in_home_currency(self, user, rates, expense_factory):
+        """Budgets compare converted spend from the monthly counters."""
+        Budget.objects.create(user=user, category=ExpenseCategory.FOOD, amount=Decimal('50.00'))
+        expense_factory(user, '20.00', currency='GHS')
+        expense_factory(user, '2.00', currency='USD')
+        budget = budget_status(user)[0]
+        assert budget.spent == Decimal('50.00')
+        assert budget.currency == 'GHS'
+
+    def test_home_currency_change(self, user, rates):
+        """Changing the home currency takes effect immediately."""
+        assert home_currency(user) == 'GHS'
+        UserProfile.objects.create(user=user, home_currency='USD')
+        assert home_currency(user) == 'USD'
+
+    def test_category_stats_per_currency(self, user, expense_factory):
+        """Anomaly statistics never mix currencies."""
+        expense_factory(user, '100.00', currency='GHS')
+        expense_factory(user, '7.00', currency='USD')
+        assert CategoryStats.objects.filter(user=user).count() == 2
+
+    def test_export_includes_converted_amount(self, user, rates, tmp_path, expense_factory):
+        """Exports carry the original currency and the converted amount."""
+        expense_factory(user, '2.00', currency='USD')
+        path = tmp_path / 'out.csv'
+        write_expenses_csv(Expense.objects.filter(user=user), path, 'GHS')
+        lines = path.read_text().splitlines()
+        assert lines[0] == 'Date,Amount,Category,Description,Currency,Amount (GHS)'
+        assert lines[1].endswith(',USD,30.00')
+
+
+@pytest.mark.django_db
+class TestLoadFxRates:
+    """Test cases for the load_fx_rates command."""
+
+    def test_load_csv_and_json(self, tmp_path):
+        """Rates load from both formats and re-loading updates them."""
+        csv_path = tmp_path / 'rates.csv'
+        csv_path.write_text('date,currency,rate\n2025-01-01,GHS,15\n2025-01-01,XXX,1\n')
+        json_path = tmp_path / 'rates.json'
+        json_path.write_text(json.dumps(
+            {'date': '2025-01-01', 'base': 'USD', 'rates': {'GHS': 16, 'EUR': 0.9}}
+        ))
+        out = StringIO()
+        call_command('load_fx_rates', str(csv_path), str(json_path), stdout=out)
+        assert 'Skipped 1' in out.getvalue()
+        assert ExchangeRate.objects.count() == 2
+        assert ExchangeRate.objects.get(currency='GHS').rate == Decimal('16')
+
+    def test_loading_invalidates_cached_factors(self, tmp_path, rates):
+        """New rates are picked up without waiting for a cache timeout."""
+        assert conversion_factors('GHS')['USD'] == Decimal('15')
+        path = tmp_path / 'rates.csv'
+        path.write_text('date,currency,rate\n2025-02-01,GHS,20\n')
+        call_command('load_fx_rates', str(path), stdout=StringIO())
+        assert conversion_factors('GHS')['USD'] == Decimal('20')
+
+
+@pytest.mark.django_db
+class TestCurrencyViews:
+    """Test cases for currency in views."""
+
+    def test_list_shows_symbols(self, authenticated_client, user, expense_factory):
+        """Each row shows the symbol of its own currency."""
+        expense_factory(user, '4.00', currency='USD')
+        expense_factory(user, '5.00', currency='GHS')
+        response = authenticated_client.get(reverse('expense_list'))
+        content = response.content.decode()
+        assert '$4.00' in content
+        assert '₵5.00' in content
+
+    def test_set_home_currency(self, authenticated_client, user):
+        """Users can pick their home currency."""
+        response = authenticated_client.post(reverse('profile'), {'home_currency': 'EUR'})
+        assert response.status_code == 302
+        assert home_currency(user) == 'EUR'
+        response = authenticated_client.get(reverse('add_expense'))
+        assert response.context['form'].initial['currency'] == 'EUR'
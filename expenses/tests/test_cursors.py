@@ -0,0 +1,134 @@
+"""
+Tests for keyset batches and the infinite-scroll rows endpoint.
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+from datetime import date, timedelta
+
+from expenses.cursors import decode_cursor, encode_cursor, next_batch
+from expenses.models import Expense, ExpenseCategory
+
+ROWS_URL = reverse('expense_rows')
+
+
+def add_expenses(user, count, **kwargs):
+    """Create ``count`` expenses over a few days, several per day."""
+    kwargs.setdefault('category', ExpenseCategory.FOOD)
+    expenses = [
+        Expense.objects.create(
+            user=user, amount=Decimal(i + 1), date=date(2024, 3, 1) + timedelta(days=i % 4),
+            description=f'Expense {i}', **kwargs
+        )
+        for i in range(count)
+    ]
+    return sorted(expenses, key=lambda e: (e.date, e.created_at, e.pk), reverse=True)
+
+
+def fetch_all(client, params):
+    """Follow the rows endpoint from ``params`` until the last batch."""
+    pages = []
+    query = params
+    while query is not None:
+        data = client.get(f'{ROWS_URL}?{query}').json()
+        pages.append(data['html'])
+        query = data['next']
+    return pages
+
+
+@pytest.mark.django_db
+class TestCursors:
+    """Test cases for keyset cursors."""
+
+    def test_round_trip(self, user):
+        """A cursor decodes to the row it was made from."""
+        expense = add_expenses(user, 1)[0]
+        assert decode_cursor(encode_cursor(expense)) == (
+            expense.date, expense.created_at, expense.pk
+        )
+
+    def test_rejects_garbage(self):
+        """Cursors not produced by encode_cursor raise ValueError."""
+        for value in ('nope', '!!!', encode_cursor.__name__):
+            with pytest.raises(ValueError):
+                decode_cursor(value)
+
+    def test_batches_cover_every_row_once(self, user):
+        """Ties on date and timestamp are split by id without gaps."""
+        expenses = add_expenses(user, 7)
+        stamp = timezone.now()
+        Expense.objects.filter(user=user).update(created_at=stamp)
+        expected = sorted(expenses, key=lambda e: (e.date, e.pk), reverse=True)
+
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = next_batch(Expense.objects.filter(user=user), cursor, 3)
+            seen.extend(rows)
+            if cursor is None:
+                break
+        assert [e.pk for e in seen] == [e.pk for e in expected]
+
+
+@pytest.mark.django_db
+class TestInfiniteScroll:
+    """Test cases for the list page and rows endpoint."""
+
+    def test_list_shows_first_batch(self, authenticated_client, user):
+        """The page renders one batch and a link to the next."""
+        expenses = add_expenses(user, 25)
+        response = authenticated_client.get(reverse('expense_list'), {'category': 'FOOD'})
+        assert [e.pk for e in response.context['expenses']] == [e.pk for e in expenses[:20]]
+        next_query = response.context['next_query']
+        assert next_query.startswith('category=FOOD&cursor=')
+        assert f'data-next="{next_query.replace("&", "&amp;")}"' in response.content.decode()
+
+    def test_no_link_on_last_batch(self, authenticated_client, user):
+        """Short lists have no "Load more" link."""
+        add_expenses(user, 3)
+        response = authenticated_client.get(reverse('expense_list'))
+        assert response.context['next_query'] is None
+        assert 'expense-rows-more' not in response.content.decode()
+
+    def test_rows_endpoint_continues_list(self, authenticated_client, user):
+        """The endpoint returns the remaining rows in order, batch by batch."""
+        expenses = add_expenses(user, 45)
+        response = authenticated_client.get(reverse('expense_list'))
+        pages = fetch_all(authenticated_client, response.context['next_query'])
+        assert len(pages) == 2
+        html = ''.join(pages)
+        positions = [html.index(f'value="{e.pk}"') for e in expenses[20:]]
+        assert positions == sorted(positions)
+        assert f'value="{expenses[19].pk}"' not in html
+
+    def test_rows_endpoint_keeps_filters(self, authenticated_client, user):
+        """Filters in the query string apply to every batch."""
+        add_expenses(user, 25)
+        add_expenses(user, 25, category=ExpenseCategory.BILLS)
+        response = authenticated_client.get(reverse('expense_list'), {'category': 'BILLS'})
+        html = ''.join(fetch_all(authenticated_client, response.context['next_query']))
+        assert html.count('<tr>') == 5
+        assert 'BILLS' in html and 'FOOD' not in html
+
+    def test_rows_endpoint_is_one_query(self, authenticated_client, user):
+        """A batch costs one expense query and no totals or summaries."""
+        add_expenses(user, 25)
+        response = authenticated_client.get(reverse('expense_list'))
+        with CaptureQueriesContext(connection) as queries:
+            authenticated_client.get(f'{ROWS_URL}?{response.context["next_query"]}')
+        expense_queries = [q['sql'] for q in queries if '"expenses_expense"' in q['sql']]
+        assert len(expense_queries) == 1
+        assert 'LIMIT 21' in expense_queries[0]
+
+    def test_invalid_cursor(self, authenticated_client):
+        """Broken cursors are a bad request."""
+        response = authenticated_client.get(ROWS_URL, {'cursor': 'garbage'})
+        assert response.status_code == 400
+
+    def test_requires_login(self, client):
+        """The endpoint is only for signed-in users."""
+        response = client.get(ROWS_URL)
+        assert response.status_code == 302
@@ -0,0 +1,160 @@
+"""
+Tests for the in-process database connection pool.
+"""
+import threading
+import time
+import pytest
+
+from expense_tracker.db_backends import pool as pool_module
+from expense_tracker.db_backends.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+
+    def close(self):
+        self.closed = True
+
+
+def check(connection):
+    if connection.broken:
+        raise RuntimeError('server closed the connection unexpectedly')
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        created.append(FakeConnection())
+        return created[-1]
+
+    options = {'max_size': 2, 'timeout': 0.1, 'check': check, **kwargs}
+    return ConnectionPool(connect, **options), created
+
+
+class TestConnectionPool:
+    """Test cases for checking connections in and out."""
+
+    def test_connections_are_reused(self):
+        """A released connection is handed to the next caller."""
+        pool, created = make_pool()
+        first = pool.acquire()
+        pool.release(first)
+        assert pool.acquire() is first
+        assert len(created) == 1
+
+    def test_timeout_when_exhausted(self):
+        """Callers wait at most ``timeout`` for a free connection."""
+        pool, _ = make_pool(max_size=1)
+        pool.acquire()
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+        assert pool.stats()['timeouts'] == 1
+
+    def test_waiter_gets_released_connection(self):
+        """A waiting caller receives a connection as soon as one is released."""
+        pool, created = make_pool(max_size=1, timeout=2)
+        held = pool.acquire()
+        threading.Timer(0.05, pool.release, [held]).start()
+        assert pool.acquire() is held
+        assert len(created) == 1
+
+    def test_never_exceeds_max_size(self):
+        """Concurrent callers share at most ``max_size`` connections."""
+        pool, created = make_pool(max_size=3, timeout=5)
+
+        def work():
+            for _ in range(20):
+                connection = pool.acquire()
+                time.sleep(0.001)
+                pool.release(connection)
+
+        threads = [threading.Thread(target=work) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(created) <= 3
+        assert pool.stats()['checkouts'] == 200
+
+    def test_broken_connection_is_replaced(self):
+        """Connections failing the health check are closed and replaced."""
+        pool, created = make_pool(check_interval=0)
+        first = pool.acquire()
+        pool.release(first)
+        first.broken = True
+        second = pool.acquire()
+        assert second is not first
+        assert first.closed
+        assert pool.stats()['health_check_failures'] == 1
+
+    def test_recently_used_connection_skips_check(self):
+        """Health checks only run after ``check_interval`` of idleness."""
+        pool, _ = make_pool(check_interval=60)
+        first = pool.acquire()
+        pool.release(first)
+        first.broken = True
+        assert pool.acquire() is first
+
+    def test_old_connections_are_retired(self):
+        """Connections older than ``max_lifetime`` are not reused."""
+        pool, created = make_pool(max_lifetime=0)
+        first = pool.acquire()
+        pool.release(first)
+        assert first.closed
+        assert pool.acquire() is not first
+
+    def test_failed_reset_closes_connection(self):
+        """A connection that cannot be reset is closed instead of pooled."""
+        def reset(connection):
+            raise RuntimeError('rollback failed')
+
+        pool, _ = make_pool(reset=reset)
+        first = pool.acquire()
+        pool.release(first)
+        assert first.closed
+        assert pool.stats()['idle'] == 0
+
+    def test_failed_connect_frees_slot(self):
+        """A failed connection attempt does not use up a pool slot."""
+        pool = ConnectionPool(lambda: 1 / 0, max_size=1, timeout=0.1)
+        for _ in range(2):
+            with pytest.raises(ZeroDivisionError):
+                pool.acquire()
+        assert pool.stats()['size'] == 0
+
+    def test_stats(self):
+        """Pool metrics report sizes and counters."""
+        pool, _ = make_pool()
+        held = pool.acquire()
+        pool.release(pool.acquire())
+        stats = pool.stats()
+        assert stats['in_use'] == 1 and stats['idle'] == 1 and stats['size'] == 2
+        assert stats['connections_created'] == 2
+        pool.release(held)
+
+
+class TestPoolRegistry:
+    """Test cases for the per-process pool registry."""
+
+    def test_get_pool_is_cached(self):
+        """The same key returns the same pool."""
+        key = ('test', 'db', None, None, None)
+        try:
+            first = pool_module.get_pool(key, lambda: make_pool()[0])
+            assert pool_module.get_pool(key, lambda: make_pool()[0]) is first
+        finally:
+            pool_module.close_pools(lambda k: k == key)
+
+    def test_close_pools(self):
+        """Closing a pool closes its idle connections."""
+        key = ('test', 'db', None, None, None)
+        pool = pool_module.get_pool(key, lambda: make_pool(name='test')[0])
+        connection = pool.acquire()
+        pool.release(connection)
+        assert 'test' in pool_module.pool_stats()
+        pool_module.close_pools(lambda k: k == key)
+        assert connection.closed
+        assert 'test' not in pool_module.pool_stats()
@@ -0,0 +1,133 @@
+"""
+Tests for the health endpoints and load shedding.
+"""
+import math
+import time
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.urls import reverse
+
+from expense_tracker.health import readiness_databases
+from expense_tracker.load_shedding import LoadMonitor, queue_time
+
+
+class TestLoadMonitor:
+    """Test cases for overload tracking."""
+
+    def test_latency_average(self):
+        """Each finished request moves the average by alpha."""
+        monitor = LoadMonitor(alpha=0.5, decay=30)
+        monitor.started()
+        monitor.started()
+        assert monitor.in_flight == 2
+        monitor.finished(4.0, now=0)
+        monitor.finished(2.0, now=0)
+        assert monitor.in_flight == 0
+        assert monitor.latency(now=0) == pytest.approx(2.0)
+
+    def test_latency_decays_when_idle(self):
+        """A quiet worker is not considered slow forever."""
+        monitor = LoadMonitor(alpha=1.0, decay=10)
+        monitor.started()
+        monitor.finished(20.0, now=100)
+        assert monitor.latency(now=110) == pytest.approx(20.0 * math.exp(-1))
+        assert monitor.latency(now=200) < 0.01
+
+    def test_queue_time(self):
+        """X-Request-Start is read as seconds since the epoch."""
+        assert queue_time('t=1000.5', now=1003.0) == pytest.approx(2.5)
+        assert queue_time('1000', now=999) == 0
+        assert queue_time('t=soon') is None
+        assert queue_time(None) is None
+
+
+@pytest.mark.django_db
+class TestLoadShedding:
+    """Test cases for LoadSheddingMiddleware."""
+
+    def queued_for(self, seconds):
+        return {'HTTP_X_REQUEST_START': f't={time.time() - seconds:.3f}'}
+
+    def test_sheds_low_priority_after_long_queue(self, authenticated_client):
+        """Exports that waited too long for a worker get 503 with Retry-After."""
+        response = authenticated_client.post(reverse('export_expenses'), **self.queued_for(8))
+        assert response.status_code == 503
+        assert response['Retry-After'] == '30'
+        response = authenticated_client.post(reverse('export_expenses'), **self.queued_for(1))
+        assert response.status_code == 302
+
+    def test_keeps_serving_other_views(self, authenticated_client):
+        """Requests for views not listed as low priority are never shed."""
+        response = authenticated_client.get(reverse('expense_list'), **self.queued_for(60))
+        assert response.status_code == 200
+
+    def test_sheds_when_recent_requests_are_slow(self, settings, authenticated_client):
+        """A high average latency sheds low-priority work."""
+        settings.LOAD_SHED_MAX_LATENCY = 0
+        authenticated_client.get(reverse('expense_list'))
+        assert authenticated_client.post(reverse('export_expenses')).status_code == 503
+
+    def test_sheds_when_too_many_in_flight(self, settings, authenticated_client):
+        """Low-priority work waits for in-flight requests to drop."""
+        settings.LOAD_SHED_MAX_IN_FLIGHT = 0
+        assert authenticated_client.post(reverse('export_expenses')).status_code == 503
+
+    def test_can_be_disabled(self, settings, authenticated_client):
+        """LOAD_SHED_ENABLED=False serves everything."""
+        settings.LOAD_SHED_ENABLED = False
+        response = authenticated_client.post(reverse('export_expenses'), **self.queued_for(60))
+        assert response.status_code == 302
+
+
+@pytest.mark.django_db
+class TestHealthEndpoints:
+    """Test cases for /health/ and /ready/."""
+
+    def test_liveness(self, client):
+        """/health/ answers without touching any dependency."""
+        response = client.get(reverse('health'))
+        assert response.status_code == 200
+        assert response.content == b'OK'
+
+    def test_ready(self, client):
+        """/ready/ reports every dependency with its latency."""
+        response = client.get(reverse('ready'))
+        assert response.status_code == 200
+        assert response['Cache-Control'] == 'no-store'
+        data = response.json()
+        assert data['status'] == 'ok'
+        assert set(data['checks']) == {'database:default', 'cache'}
+        assert data['checks']['cache']['latency_ms'] >= 0
+
+    def test_checks_every_shard(self, settings):
+        """The primary and each shard are checked once."""
+        settings.EXPENSE_SHARDS = ['default', 'shard1']
+        assert readiness_databases() == ['default', 'shard1']
+
+    def test_database_down(self, client):
+        """A failing database makes the worker unready."""
+        failure = OperationalError('connection refused')
+        with mock.patch.object(connections['default'], 'cursor', side_effect=failure):
+            response = client.get(reverse('ready'))
+        assert response.status_code == 503
+        data = response.json()
+        assert data['status'] == 'unavailable'
+        assert data['checks']['database:default']['status'] == 'error'
+        assert data['checks']['cache']['status'] == 'ok'
+
+    def test_cache_down(self, client):
+        """A failing cache makes the worker unready."""
+        with mock.patch.object(cache, 'get', return_value=None):
+            response = client.get(reverse('ready'))
+        assert response.status_code == 503
+        assert response.json()['checks']['cache']['status'] == 'error'
+
+    def test_slow_dependency(self, settings, client):
+        """Round trips over the latency limit count as unready."""
+        settings.HEALTH_DB_MAX_LATENCY = 0
+        response = client.get(reverse('ready'))
+        assert response.status_code == 503
+        assert response.json()['checks']['database:default']['status'] == 'slow'
@@ -0,0 +1,185 @@
+"""
+Tests for the background job queue.
+"""
+import os
+import signal
+import threading
+import time
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+from datetime import date, timedelta
+from io import StringIO
+
+from expenses import jobs
+from expenses.management.commands import run_workers
+from expenses.models import Expense, ExpenseCategory, ExpenseMonthlyTotal, Job, JobStatus
+
+
+@pytest.fixture
+def job_output_dir(settings, tmp_path):
+    settings.JOB_OUTPUT_DIR = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def flaky_handler():
+    calls = []
+
+    @jobs.register('flaky')
+    def flaky(job, fail_times):
+        calls.append(job.attempts)
+        if len(calls) <= fail_times:
+            raise RuntimeError('boom')
+        return {'calls': len(calls)}
+
+    yield calls
+    jobs.HANDLERS.pop('flaky')
+
+
+@pytest.mark.django_db
+class TestJobQueue:
+    """Test cases for claiming and running jobs."""
+
+    def test_enqueue_unknown_kind(self):
+        """Only registered job kinds can be queued."""
+        with pytest.raises(ValueError):
+            jobs.enqueue('does_not_exist')
+
+    def test_claim_is_exclusive(self, flaky_handler):
+        """A claimed job is not handed to a second worker."""
+        job = jobs.enqueue('flaky', {'fail_times': 0})
+        assert [claimed.pk for claimed in jobs.claim('worker-1')] == [job.pk]
+        assert jobs.claim('worker-2') == []
+        job.refresh_from_db()
+        assert job.status == JobStatus.RUNNING
+        assert job.locked_by == 'worker-1'
+
+    def test_future_jobs_not_claimed(self, flaky_handler):
+        """Jobs are not picked up before their ``run_after`` time."""
+        jobs.enqueue('flaky', {'fail_times': 0}, run_after=timezone.now() + timedelta(hours=1))
+        assert jobs.claim('worker') == []
+
+    def test_failed_job_is_retried_with_backoff(self, flaky_handler, settings):
+        """Failures requeue the job until ``max_attempts`` is reached."""
+        settings.JOB_RETRY_DELAY = 0
+        job = jobs.enqueue('flaky', {'fail_times': 1}, max_attempts=2)
+        assert jobs.work(once=True) == 2
+        job.refresh_from_db()
+        assert job.status == JobStatus.SUCCEEDED
+        assert job.attempts == 2
+        assert job.result == {'calls': 2}
+
+    def test_job_fails_after_max_attempts(self, flaky_handler, settings):
+        """A job that keeps failing ends up FAILED with its traceback."""
+        settings.JOB_RETRY_DELAY = 0
+        job = jobs.enqueue('flaky', {'fail_times': 5}, max_attempts=2)
+        jobs.work(once=True)
+        job.refresh_from_db()
+        assert job.status == JobStatus.FAILED
+        assert 'RuntimeError: boom' in job.error
+
+    def test_retry_delay_doubles(self, settings):
+        """Retry delays grow exponentially."""
+        settings.JOB_RETRY_DELAY = 10
+        assert [jobs.retry_delay(attempt) for attempt in (1, 2, 3)] == [10, 20, 40]
+
+    def test_requeue_stale(self, flaky_handler):
+        """Jobs abandoned by a dead worker go back on the queue."""
+        job = jobs.enqueue('flaky', {'fail_times': 0})
+        jobs.claim('dead-worker')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        assert jobs.requeue_stale(timeout=60) == 1
+        assert jobs.claim('worker')[0].pk == job.pk
+
+    def test_workers_requeue_stale_jobs(self, flaky_handler):
+        """Running workers pick up jobs abandoned by a dead worker."""
+        job = jobs.enqueue('flaky', {'fail_times': 0})
+        jobs.claim('dead-worker')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        assert jobs.work(once=True) == 1
+        assert Job.objects.get(pk=job.pk).status == JobStatus.SUCCEEDED
+
+
+@pytest.mark.django_db
+class TestExpenseJobs:
+    """Test cases for export and cleanup jobs."""
+
+    def test_export_job(self, user, job_output_dir):
+        """The export job writes the user's expenses to a CSV file."""
+        Expense.objects.create(
+            user=user, amount=Decimal('12.50'), category=ExpenseCategory.FOOD, date=date(2025, 1, 2)
+        )
+        job = jobs.enqueue('export_expenses', {'user_id': user.pk}, user=user)
+        jobs.work(once=True)
+        job.refresh_from_db()
+        assert job.status == JobStatus.SUCCEEDED
+        content = (job_output_dir / job.result['filename']).read_text()
+        assert '2025-01-02,12.50,Food & Dining' in content
+
+    def test_cleanup_job_resyncs_totals(self, user):
+        """The cleanup job deletes old expenses and keeps totals consistent."""
+        old = date.today() - timedelta(days=400)
+        Expense.objects.create(user=user, amount=Decimal('5.00'), category=ExpenseCategory.FOOD, date=old)
+        Expense.objects.create(user=user, amount=Decimal('7.00'), category=ExpenseCategory.FOOD, date=date.today())
+        call_command('cleanup_old_expenses', '--days=365', '--background', stdout=StringIO())
+        out = StringIO()
+        call_command('run_workers', '--once', stdout=out)
+        assert 'processed 1 jobs' in out.getvalue()
+        assert Expense.objects.filter(user=user).count() == 1
+        assert not ExpenseMonthlyTotal.objects.filter(user=user, month=old.replace(day=1)).exists()
+
+
+@pytest.mark.django_db
+class TestJobViews:
+    """Test cases for job status pages."""
+
+    def test_export_flow(self, authenticated_client, user, job_output_dir):
+        """Requesting an export queues a job whose file can be downloaded."""
+        Expense.objects.create(user=user, amount=Decimal('3.00'), date=date(2025, 1, 2))
+        response = authenticated_client.post(reverse('export_expenses'))
+        job = Job.objects.get(user=user)
+        assert response.url == reverse('job_detail', args=[job.pk])
+
+        response = authenticated_client.get(reverse('job_detail', args=[job.pk]))
+        assert b'http-equiv="refresh"' in response.content
+
+        jobs.work(once=True)
+        response = authenticated_client.get(reverse('download_job', args=[job.pk]))
+        assert response.status_code == 200
+        assert b'Date,Amount,Category,Description' in b''.join(response.streaming_content)
+
+    def test_other_users_job_hidden(self, authenticated_client, django_user_model):
+        """Users cannot view other users' jobs."""
+        other = django_user_model.objects.create_user(username='other', password='otherpass')
+        job = jobs.enqueue('export_expenses', {'user_id': other.pk}, user=other)
+        response = authenticated_client.get(reverse('job_detail', args=[job.pk]))
+        assert response.status_code == 404
+
+
+def idle(*args):
+    time.sleep(60)
+
+
+def sigterm_once_handled(original):
+    """Send SIGTERM to this process once a handler replaced ``original``."""
+    while signal.getsignal(signal.SIGTERM) is original:
+        time.sleep(0.01)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+class TestRunWorkers:
+    """Test cases for the worker processes."""
+
+    def test_sigterm_stops_children(self, monkeypatch):
+        """SIGTERM to the parent stops its worker processes instead of orphaning them."""
+        monkeypatch.setattr(run_workers, 'run_process', idle)
+        original = signal.getsignal(signal.SIGTERM)
+        threading.Thread(target=sigterm_once_handled, args=(original,), daemon=True).start()
+        started = time.monotonic()
+        run_workers.run_children(2, 1, False, 1.0)
+        assert time.monotonic() - started < 30
+        assert signal.getsignal(signal.SIGTERM) is original
@@ -0,0 +1,86 @@
+"""
+Tests for the in-process load test command.
+"""
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+
+from expenses.management.commands.loadtest import parse_mix
+from expenses.models import Expense
+
+
+@pytest.fixture
+def seeded_users():
+    """Users as created by generate_test_data, with a few expenses each."""
+    users = []
+    for i in range(2):
+        user = User.objects.create_user(
+            username=f'testuser{i + 1}', email=f'testuser{i + 1}@example.com',
+            password='testpass123'
+        )
+        for day in range(1, 6):
+            Expense.objects.create(
+                user=user, amount=Decimal('10.00'), category='FOOD',
+                date=date(2024, 3, day), description='Lunch'
+            )
+        users.append(user)
+    return users
+
+
+def run(**options):
+    # One thread: the in-memory test database does not take concurrent writes
+    out = StringIO()
+    call_command('loadtest', users=1, threads=1, requests=6, seed=1, stdout=out, **options)
+    return out.getvalue()
+
+
+class TestParseMix:
+    """Test cases for the endpoint mix option."""
+
+    def test_weights(self):
+        """Short and full endpoint names are accepted; a bare name weighs 1."""
+        assert parse_mix('list:70, add_expense:10,delete') == {
+            'expense_list': 70, 'add_expense': 10, 'delete_expense': 1,
+        }
+
+    def test_invalid(self):
+        """Unknown endpoints and unusable weights are rejected."""
+        for value in ('list:70,export:5', 'list:x', 'list:-1', 'list:0'):
+            with pytest.raises(ValueError):
+                parse_mix(value)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadtestCommand:
+    """Test cases for the loadtest management command."""
+
+    def test_reports_each_endpoint(self, seeded_users):
+        """Throughput and latency percentiles are reported per endpoint."""
+        output = run(mix='list:2,add:1,edit:1')
+        for endpoint in ('expense_list', 'add_expense', 'edit_expense'):
+            line = next(line for line in output.splitlines() if line.startswith(endpoint))
+            assert line.split()[-1] == '0'
+        assert 'delete_expense' not in output
+        assert 'p99 ms' in output
+        assert 'Load test complete' in output
+
+    def test_writes_go_through_views(self, seeded_users):
+        """Adds and deletes change the seeded users' expenses."""
+        run(mix='add')
+        assert Expense.objects.filter(description='Load test expense').count() == 6
+        run(mix='delete')
+        assert Expense.objects.filter(user=seeded_users[0]).count() == 5
+
+    def test_requires_seeded_users(self):
+        """Without generate_test_data users the command stops at login."""
+        with pytest.raises(CommandError, match='generate_test_data'):
+            run()
+
+    def test_invalid_mix(self, seeded_users):
+        """A bad mix is reported as a command error."""
+        with pytest.raises(CommandError, match='Unknown endpoint'):
+            run(mix='list:1,export:1')
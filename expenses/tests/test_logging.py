@@ -0,0 +1,150 @@
+"""
+Tests for the queued JSON logging pipeline and request log context.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+
+import pytest
+from django.urls import reverse
+
+from expense_tracker.log import (
+    BackgroundHandler, JSONFormatter, RequestContextFilter, bind_context, reset_context,
+)
+
+
+class ListHandler(logging.Handler):
+    """Collect records, optionally waiting for ``gate`` before each one."""
+
+    def __init__(self, gate=None):
+        super().__init__()
+        self.records = []
+        self.threads = []
+        self.gate = gate
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        self.records.append(record)
+        self.threads.append(threading.get_ident())
+
+
+@pytest.fixture
+def captured():
+    """Records of ``expense_tracker`` loggers, with request context."""
+    handler = ListHandler()
+    handler.addFilter(RequestContextFilter())
+    logger = logging.getLogger('expense_tracker')
+    logger.addHandler(handler)
+    yield handler.records
+    logger.removeHandler(handler)
+
+
+def make_record(msg, *args):
+    return logging.makeLogRecord({'msg': msg, 'args': args, 'levelno': logging.INFO})
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'Timed out waiting for the log listener'
+        time.sleep(0.01)
+
+
+class TestJSONFormatter:
+    """Test cases for JSON log lines."""
+
+    def test_fields(self):
+        """Context, extras and exceptions become JSON fields."""
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = logging.getLogger('test').makeRecord(
+                'test', logging.ERROR, __file__, 1, 'Failed %s', ('export',), sys.exc_info(),
+                extra={'status': 500, 'latency_ms': 12.5},
+            )
+        token = bind_context(request_id='abc123', user_id=7)
+        try:
+            RequestContextFilter().filter(record)
+        finally:
+            reset_context(token)
+        entry = json.loads(JSONFormatter().format(record))
+        assert entry['message'] == 'Failed export'
+        assert entry['level'] == 'ERROR'
+        assert (entry['request_id'], entry['user_id'], entry['status']) == ('abc123', 7, 500)
+        assert entry['latency_ms'] == 12.5
+        assert 'ValueError: boom' in entry['exception']
+        assert 'view' not in entry
+
+
+class TestBackgroundHandler:
+    """Test cases for the queue handler and its listener thread."""
+
+    def test_records_reach_targets(self):
+        """Records are written by the listener with their arguments merged."""
+        target = ListHandler()
+        handler = BackgroundHandler()
+        handler.targets = [target]
+        args = ['before']
+        handler.handle(make_record('value %s', args))
+        args[0] = 'after'
+        wait_for(lambda: target.records)
+        handler.stop()
+        assert target.records[0].getMessage() == "value ['before']"
+        assert target.threads[0] != threading.get_ident()
+
+    def test_never_blocks(self):
+        """A stuck target drops records instead of blocking the caller."""
+        gate = threading.Event()
+        target = ListHandler(gate)
+        handler = BackgroundHandler(maxsize=2)
+        handler.targets = [target]
+        start = time.monotonic()
+        for i in range(10):
+            handler.handle(make_record(f'record {i}'))
+        assert time.monotonic() - start < 1
+        assert handler.dropped > 0
+        gate.set()
+        wait_for(lambda: target.records)
+        handler.handle(make_record('later'))
+        wait_for(lambda: any('dropped' in r.getMessage() for r in target.records))
+        handler.stop()
+
+    def test_settings_connect_targets(self):
+        """configure_logging points the queue at the handlers it names."""
+        handler = logging.getLogger('expenses').handlers[0]
+        assert isinstance(handler, BackgroundHandler)
+        assert [target.name for target in handler.targets] == ['console', 'file', 'mail_admins']
+
+
+@pytest.mark.django_db
+class TestRequestLogMiddleware:
+    """Test cases for request ids and access lines."""
+
+    def test_access_line(self, authenticated_client, user, captured):
+        """Each request logs its view, user, status and latency."""
+        response = authenticated_client.get(reverse('expense_list'))
+        record = next(r for r in captured if r.name == 'expense_tracker.requests')
+        assert record.request_id == response['X-Request-ID']
+        assert (record.view, record.user_id, record.status) == ('expense_list', user.pk, 200)
+        assert record.path == reverse('expense_list')
+        assert record.latency_ms > 0
+
+    def test_uses_proxy_request_id(self, client):
+        """A well-formed X-Request-ID from nginx is kept; others are replaced."""
+        response = client.get(reverse('health'), HTTP_X_REQUEST_ID='f3a9c1d2e4')
+        assert response['X-Request-ID'] == 'f3a9c1d2e4'
+        response = client.get(reverse('health'), HTTP_X_REQUEST_ID='bad id\nvalue')
+        assert response['X-Request-ID'] != 'bad id\nvalue'
+        assert len(response['X-Request-ID']) == 32
+
+    def test_context_reaches_other_loggers(self, authenticated_client, captured):
+        """Messages logged while handling a request carry its id."""
+        response = authenticated_client.post(
+            reverse('export_expenses'), HTTP_X_REQUEST_START=f't={time.time() - 60}'
+        )
+        assert response.status_code == 503
+        shed = next(r for r in captured if r.name == 'expense_tracker.middleware')
+        assert shed.request_id == response['X-Request-ID']
@@ -33,12 +33,24 @@ class TestExpenseModel:
         expense = Expense.objects.create(
             user=user,
             amount=Decimal('25.50'),
+            currency='USD',
             category=ExpenseCategory.TRANSPORT,
             date=date.today()
         )
         expected = f"{user.username} - $25.50 (Transportation)"
         assert str(expense) == expected
 
+    def test_expense_str_uses_currency_symbol(self, user):
+        """Expenses default to the configured currency and show its symbol."""
+        expense = Expense.objects.create(
+            user=user,
+            amount=Decimal('25.50'),
+            category=ExpenseCategory.TRANSPORT,
+            date=date.today()
+        )
+        assert expense.currency == 'GHS'
+        assert str(expense) == f"{user.username} - ₵25.50 (Transportation)"
+
     def test_expense_ordering(self, user):
         """Test that expenses are ordered by date descending."""
         from datetime import timedelta
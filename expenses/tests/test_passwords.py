@@ -0,0 +1,169 @@
+"""
+Tests for login and signup with password hashing in the hashing pool.
+"""
+import asyncio
+import threading
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from expenses.passwords import HashingBusy, HashingPool, hashing_pool
+
+LOGIN_URL = reverse('login')
+
+
+def thread_name():
+    return threading.current_thread().name
+
+
+def in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class TestHashingPool:
+    """Test cases for the bounded hashing pool."""
+
+    def test_runs_in_pool_threads(self):
+        """Work runs on the pool's threads, off the caller's."""
+        pool = HashingPool(threads=2, max_pending=0)
+        assert asyncio.run(pool.run(thread_name)).startswith('hashing')
+        assert pool.pending == 0
+
+    def test_inline_without_threads(self):
+        """AUTH_HASH_THREADS=0 skips the pool but stays off the event loop."""
+        pool = HashingPool(threads=0, max_pending=0)
+        assert not asyncio.run(pool.run(thread_name)).startswith('hashing')
+        assert not asyncio.run(pool.run(in_event_loop))
+
+    def test_refuses_beyond_pending_limit(self):
+        """Work beyond the running and waiting limits is refused."""
+        pool = HashingPool(threads=1, max_pending=1)
+        pool.pending = 2
+        with pytest.raises(HashingBusy):
+            asyncio.run(pool.run(thread_name))
+
+
+# Hashing threads use their own connections, so the users must be committed
+@pytest.mark.django_db(transaction=True)
+class TestLoginView:
+    """Test cases for the async login view."""
+
+    def test_login(self, client, user):
+        """Valid credentials log in and follow a safe next URL."""
+        response = client.post(
+            f'{LOGIN_URL}?next=/budgets/', {'username': 'testuser', 'password': 'testpass123'}
+        )
+        assert response.status_code == 302
+        assert response.url == '/budgets/'
+        assert client.get(reverse('expense_list')).status_code == 200
+
+    def test_login_inline(self, settings, client, user):
+        """Logins also work with AUTH_HASH_THREADS=0, hashing without the pool."""
+        settings.AUTH_HASH_THREADS = 0
+        response = client.post(LOGIN_URL, {'username': 'testuser', 'password': 'testpass123'})
+        assert response.status_code == 302
+        assert client.get(reverse('expense_list')).status_code == 200
+
+    def test_ignores_external_next(self, client, user):
+        """Redirects never leave the site."""
+        response = client.post(LOGIN_URL, {
+            'username': 'testuser', 'password': 'testpass123', 'next': 'https://evil.example/',
+        })
+        assert response.url == reverse('expense_list')
+
+    def test_wrong_password(self, client, user):
+        """Wrong passwords and unknown users get the same form error."""
+        for username, password in (('testuser', 'wrong'), ('nobody', 'testpass123')):
+            response = client.post(LOGIN_URL, {'username': username, 'password': password})
+            assert response.status_code == 200
+            assert 'Please enter a correct username and password' in response.content.decode()
+
+    def test_failed_login_signal(self, client, user):
+        """Failed logins send ``user_login_failed`` for lockout and audit hooks."""
+        failures = []
+
+        def receiver(sender, credentials, request, **kwargs):
+            failures.append((credentials['username'], request.path))
+
+        user_login_failed.connect(receiver)
+        try:
+            client.post(LOGIN_URL, {'username': 'testuser', 'password': 'wrong'})
+        finally:
+            user_login_failed.disconnect(receiver)
+        assert failures == [('testuser', LOGIN_URL)]
+
+    def test_uses_authentication_backends(self, settings, client, user):
+        """Login goes through ``AUTHENTICATION_BACKENDS``, not a fixed backend."""
+        settings.AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.AllowAllUsersModelBackend']
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        response = client.post(LOGIN_URL, {'username': 'testuser', 'password': 'testpass123'})
+        assert response.status_code == 302
+        assert client.session['_auth_user_backend'] == settings.AUTHENTICATION_BACKENDS[0]
+
+    def test_inactive_user(self, client, user):
+        """Deactivated accounts cannot log in."""
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        response = client.post(LOGIN_URL, {'username': 'testuser', 'password': 'testpass123'})
+        assert response.status_code == 200
+
+    def test_upgrades_old_hashes(self, settings, client, user):
+        """Passwords stored with an older hasher are rehashed on login."""
+        settings.PASSWORD_HASHERS = [
+            'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+            'django.contrib.auth.hashers.MD5PasswordHasher',
+        ]
+        User.objects.filter(pk=user.pk).update(
+            password=make_password('testpass123', hasher='md5')
+        )
+        client.post(LOGIN_URL, {'username': 'testuser', 'password': 'testpass123'})
+        user.refresh_from_db()
+        assert user.password.startswith('pbkdf2_sha256$')
+
+    def test_busy(self, settings, client, user):
+        """A full hashing pool answers 503 without hashing."""
+        settings.AUTH_HASH_THREADS = 1
+        settings.AUTH_HASH_MAX_PENDING = 0
+        hashing_pool().pending = 1
+        response = client.post(LOGIN_URL, {'username': 'testuser', 'password': 'testpass123'})
+        hashing_pool().pending = 0
+        assert response.status_code == 503
+        assert response['Retry-After'] == '5'
+        assert 'Please try again shortly' in response.content.decode()
+
+
+@pytest.mark.django_db
+class TestAsyncSignUp:
+    """Test cases for signup with the password hashed in the pool."""
+
+    def test_signup_hashes_password(self, client):
+        """The new account can log in with its password."""
+        response = client.post(reverse('signup'), {
+            'username': 'newuser',
+            'email': 'newuser@example.com',
+            'password1': 'complexpass123',
+            'password2': 'complexpass123',
+        })
+        assert response.status_code == 302
+        assert User.objects.get(username='newuser').check_password('complexpass123')
+
+    def test_signup_busy(self, settings, client):
+        """Signups are refused with 503 while the pool is full."""
+        settings.AUTH_HASH_THREADS = 1
+        settings.AUTH_HASH_MAX_PENDING = 0
+        hashing_pool().pending = 1
+        response = client.post(reverse('signup'), {
+            'username': 'newuser',
+            'email': 'newuser@example.com',
+            'password1': 'complexpass123',
+            'password2': 'complexpass123',
+        })
+        hashing_pool().pending = 0
+        assert response.status_code == 503
+        assert not User.objects.filter(username='newuser').exists()
@@ -0,0 +1,100 @@
+"""
+EXPLAIN regression tests for the expense list query.
+"""
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+
+from expenses.models import Expense, ExpenseCategory
+from expenses.query_plans import (
+    LIST_FILTERS, list_filter_combinations, list_query_plans, plan_regressions,
+)
+
+
+@pytest.mark.django_db
+class TestListQueryPlans:
+    """Test cases for the indexes behind ExpenseListView."""
+
+    def test_every_combination_is_checked(self):
+        """Filters are tried alone and together, with and without a cursor."""
+        combinations = list(list_filter_combinations())
+        assert {} in combinations
+        assert len(combinations) == 2 * 2 * 2 * 3 * 2
+        assert set(LIST_FILTERS) in [set(params) for params in combinations]
+
+    def test_plans_use_an_index(self, user):
+        """No filter combination scans the table or sorts the results."""
+        regressed = {
+            str(params): regressions
+            for params, plan, regressions in list_query_plans(user)
+            if regressions
+        }
+        assert regressed == {}
+
+    def test_category_and_date_range_use_covering_index(self, user):
+        """Category plus dates is answered by the (user, category, date) index."""
+        if connection.vendor != 'sqlite':
+            pytest.skip('Plan text is SQLite specific')
+        plans = {
+            tuple(sorted(params)): plan
+            for params, plan, regressions in list_query_plans(user)
+        }
+        plan = plans[('category', 'date_from', 'date_to')]
+        assert 'user_id=? AND category_code=? AND date>? AND date<?' in plan
+
+    def test_detects_sqlite_regressions(self):
+        """Full scans and temporary sort trees are reported."""
+        plan = (
+            '3 0 0 SEARCH expenses_expense USING INDEX expenses_ex_user_id_b4409f_idx '
+            '(user_id=? AND category_code=?)\n'
+            '12 0 0 USE TEMP B-TREE FOR ORDER BY'
+        )
+        assert plan_regressions(plan, 'sqlite') == ['12 0 0 USE TEMP B-TREE FOR ORDER BY']
+        assert plan_regressions('2 0 0 SCAN expenses_expense', 'sqlite')
+
+    def test_detects_postgresql_regressions(self):
+        """Sequential scans and sort nodes are reported."""
+        plan = (
+            'Limit  (cost=10.1..10.2 rows=20 width=80)\n'
+            '  ->  Sort  (cost=10.1..10.3 rows=40 width=80)\n'
+            '        Sort Key: date DESC, created_at DESC\n'
+            '        ->  Seq Scan on expenses_expense  (cost=0.0..9.0 rows=40 width=80)'
+        )
+        assert len(plan_regressions(plan, 'postgresql')) == 2
+        index_plan = (
+            'Limit  (cost=0.2..8.2 rows=20 width=80)\n'
+            '  ->  Index Scan using expenses_ex_user_id_19a12b_idx on expenses_expense'
+        )
+        assert plan_regressions(index_plan, 'postgresql') == []
+
+    def test_command_reports_success(self, user, capsys):
+        """The command passes when every plan uses an index."""
+        call_command('explain_expense_queries', user='testuser')
+        assert 'All list query plans use an index' in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+class TestListSearch:
+    """Test cases for the list search filter."""
+
+    def test_numeric_search_matches_amount(self, authenticated_client, user):
+        """Numeric terms find expenses with exactly that amount."""
+        for amount in ('12.50', '112.50'):
+            Expense.objects.create(
+                user=user, amount=Decimal(amount), category=ExpenseCategory.FOOD,
+                date=date.today()
+            )
+        response = authenticated_client.get(reverse('expense_list'), {'search': '12.5'})
+        assert [e.amount for e in response.context['expenses']] == [Decimal('12.50')]
+
+    def test_text_search_matches_description(self, authenticated_client, user):
+        """Other terms match the description."""
+        Expense.objects.create(
+            user=user, amount=Decimal('5.00'), category=ExpenseCategory.FOOD,
+            date=date.today(), description='Lunch with team'
+        )
+        response = authenticated_client.get(reverse('expense_list'), {'search': 'lunch'})
+        assert len(response.context['expenses']) == 1
@@ -0,0 +1,124 @@
+"""
+Tests for recurring expenses.
+"""
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+from io import StringIO
+
+from expenses.models import (
+    Expense, ExpenseCategory, ExpenseMonthlyTotal, RecurrenceFrequency, RecurringExpense,
+)
+from expenses.recurring import materialize_recurring
+
+
+@pytest.fixture
+def monthly_rent(user):
+    return RecurringExpense.objects.create(
+        user=user,
+        amount=Decimal('500.00'),
+        category=ExpenseCategory.BILLS,
+        description='Rent',
+        frequency=RecurrenceFrequency.MONTHLY,
+        start_date=date(2025, 1, 31),
+    )
+
+
+@pytest.mark.django_db
+class TestRecurringSchedule:
+    """Test cases for occurrence dates."""
+
+    def test_month_end_is_clamped(self, monthly_rent):
+        """Monthly occurrences keep the start day, clamped to short months."""
+        dates = [monthly_rent.occurrence(index) for index in range(4)]
+        assert dates == [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30)]
+
+    def test_due_dates_respect_end_date(self, user):
+        """No occurrences are generated after the end date."""
+        weekly = RecurringExpense.objects.create(
+            user=user, amount=Decimal('10.00'), frequency=RecurrenceFrequency.WEEKLY,
+            interval=2, start_date=date(2025, 1, 1), end_date=date(2025, 1, 31),
+        )
+        dates, next_date = weekly.due_dates(date(2025, 3, 1))
+        assert dates == [date(2025, 1, 1), date(2025, 1, 15), date(2025, 1, 29)]
+        assert next_date == date(2025, 2, 12)
+
+
+@pytest.mark.django_db
+class TestMaterializeRecurring:
+    """Test cases for the occurrence scheduler."""
+
+    def test_catches_up_missed_periods(self, monthly_rent):
+        """Every missed occurrence is created in one run."""
+        templates, created = materialize_recurring(today=date(2025, 4, 15))
+        assert (templates, created) == (1, 3)
+        assert list(
+            Expense.objects.filter(recurring=monthly_rent).values_list('date', flat=True).order_by('date')
+        ) == [date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)]
+        monthly_rent.refresh_from_db()
+        assert monthly_rent.next_date == date(2025, 4, 30)
+
+    def test_rerun_is_idempotent(self, monthly_rent):
+        """Running again, even after a reset cursor, creates no duplicates."""
+        materialize_recurring(today=date(2025, 2, 28))
+        assert materialize_recurring(today=date(2025, 2, 28)) == (0, 0)
+
+        RecurringExpense.objects.filter(pk=monthly_rent.pk).update(next_date=monthly_rent.start_date)
+        templates, created = materialize_recurring(today=date(2025, 2, 28))
+        assert (templates, created) == (1, 0)
+        assert Expense.objects.filter(recurring=monthly_rent).count() == 2
+
+    def test_monthly_totals_resynced(self, monthly_rent, user):
+        """Generated occurrences are reflected in the monthly totals."""
+        materialize_recurring(today=date(2025, 2, 28))
+        total = ExpenseMonthlyTotal.objects.get(user=user, month=date(2025, 2, 1))
+        assert total.total == Decimal('500.00')
+        assert total.count == 1
+
+    def test_finished_template_deactivated(self, user):
+        """Templates past their end date stop being scheduled."""
+        template = RecurringExpense.objects.create(
+            user=user, amount=Decimal('20.00'), frequency=RecurrenceFrequency.DAILY,
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 3),
+        )
+        materialize_recurring(today=date(2025, 1, 10))
+        template.refresh_from_db()
+        assert not template.is_active
+        assert template.occurrences.count() == 3
+
+    def test_command(self, monthly_rent):
+        """The management command reports created occurrences."""
+        out = StringIO()
+        call_command('materialize_recurring', '--date=2025-02-28', '--batch-size=1', stdout=out)
+        assert '2 expenses' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestRecurringViews:
+    """Test cases for recurring expense views."""
+
+    def test_create_recurring(self, authenticated_client, user):
+        """Posting the form creates a template for the user."""
+        response = authenticated_client.post(reverse('add_recurring'), {
+            'amount': '30.00',
+            'category': ExpenseCategory.ENTERTAINMENT,
+            'description': 'Streaming',
+            'frequency': RecurrenceFrequency.MONTHLY,
+            'interval': 1,
+            'start_date': '2025-01-15',
+        })
+        assert response.status_code == 302
+        template = RecurringExpense.objects.get(user=user)
+        assert template.next_date == date(2025, 1, 15)
+
+    def test_cannot_delete_other_users_template(self, authenticated_client, django_user_model):
+        """Users can only delete their own templates."""
+        other = django_user_model.objects.create_user(username='other', password='otherpass')
+        template = RecurringExpense.objects.create(
+            user=other, amount=Decimal('10.00'), start_date=date(2025, 1, 1)
+        )
+        response = authenticated_client.post(reverse('delete_recurring', args=[template.pk]))
+        assert response.status_code == 404
+        assert RecurringExpense.objects.filter(pk=template.pk).exists()
@@ -0,0 +1,86 @@
+"""
+Tests for expense template rendering caches.
+"""
+import pytest
+from django.contrib.auth.forms import AuthenticationForm
+from django.core.cache import cache
+from django.template import Context, Template
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+
+from expenses.models import Expense, ExpenseCategory
+from expenses.templatetags.expense_tags import crispy_cached, row_cache_key
+
+
+@pytest.mark.django_db
+class TestExpenseRows:
+    """Test cases for the expense_rows template tag."""
+
+    def render(self, expenses):
+        template = Template('{% load expense_tags %}{% expense_rows expenses %}')
+        return template.render(Context({'expenses': expenses}))
+
+    def test_renders_rows_without_cache(self, user, settings):
+        """Rows render and nothing is cached when the timeout is 0."""
+        settings.TEMPLATE_FRAGMENT_CACHE_TIMEOUT = 0
+        expense = Expense.objects.create(
+            user=user,
+            amount=Decimal('42.00'),
+            category=ExpenseCategory.FOOD,
+            date=date.today(),
+            description='Lunch'
+        )
+        html = self.render([expense])
+        assert 'Lunch' in html
+        assert cache.get(row_cache_key(expense)) is None
+
+    def test_rows_cached_until_updated(self, user, settings):
+        """Cached rows are keyed by updated_at so edits are re-rendered."""
+        settings.TEMPLATE_FRAGMENT_CACHE_TIMEOUT = 60
+        expense = Expense.objects.create(
+            user=user,
+            amount=Decimal('42.00'),
+            category=ExpenseCategory.FOOD,
+            date=date.today(),
+            description='Lunch'
+        )
+        self.render([expense])
+        assert 'Lunch' in cache.get(row_cache_key(expense))
+
+        expense.description = 'Dinner'
+        expense.save()
+        html = self.render([expense])
+        assert 'Dinner' in html
+
+    def test_list_view_uses_row_cache(self, authenticated_client, user, settings):
+        """The list page renders rows through the cached row template."""
+        settings.TEMPLATE_FRAGMENT_CACHE_TIMEOUT = 60
+        expense = Expense.objects.create(
+            user=user,
+            amount=Decimal('42.00'),
+            category=ExpenseCategory.FOOD,
+            date=date.today(),
+            description='Lunch'
+        )
+        response = authenticated_client.get(reverse('expense_list'))
+        assert response.status_code == 200
+        assert 'Lunch' in response.content.decode()
+        assert cache.get(row_cache_key(expense)) is not None
+
+
+class TestCrispyCached:
+    """Test cases for the crispy_cached filter."""
+
+    def test_unbound_form_output_reused(self, settings):
+        """Unbound forms of the same class share rendered output."""
+        settings.CRISPY_RENDER_CACHE = True
+        first = crispy_cached(AuthenticationForm())
+        second = crispy_cached(AuthenticationForm())
+        assert first is second
+
+    def test_bound_form_not_cached(self, settings):
+        """Bound forms are always rendered fresh to show their data."""
+        settings.CRISPY_RENDER_CACHE = True
+        form = AuthenticationForm(data={'username': 'someone', 'password': ''})
+        assert 'someone' in crispy_cached(form)
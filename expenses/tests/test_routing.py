@@ -0,0 +1,154 @@
+"""
+Tests for read-replica routing.
+"""
+import time
+import pytest
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+
+from expense_tracker import routers
+from expense_tracker.middleware import REPLICA_PIN_COOKIE
+from expense_tracker.routers import ReplicaRouter, replica_reads, routing_context
+from expenses.models import Expense, ExpenseCategory
+
+
+@pytest.fixture
+def replicas(settings, monkeypatch):
+    """Configure one replica whose lag the test controls."""
+    settings.DATABASE_REPLICAS = ['replica']
+    settings.REPLICA_MAX_LAG = 5
+    lags = {'replica': 0.0}
+    monkeypatch.setattr(routers, 'replica_lag', lambda alias: lags[alias])
+    routers.lag_monitor.clear()
+    yield lags
+    routers.lag_monitor.clear()
+
+
+@pytest.fixture
+def healthy_calls(settings, monkeypatch):
+    """Record replica selection attempts and always fall back to the primary."""
+    settings.DATABASE_REPLICAS = ['replica']
+    calls = []
+
+    def healthy(aliases, max_lag=None):
+        calls.append(list(aliases))
+        return []
+
+    monkeypatch.setattr(routers.lag_monitor, 'healthy', healthy)
+    return calls
+
+
+class TestReplicaRouter:
+    """Test cases for routing decisions."""
+
+    router = ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self, replicas):
+        """Reads outside replica_reads() stay on the primary."""
+        with routing_context():
+            assert self.router.db_for_read(Expense) == DEFAULT_DB_ALIAS
+
+    def test_opted_in_reads_use_replica(self, replicas):
+        """Reads inside replica_reads() go to a healthy replica."""
+        with replica_reads():
+            assert self.router.db_for_read(Expense) == 'replica'
+
+    def test_other_apps_use_primary(self, replicas):
+        """Only REPLICA_ROUTED_APPS are read from replicas."""
+        with replica_reads():
+            assert self.router.db_for_read(User) == DEFAULT_DB_ALIAS
+
+    def test_no_replicas_configured(self, settings):
+        """Without replicas every read goes to the primary."""
+        settings.DATABASE_REPLICAS = []
+        with replica_reads():
+            assert self.router.db_for_read(Expense) == DEFAULT_DB_ALIAS
+
+    def test_write_pins_rest_of_request(self, replicas):
+        """After a write, later reads in the same request see it."""
+        with routing_context(), replica_reads():
+            assert self.router.db_for_write(Expense) == DEFAULT_DB_ALIAS
+            assert self.router.db_for_read(Expense) == DEFAULT_DB_ALIAS
+
+    def test_pinned_client_uses_primary(self, replicas):
+        """A client that wrote recently reads from the primary."""
+        with routing_context(pinned=True), replica_reads():
+            assert self.router.db_for_read(Expense) == DEFAULT_DB_ALIAS
+
+    def test_lagging_replica_falls_back(self, replicas):
+        """A replica behind by more than REPLICA_MAX_LAG is skipped."""
+        replicas['replica'] = 30.0
+        with replica_reads():
+            assert self.router.db_for_read(Expense) == DEFAULT_DB_ALIAS
+
+    def test_unreachable_replica_falls_back(self, replicas):
+        """A replica that cannot be reached is skipped."""
+        replicas['replica'] = None
+        with replica_reads():
+            assert self.router.db_for_read(Expense) == DEFAULT_DB_ALIAS
+
+    def test_max_lag_tightens_limit(self, replicas):
+        """replica_reads(max_lag=...) requires a fresher replica."""
+        replicas['replica'] = 2.0
+        with replica_reads(max_lag=1):
+            assert self.router.db_for_read(Expense) == DEFAULT_DB_ALIAS
+        routers.lag_monitor.clear()
+        with replica_reads(max_lag=3):
+            assert self.router.db_for_read(Expense) == 'replica'
+
+    def test_lag_checks_are_cached(self, replicas, settings, monkeypatch):
+        """The lag is measured at most once per check interval."""
+        settings.REPLICA_LAG_CHECK_INTERVAL = 60
+        calls = []
+        monkeypatch.setattr(
+            routers, 'replica_lag', lambda alias: calls.append(alias) or 0.0
+        )
+        with replica_reads():
+            for _ in range(3):
+                self.router.db_for_read(Expense)
+        assert calls == ['replica']
+
+    def test_replicas_are_never_migrated(self, replicas):
+        """Replicas receive their schema from the primary."""
+        assert self.router.allow_migrate('replica', 'expenses') is False
+        assert self.router.allow_migrate(DEFAULT_DB_ALIAS, 'expenses') is None
+
+
+@pytest.mark.django_db
+class TestReadYourWrites:
+    """Test cases for the replica routing middleware."""
+
+    def test_write_sets_pin_cookie(self, authenticated_client):
+        """Saving an expense pins the client to the primary."""
+        response = authenticated_client.post(reverse('add_expense'), {
+            'amount': '10.00',
+            'category': ExpenseCategory.FOOD,
+            'description': 'Lunch',
+            'date': date.today().isoformat(),
+        })
+        assert response.status_code == 302
+        assert float(response.cookies[REPLICA_PIN_COOKIE].value) > time.time()
+
+    def test_read_does_not_set_pin_cookie(self, authenticated_client):
+        """Read-only pages leave the client unpinned."""
+        response = authenticated_client.get(reverse('expense_list'))
+        assert REPLICA_PIN_COOKIE not in response.cookies
+
+    def test_list_view_tries_replica(self, authenticated_client, user, healthy_calls):
+        """The expense list is served from a replica when one is healthy."""
+        Expense.objects.create(
+            user=user, amount=Decimal('5.00'), category=ExpenseCategory.FOOD, date=date.today()
+        )
+        response = authenticated_client.get(reverse('expense_list'))
+        assert response.status_code == 200
+        assert healthy_calls
+
+    def test_pinned_list_view_uses_primary(self, authenticated_client, healthy_calls):
+        """A client pinned by a recent write skips the replicas."""
+        authenticated_client.cookies[REPLICA_PIN_COOKIE] = str(int(time.time()) + 60)
+        response = authenticated_client.get(reverse('expense_list'))
+        assert response.status_code == 200
+        assert healthy_calls == []
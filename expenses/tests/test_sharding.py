@@ -0,0 +1,297 @@
+"""
+Tests for per-user expense sharding.
+"""
+import csv
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import reverse
+from django.utils import timezone
+from decimal import Decimal
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from expense_tracker.routers import ShardRouter, routing_user
+from expenses import sharding, tasks
+from expenses.aggregates import spending_analytics
+from expenses.management.commands.rebalance_shards import plan_moves
+from expenses.models import (
+    Budget, Expense, ExpenseCategory, ExpenseMonthlyTotal, RecurringExpense, UserShard,
+)
+from expenses.recurring import materialize_recurring
+
+SHARD = 'shard1'
+
+
+@pytest.fixture
+def shards(settings):
+    """Spread users over the primary and one shard."""
+    settings.EXPENSE_SHARDS = [DEFAULT_DB_ALIAS, SHARD]
+    settings.SHARD_MOVE_GRACE = 0
+    settings.SHARD_CACHE_TIMEOUT = 0
+    return settings.EXPENSE_SHARDS
+
+
+@pytest.fixture
+def sharded_user(shards):
+    """A user whose expenses live on the shard."""
+    user = User.objects.create_user(username='sharded', password='testpass123')
+    sharding.assign_shard(user, SHARD)
+    return user
+
+
+def block_writes(user):
+    """Mark ``user`` as being moved, as ``move_user`` does."""
+    UserShard.objects.filter(user=user).update(
+        moving_until=timezone.now() + timedelta(minutes=5)
+    )
+
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, SHARD])
+class TestShardMap:
+    """Test cases for assigning users to shards."""
+
+    def test_disabled_by_default(self, user):
+        """Without EXPENSE_SHARDS everything stays on the primary."""
+        assert not sharding.sharding_enabled()
+        assert sharding.shard_for_user(user) == DEFAULT_DB_ALIAS
+        assert not UserShard.objects.exists()
+
+    def test_new_users_are_assigned(self, shards):
+        """New users get a shard and a copy of their row on it."""
+        users = [User.objects.create_user(username=f'user{i}') for i in range(2)]
+        for user in users:
+            alias = shards[user.pk % len(shards)]
+            assert UserShard.objects.get(user=user).alias == alias
+            assert sharding.shard_for_user(user) == alias
+        on_shard = [user for user in users if sharding.shard_for_user(user) == SHARD]
+        assert User.objects.using(SHARD).get(pk=on_shard[0].pk).username == on_shard[0].username
+
+    def test_user_changes_are_mirrored(self, sharded_user):
+        """Saving a user refreshes the copy on their shard."""
+        sharded_user.email = 'new@example.com'
+        sharded_user.save()
+        assert User.objects.using(SHARD).get(pk=sharded_user.pk).email == 'new@example.com'
+
+    def test_deleting_user_clears_shard(self, sharded_user, expense_factory):
+        """Deleting a user removes their rows from the shard."""
+        expense_factory(sharded_user)
+        sharded_user.delete()
+        assert not User.objects.using(SHARD).exists()
+        assert not Expense.objects.using(SHARD).exists()
+
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, SHARD])
+class TestShardRouter:
+    """Test cases for routing per-user rows."""
+
+    router = ShardRouter()
+
+    def test_writes_follow_the_user(self, sharded_user, expense_factory):
+        """Saving an expense writes it to its user's shard."""
+        expense = expense_factory(sharded_user)
+        assert expense._state.db == SHARD
+        assert Expense.objects.using(SHARD).filter(pk=expense.pk).exists()
+        assert not Expense.objects.using(DEFAULT_DB_ALIAS).exists()
+
+    def test_reads_use_context_user(self, sharded_user, expense_factory):
+        """Queries inside routing_user() read from that user's shard."""
+        expense_factory(sharded_user)
+        with routing_user(sharded_user.pk):
+            assert self.router.db_for_read(Expense) == SHARD
+            assert Expense.objects.filter(user=sharded_user).count() == 1
+
+    def test_unsharded_models_use_primary(self, sharded_user):
+        """Users, jobs and the shard map stay on the primary."""
+        with routing_user(sharded_user.pk):
+            assert self.router.db_for_read(User) is None
+            assert self.router.db_for_read(UserShard) is None
+
+    def test_related_objects_stay_together(self, sharded_user):
+        """Budgets and templates are saved next to the user's expenses."""
+        Budget.objects.create(
+            user=sharded_user, category=ExpenseCategory.FOOD, amount=Decimal('100.00')
+        )
+        RecurringExpense.objects.create(
+            user=sharded_user, amount=Decimal('5.00'), category=ExpenseCategory.BILLS,
+            description='Phone', start_date=date.today(), next_date=date.today(),
+        )
+        assert Budget.objects.using(SHARD).count() == 1
+        assert RecurringExpense.objects.using(SHARD).count() == 1
+
+    def test_views_use_users_shard(self, client, sharded_user):
+        """The expense pages read and write the signed-in user's shard."""
+        client.login(username='sharded', password='testpass123')
+        response = client.post(reverse('add_expense'), {
+            'amount': '12.50',
+            'category': ExpenseCategory.FOOD,
+            'description': 'Lunch',
+            'date': date.today().isoformat(),
+        })
+        assert response.status_code == 302
+        assert Expense.objects.using(SHARD).get().description == 'Lunch'
+        response = client.get(reverse('expense_list'))
+        assert b'Lunch' in response.content
+
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, SHARD])
+class TestScatterGather:
+    """Test cases for cross-shard reads."""
+
+    def test_scatter_calls_every_shard(self, shards):
+        """scatter() returns one result per shard in shard order."""
+        assert sharding.scatter(lambda alias: alias) == shards
+
+    def test_analytics_merge_shards(self, user, sharded_user, expense_factory):
+        """Admin analytics add up spending from every shard."""
+        expense_factory(user, '30.00')
+        expense_factory(sharded_user, '50.00')
+        data = spending_analytics(date.today())
+        assert data['month_total'] == Decimal('80.00')
+        assert [row['user__username'] for row in data['leaderboard']] == ['sharded', 'testuser']
+
+    def test_export_all_users(self, user, sharded_user, tmp_path, expense_factory):
+        """Exporting without --user merges every shard newest first."""
+        expense_factory(user, date=date(2024, 1, 1))
+        expense_factory(sharded_user, date=date(2024, 2, 1))
+        expense_factory(user, date=date(2024, 3, 1))
+        output = tmp_path / 'all.csv'
+        call_command('export_expenses', output=str(output))
+        with output.open() as csvfile:
+            rows = list(csv.reader(csvfile))[1:]
+        assert [(row[0], row[1]) for row in rows] == [
+            ('testuser', '2024-03-01'), ('sharded', '2024-02-01'), ('testuser', '2024-01-01'),
+        ]
+
+    def test_admin_browses_selected_shard(self, admin_client, sharded_user, settings, expense_factory):
+        """The admin changelist lists the shard chosen in its filter."""
+        settings.STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        expense = expense_factory(sharded_user)
+        url = reverse('admin:expenses_expense_changelist')
+        response = admin_client.get(url, {'shard': SHARD})
+        assert list(response.context['cl'].result_list) == [expense]
+        response = admin_client.get(url)
+        assert list(response.context['cl'].result_list) == []
+
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, SHARD])
+class TestRebalance:
+    """Test cases for moving users between shards."""
+
+    def test_move_user(self, shards, expense_factory):
+        """Moving a user copies their data, updates the map and cleans up."""
+        user = User.objects.create_user(username='mover')
+        sharding.assign_shard(user, DEFAULT_DB_ALIAS)
+        template = RecurringExpense.objects.create(
+            user=user, amount=Decimal('5.00'), category=ExpenseCategory.BILLS,
+            description='Phone', start_date=date.today(), next_date=date.today(),
+        )
+        expense_factory(user, '5.00', recurring=template)
+        expense_factory(user, '7.00')
+
+        assert sharding.move_user(user, SHARD) == 2
+        assert sharding.shard_for_user(user) == SHARD
+        assert not Expense.objects.using(DEFAULT_DB_ALIAS).filter(user=user).exists()
+        moved = Expense.objects.using(SHARD).filter(user=user)
+        assert moved.count() == 2
+        assert moved.get(amount=Decimal('5.00')).recurring.description == 'Phone'
+        total = ExpenseMonthlyTotal.objects.using(SHARD).get(user=user)
+        assert total.total == Decimal('12.00')
+        assert not ExpenseMonthlyTotal.objects.using(DEFAULT_DB_ALIAS).filter(user=user).exists()
+
+    def test_writes_blocked_during_move(self, shards, monkeypatch, expense_factory):
+        """Nothing can be written for the user while their data is copied."""
+        user = User.objects.create_user(username='mover')
+        sharding.assign_shard(user, DEFAULT_DB_ALIAS)
+        expense_factory(user, '7.00')
+        copy = sharding._copy_user_data
+
+        def copy_with_writes(*args):
+            with pytest.raises(sharding.UserMoving):
+                expense_factory(user, '9.00')
+            with pytest.raises(sharding.UserMoving):
+                Budget.objects.create(
+                    user=user, category=ExpenseCategory.FOOD, amount=Decimal('100.00')
+                )
+            with pytest.raises(sharding.UserMoving):
+                tasks.bulk_delete(user.pk, [])
+            return copy(*args)
+
+        monkeypatch.setattr(sharding, '_copy_user_data', copy_with_writes)
+        assert sharding.move_user(user, SHARD) == 1
+        expense_factory(user, '9.00')
+        assert Expense.objects.using(SHARD).filter(user=user).count() == 2
+        assert not Expense.objects.using(DEFAULT_DB_ALIAS).filter(user=user).exists()
+
+    def test_block_reaches_other_processes(self, shards, settings, monkeypatch, expense_factory):
+        """A process with its own cache sees the block and then the new shard."""
+        settings.SHARD_CACHE_TIMEOUT = 5
+        user = User.objects.create_user(username='mover')
+        sharding.assign_shard(user, DEFAULT_DB_ALIAS)
+        expense_factory(user, '7.00')
+        other_cache = LocMemCache('other-process', {})
+        waits = []
+
+        def in_other_process(func, *args):
+            with monkeypatch.context() as patch:
+                patch.setattr(sharding, 'cache', other_cache)
+                return func(*args)
+
+        def sleep(seconds):
+            # The other process's cached entries expire while the move waits
+            waits.append(seconds)
+            other_cache.clear()
+
+        copy = sharding._copy_user_data
+
+        def copy_checked(*args):
+            with pytest.raises(sharding.UserMoving):
+                in_other_process(sharding.check_writable, user.pk)
+            return copy(*args)
+
+        assert in_other_process(sharding.shard_for_user, user.pk) == DEFAULT_DB_ALIAS
+        monkeypatch.setattr(sharding, 'time', SimpleNamespace(sleep=sleep))
+        monkeypatch.setattr(sharding, '_copy_user_data', copy_checked)
+        sharding.move_user(user, SHARD)
+        assert waits == [5, 5]
+        assert in_other_process(sharding.shard_for_user, user.pk) == SHARD
+        in_other_process(sharding.check_writable, user.pk)
+
+    def test_views_refuse_writes_while_moving(self, client, sharded_user):
+        """Requests that write during a move get a 503 and change nothing."""
+        block_writes(sharded_user)
+        client.force_login(sharded_user)
+        response = client.post(reverse('add_expense'), {
+            'amount': '12.00', 'category': ExpenseCategory.FOOD, 'date': '2024-03-10',
+        })
+        assert response.status_code == 503
+        assert response['Retry-After'] == '10'
+        assert not Expense.objects.using(SHARD).filter(user=sharded_user).exists()
+        assert client.get(reverse('expense_list')).status_code == 200
+
+    def test_recurring_skips_moving_users(self, sharded_user):
+        """Occurrences of a moving user's templates wait for the next run."""
+        RecurringExpense.objects.create(
+            user=sharded_user, amount=Decimal('5.00'), category=ExpenseCategory.BILLS,
+            description='Phone', start_date=date.today(), next_date=date.today(),
+        )
+        block_writes(sharded_user)
+        assert materialize_recurring() == (0, 0)
+        UserShard.objects.filter(user=sharded_user).update(moving_until=None)
+        assert materialize_recurring() == (1, 1)
+
+    def test_rebalance_command(self, sharded_user, expense_factory):
+        """The command moves a named user to another shard."""
+        expense_factory(sharded_user)
+        call_command('rebalance_shards', user='sharded', to=DEFAULT_DB_ALIAS)
+        assert sharding.shard_for_user(sharded_user) == DEFAULT_DB_ALIAS
+        assert Expense.objects.using(DEFAULT_DB_ALIAS).filter(user=sharded_user).count() == 1
+        assert not User.objects.using(SHARD).filter(pk=sharded_user.pk).exists()
+
+    def test_plan_moves_narrows_gap(self):
+        """Balancing moves the user that best evens out the shards."""
+        loads = {'a': {1: 50, 2: 30, 3: 20}, 'b': {4: 10}}
+        moves = plan_moves(loads, max_users=10)
+        assert moves == [(1, 'a', 'b', 50)]
@@ -0,0 +1,92 @@
+"""
+Tests for the tuned SQLite backend.
+"""
+import pytest
+from django.db import OperationalError, connection
+from django.db.utils import load_backend
+
+from expenses.management.commands.benchmark_sqlite_writes import run_writer
+
+ENGINE = 'expense_tracker.db_backends.sqlite_tuned'
+
+
+@pytest.fixture
+def make_db(tmp_path, django_db_blocker):
+    """Build tuned connections to a fresh SQLite file."""
+    wrappers = []
+
+    def make(**pragmas):
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': ENGINE,
+            'NAME': str(tmp_path / 'tuned.sqlite3'),
+            'OPTIONS': {'timeout': 0.1},
+            'PRAGMAS': pragmas,
+        }
+        db = load_backend(ENGINE).DatabaseWrapper(settings_dict, f'tuned{len(wrappers)}')
+        wrappers.append(db)
+        return db
+
+    with django_db_blocker.unblock():
+        yield make
+        for db in wrappers:
+            db.close()
+
+
+class TestTunedSQLite:
+    """Test cases for pragmas and transaction mode."""
+
+    def test_pragmas_applied(self, make_db):
+        """New connections use WAL, NORMAL sync and the configured timeouts."""
+        db = make_db(busy_timeout=1234)
+        with db.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            assert cursor.fetchone()[0] == 'wal'
+            cursor.execute('PRAGMA synchronous')
+            assert cursor.fetchone()[0] == 1
+            cursor.execute('PRAGMA busy_timeout')
+            assert cursor.fetchone()[0] == 1234
+            cursor.execute('PRAGMA foreign_keys')
+            assert cursor.fetchone()[0] == 1
+
+    def test_transactions_take_write_lock_up_front(self, make_db):
+        """A second writer waits at BEGIN rather than failing mid-transaction."""
+        first, second = make_db(busy_timeout=50), make_db(busy_timeout=50)
+        with first.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (x INTEGER)')
+        first.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        try:
+            with pytest.raises(OperationalError, match='locked'):
+                second.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        finally:
+            first.rollback()
+            first.set_autocommit(True)
+
+    def test_readers_not_blocked_by_writer(self, make_db):
+        """With WAL a reader sees committed data while a write is open."""
+        writer, reader = make_db(), make_db()
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (x INTEGER)')
+            cursor.execute('INSERT INTO t VALUES (1)')
+        writer.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        try:
+            with writer.cursor() as cursor:
+                cursor.execute('INSERT INTO t VALUES (2)')
+            with reader.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM t')
+                assert cursor.fetchone()[0] == 1
+        finally:
+            writer.rollback()
+            writer.set_autocommit(True)
+
+    def test_benchmark_writer(self, make_db):
+        """The benchmark writer commits every transaction when alone."""
+        db = make_db()
+        with db.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE bench_totals (user_id INTEGER PRIMARY KEY, total NUMERIC, count INTEGER)'
+            )
+            cursor.execute(
+                'CREATE TABLE bench_expense (id INTEGER PRIMARY KEY, user_id INTEGER, amount NUMERIC)'
+            )
+        assert run_writer(db.settings_dict, 10, 0) == (10, 0)
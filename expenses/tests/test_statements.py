@@ -0,0 +1,150 @@
+"""
+Tests for monthly expense statements.
+"""
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date
+
+from expenses.models import Expense, ExpenseCategory
+from expenses.statements import (
+    generate_statement, previous_month, statement_path, stored_fingerprint,
+)
+
+MONTH = date(2024, 3, 1)
+
+
+@pytest.fixture(autouse=True)
+def statements_root(settings, tmp_path):
+    """Write statements to a temporary STATEMENTS_ROOT."""
+    settings.MEDIA_ROOT = tmp_path / 'media'
+    settings.STATEMENTS_ROOT = tmp_path / 'statements'
+    return settings.STATEMENTS_ROOT
+
+
+@pytest.fixture
+def add_expense(expense_factory):
+    """Create a cedi expense on ``day`` of ``MONTH``."""
+    def create(user, amount, category=ExpenseCategory.FOOD, day=5, **kwargs):
+        return expense_factory(
+            user, amount, category=category, date=MONTH.replace(day=day), currency='GHS', **kwargs
+        )
+    return create
+
+
+@pytest.mark.django_db
+class TestStatements:
+    """Test cases for building statements."""
+
+    def test_totals_by_category_and_day(self, user, add_expense):
+        """The statement lists category and daily totals for the month."""
+        add_expense(user, '10.00', day=1)
+        add_expense(user, '5.50', day=1)
+        add_expense(user, '20.00', ExpenseCategory.BILLS, day=15)
+        add_expense(user, '99.00', day=1).delete()
+        Expense.objects.create(
+            user=user, amount=Decimal('70.00'), category=ExpenseCategory.FOOD,
+            date=date(2024, 4, 1), currency='GHS'
+        )
+
+        assert generate_statement(user.pk, MONTH) == 'written'
+        html = statement_path(user.pk, MONTH).read_text()
+        assert '₵35.50' in html
+        assert '₵15.50' in html
+        assert '₵20.00' in html
+        assert '₵70.00' not in html
+        assert html.index('Bills') < html.index('Food')
+
+    def test_unchanged_statement_is_skipped(self, user, add_expense):
+        """A second run leaves the file alone until an expense changes."""
+        expense = add_expense(user, '10.00')
+        assert generate_statement(user.pk, MONTH) == 'written'
+        path = statement_path(user.pk, MONTH)
+        fingerprint = stored_fingerprint(path)
+        assert generate_statement(user.pk, MONTH) == 'unchanged'
+
+        expense.amount = Decimal('12.00')
+        expense.save()
+        assert generate_statement(user.pk, MONTH) == 'written'
+        assert stored_fingerprint(path) != fingerprint
+        assert '₵12.00' in path.read_text()
+
+    def test_bulk_updates_are_detected(self, user, add_expense):
+        """Changes that bypass save() still invalidate the statement."""
+        add_expense(user, '10.00')
+        generate_statement(user.pk, MONTH)
+        Expense.objects.filter(user=user).update(amount=Decimal('11.00'))
+        assert generate_statement(user.pk, MONTH) == 'written'
+
+    def test_list_filters_apply(self, user, add_expense):
+        """Category and search filters select expenses like the list view."""
+        add_expense(user, '12.50', description='Lunch')
+        add_expense(user, '30.00', ExpenseCategory.BILLS, description='Power')
+        generate_statement(user.pk, MONTH, {'category': ExpenseCategory.BILLS})
+        html = statement_path(user.pk, MONTH).read_text()
+        assert '₵30.00' in html
+        assert '₵12.50' not in html
+
+        generate_statement(user.pk, MONTH, {'search': '12.5'})
+        html = statement_path(user.pk, MONTH).read_text()
+        assert '₵12.50' in html
+        assert '₵30.00' not in html
+
+    def test_previous_month(self):
+        """The default month is the one before today."""
+        assert previous_month(date(2024, 1, 20)) == date(2023, 12, 1)
+        assert previous_month(date(2024, 3, 31)) == date(2024, 2, 1)
+
+
+@pytest.mark.django_db
+class TestGenerateStatementsCommand:
+    """Test cases for the generate_statements command."""
+
+    def test_generates_for_every_user(self, user, capsys, add_expense):
+        """Each active user gets a statement; reruns skip them."""
+        other = User.objects.create_user(username='other')
+        add_expense(user, '10.00')
+        call_command('generate_statements', month='2024-03', processes=1, chunk_size=1)
+        assert statement_path(user.pk, MONTH).exists()
+        assert statement_path(other.pk, MONTH).exists()
+        assert 'Wrote 2 statements, 0 unchanged' in capsys.readouterr().out
+
+        call_command('generate_statements', month='2024-03', processes=1)
+        assert 'Wrote 0 statements, 2 unchanged' in capsys.readouterr().out
+
+    def test_rejects_bad_month(self, user):
+        """Months must be given as YYYY-MM."""
+        with pytest.raises(CommandError):
+            call_command('generate_statements', month='March')
+
+
+@pytest.mark.django_db
+class TestStatementView:
+    """Test cases for serving statements to their owner."""
+
+    def test_stored_outside_media(self, settings, user):
+        """Statements are never written under the public MEDIA_ROOT."""
+        generate_statement(user.pk, MONTH)
+        path = statement_path(user.pk, MONTH)
+        assert path.is_relative_to(settings.STATEMENTS_ROOT)
+        assert not path.is_relative_to(settings.MEDIA_ROOT)
+
+    def test_owner_only(self, client, user, add_expense):
+        """Users get their own statement; others and anonymous users do not."""
+        add_expense(user, '10.00')
+        generate_statement(user.pk, MONTH)
+        url = reverse('statement', args=[2024, 3])
+        assert client.get(url).status_code == 302
+
+        client.force_login(user)
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response['Cache-Control'] == 'private, no-store'
+        assert '₵10.00' in b''.join(response.streaming_content).decode()
+
+        client.force_login(User.objects.create_user(username='other'))
+        assert client.get(url).status_code == 404
+        assert client.get(reverse('statement', args=[2024, 13])).status_code == 404
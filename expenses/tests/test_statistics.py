@@ -0,0 +1,82 @@
+"""
+Tests for rolling spending statistics and forecasts.
+"""
+import pytest
+from django.urls import reverse
+from decimal import Decimal
+from datetime import date, timedelta
+
+from expenses.analytics import ExpenseFrame
+from expenses.models import Expense, ExpenseCategory
+from expenses.statistics import compute_statistics, get_spending_statistics
+
+TODAY = date(2025, 3, 12)  # Wednesday
+
+
+@pytest.mark.django_db
+class TestSpendingStatistics:
+    """Test cases for the statistics module."""
+
+    def test_weekly_statistics(self, user):
+        """Weekly averages and medians cover the full history window."""
+        for weeks_ago in range(12):
+            Expense.objects.create(
+                user=user,
+                amount=Decimal('12.00'),
+                category=ExpenseCategory.FOOD,
+                date=TODAY - timedelta(weeks=weeks_ago)
+            )
+        summary = compute_statistics(ExpenseFrame.load(user.pk), TODAY)
+        assert summary['weekly_average'] == Decimal('12.00')
+        assert summary['weekly_median'] == Decimal('12.00')
+        assert summary['percentiles'] == [Decimal('12.00')] * 3
+        assert [row['category'] for row in summary['categories']] == [ExpenseCategory.FOOD]
+
+    def test_month_end_forecast(self, user):
+        """The forecast adds the trailing daily rate for the remaining days."""
+        Expense.objects.create(
+            user=user,
+            amount=Decimal('90.00'),
+            category=ExpenseCategory.BILLS,
+            date=date(2025, 3, 1)
+        )
+        summary = compute_statistics(ExpenseFrame.load(user.pk), TODAY)
+        bills = summary['categories'][0]
+        assert bills['month_spent'] == Decimal('90.00')
+        # 90.00 over a 90 day lookback is 1.00/day for 19 remaining days
+        assert bills['month_forecast'] == Decimal('109.00')
+
+    def test_memoized_per_data_version(self, user, django_capture_on_commit_callbacks):
+        """Results are cached until the user's data changes."""
+        Expense.objects.create(
+            user=user, amount=Decimal('10.00'), category=ExpenseCategory.FOOD, date=TODAY
+        )
+        first = get_spending_statistics(user.pk, TODAY)
+        assert get_spending_statistics(user.pk, TODAY) == first
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Expense.objects.create(
+                user=user, amount=Decimal('10.00'), category=ExpenseCategory.FOOD, date=TODAY
+            )
+        assert get_spending_statistics(user.pk, TODAY)['month_spent'] == Decimal('20.00')
+
+    def test_not_memoized_without_shared_versions(self, user, settings):
+        """Without a shared cache every call sees writes made by other processes."""
+        settings.DATA_VERSION_CACHES = False
+        Expense.objects.create(
+            user=user, amount=Decimal('10.00'), category=ExpenseCategory.FOOD, date=TODAY
+        )
+        get_spending_statistics(user.pk, TODAY)
+        # As if another process wrote: no version is bumped here
+        Expense.objects.filter(user=user).update(amount=Decimal('15.00'))
+        assert get_spending_statistics(user.pk, TODAY)['month_spent'] == Decimal('15.00')
+
+    def test_list_view_shows_summary(self, authenticated_client, user):
+        """The expense list exposes the spending summary."""
+        Expense.objects.create(
+            user=user, amount=Decimal('10.00'), category=ExpenseCategory.FOOD, date=date.today()
+        )
+        response = authenticated_client.get(reverse('expense_list'))
+        assert response.status_code == 200
+        assert response.context['spending_summary']['month_spent'] == Decimal('10.00')
+        assert 'Average weekly spend' in response.content.decode()
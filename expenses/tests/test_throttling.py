@@ -0,0 +1,122 @@
+"""
+Tests for token-bucket request throttling.
+"""
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import Client
+from django.urls import reverse
+from datetime import date
+
+from expense_tracker.throttling import Rate, parse_rate, take
+from expenses.models import ExpenseCategory
+
+
+def expense_data():
+    return {
+        'amount': '10.00',
+        'category': ExpenseCategory.FOOD,
+        'date': date.today().isoformat(),
+        'description': '',
+    }
+
+
+@pytest.fixture
+def rates(settings):
+    """Tight limits so tests hit them quickly."""
+    settings.THROTTLE_RATES = {
+        'add_expense': {'user': '2/min', 'ip': '5/min'},
+        'login': {'ip': '2/min'},
+    }
+    return settings.THROTTLE_RATES
+
+
+class TestTokenBucket:
+    """Test cases for the bucket arithmetic."""
+
+    def test_parse_rate(self):
+        """Rates are a count per (optionally multiplied) period."""
+        assert parse_rate('30/min') == Rate(30, 60)
+        assert parse_rate('5/hour') == Rate(5, 3600)
+        assert parse_rate('100/10s') == Rate(100, 10)
+        for value in ('30', '0/min', '5/fortnight'):
+            with pytest.raises(ImproperlyConfigured):
+                parse_rate(value)
+
+    def test_burst_then_refill(self):
+        """A full bucket allows a burst, then one request per refill."""
+        bucket = [('test:bucket', Rate(3, 60))]
+        assert [take(cache, bucket, now=0) for _ in range(3)] == [0, 0, 0]
+        assert take(cache, bucket, now=0) == pytest.approx(20)
+        assert take(cache, bucket, now=10) == pytest.approx(10)
+        assert take(cache, bucket, now=20) == 0
+        assert take(cache, bucket, now=20) == pytest.approx(20)
+
+    def test_all_buckets_or_none(self):
+        """A refused request takes no token from the other buckets."""
+        small = ('test:small', Rate(1, 60))
+        large = ('test:large', Rate(5, 60))
+        assert take(cache, [small, large], now=0) == 0
+        assert take(cache, [small, large], now=0) > 0
+        assert cache.get('test:large')[0] == pytest.approx(4)
+
+    def test_refill_caps_at_capacity(self):
+        """Idle time never banks more than one burst."""
+        bucket = [('test:idle', Rate(2, 60))]
+        take(cache, bucket, now=0)
+        assert [take(cache, bucket, now=10000) for _ in range(3)][-1] > 0
+
+
+@pytest.mark.django_db
+class TestThrottleMiddleware:
+    """Test cases for throttled endpoints."""
+
+    def test_user_limit(self, rates, authenticated_client):
+        """Writes beyond the user's bucket get 429 with Retry-After."""
+        url = reverse('add_expense')
+        statuses = [authenticated_client.post(url, expense_data()).status_code for _ in range(3)]
+        assert statuses == [302, 302, 429]
+        response = authenticated_client.post(url, expense_data())
+        assert response.status_code == 429
+        assert int(response['Retry-After']) == 30
+
+    def test_reads_are_not_throttled(self, rates, authenticated_client):
+        """GET requests never take tokens."""
+        url = reverse('add_expense')
+        assert all(authenticated_client.get(url).status_code == 200 for _ in range(5))
+
+    def test_users_have_separate_buckets(self, rates, authenticated_client):
+        """One user's burst does not block another user."""
+        url = reverse('add_expense')
+        for _ in range(3):
+            authenticated_client.post(url, expense_data())
+        User.objects.create_user(username='other', password='otherpass')
+        other = Client()
+        other.login(username='other', password='otherpass')
+        assert other.post(url, expense_data()).status_code == 302
+
+    def test_ip_limit_from_proxy_header(self, rates, settings, client):
+        """Anonymous logins are limited per client IP from the proxy header."""
+        settings.THROTTLE_IP_HEADER = 'HTTP_X_REAL_IP'
+        url = reverse('login')
+        data = {'username': 'nobody', 'password': 'wrong'}
+        statuses = [
+            client.post(url, data, HTTP_X_REAL_IP='203.0.113.7').status_code for _ in range(3)
+        ]
+        assert statuses == [200, 200, 429]
+        assert client.post(url, data, HTTP_X_REAL_IP='203.0.113.8').status_code == 200
+
+    def test_can_be_disabled(self, rates, settings, authenticated_client):
+        """THROTTLE_ENABLED=False lets everything through."""
+        settings.THROTTLE_ENABLED = False
+        url = reverse('add_expense')
+        assert all(
+            authenticated_client.post(url, expense_data()).status_code == 302 for _ in range(4)
+        )
+
+    def test_unlisted_views_are_not_throttled(self, rates, authenticated_client):
+        """Only URL names in THROTTLE_RATES are limited."""
+        url = reverse('budgets')
+        data = {'category': ExpenseCategory.FOOD, 'amount': '100.00'}
+        assert all(authenticated_client.post(url, data).status_code == 302 for _ in range(5))
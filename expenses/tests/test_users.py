@@ -0,0 +1,138 @@
+"""
+Tests for case-insensitive email uniqueness and bulk user provisioning.
+"""
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, transaction
+from django.urls import reverse
+
+from expenses.models import UserShard
+from expenses.users import users_with_emails
+
+SHARD = 'shard1'
+
+
+def write_csv(tmp_path, lines):
+    path = tmp_path / 'users.csv'
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+@pytest.mark.django_db
+class TestEmailUniqueness:
+    """Test cases for the LOWER(email) unique index."""
+
+    def test_database_rejects_case_variants(self):
+        """Two accounts cannot share an email in any case."""
+        User.objects.create_user(username='first', email='Alice@Example.com')
+        with pytest.raises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='second', email='alice@example.COM')
+
+    def test_blank_emails_are_not_constrained(self):
+        """Accounts without an email are allowed any number of times."""
+        User.objects.create_user(username='first')
+        User.objects.create_user(username='second')
+        assert User.objects.filter(email='').count() == 2
+
+    def test_lookup_uses_index(self):
+        """Email checks are answered from the functional index."""
+        if connection.vendor != 'sqlite':
+            pytest.skip('Plan text is SQLite specific')
+        plan = users_with_emails(['alice@example.com']).explain()
+        assert 'USING INDEX auth_user_email_ci_unique' in plan
+
+    def test_signup_rejects_case_variant(self, client):
+        """Signup reports an email registered in a different case."""
+        User.objects.create_user(username='first', email='alice@example.com')
+        response = client.post(reverse('signup'), {
+            'username': 'second',
+            'email': 'ALICE@example.com',
+            'password1': 'Str0ng-passphrase',
+            'password2': 'Str0ng-passphrase',
+        })
+        assert response.status_code == 200
+        assert 'This email address is already registered.' in response.content.decode()
+        assert not User.objects.filter(username='second').exists()
+
+
+@pytest.mark.django_db
+class TestProvisionUsers:
+    """Test cases for the provision_users command."""
+
+    def test_creates_and_skips(self, tmp_path, capsys, user):
+        """Valid rows are created; taken, repeated and invalid rows are reported."""
+        User.objects.filter(pk=user.pk).update(email='taken@example.com')
+        path = write_csv(tmp_path, [
+            'username,email,password',
+            'alice,alice@example.com,Str0ng-passphrase',
+            'bob,bob@example.com,',
+            'carol,TAKEN@example.com,secret',
+            'dave,Alice@Example.com,secret',
+            'testuser,new@example.com,secret',
+            'eve,not-an-email,secret',
+        ])
+        call_command('provision_users', path, processes=1)
+        out = capsys.readouterr().out
+        assert 'Created 2 users, skipped 4' in out
+        assert 'Line 4: Email "TAKEN@example.com" is taken' in out
+        assert 'Line 5: Email "Alice@Example.com" is taken' in out
+        assert 'Line 6: Username "testuser" is taken' in out
+
+        assert User.objects.get(username='alice').check_password('Str0ng-passphrase')
+        assert not User.objects.get(username='bob').has_usable_password()
+
+    def test_batches_see_earlier_batches(self, tmp_path, capsys):
+        """Duplicates are caught across insert batches."""
+        path = write_csv(tmp_path, [
+            'username,email',
+            'alice,alice@example.com',
+            'bob,bob@example.com',
+            'alice2,ALICE@example.com',
+        ])
+        call_command('provision_users', path, processes=1, batch_size=2)
+        out = capsys.readouterr().out
+        assert 'Created 2 users, skipped 1' in out
+        assert 'Line 4:' in out
+
+    def test_hashes_across_processes(self, tmp_path):
+        """Passwords hashed in worker processes match their users."""
+        path = write_csv(tmp_path, [
+            'username,email,password',
+            *[f'user{i},user{i}@example.com,passphrase-{i}' for i in range(4)],
+        ])
+        call_command('provision_users', path, processes=2, chunk_size=1)
+        for i in range(4):
+            assert User.objects.get(username=f'user{i}').check_password(f'passphrase-{i}')
+
+    def test_dry_run(self, tmp_path, capsys):
+        """--dry-run validates without creating accounts."""
+        path = write_csv(tmp_path, ['username,email', 'alice,alice@example.com'])
+        call_command('provision_users', path, dry_run=True)
+        assert 'Would create 1 users, skipped 0' in capsys.readouterr().out
+        assert not User.objects.filter(username='alice').exists()
+
+    def test_missing_columns(self, tmp_path):
+        """Files without username and email columns are refused."""
+        path = write_csv(tmp_path, ['name,password', 'alice,secret'])
+        with pytest.raises(CommandError, match='Missing columns: email, username'):
+            call_command('provision_users', path, processes=1)
+
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, SHARD])
+class TestProvisionSharded:
+    """Test cases for provisioning with sharding enabled."""
+
+    def test_users_are_placed_on_shards(self, settings, tmp_path):
+        """Bulk-created users are assigned shards as signups are."""
+        settings.EXPENSE_SHARDS = [DEFAULT_DB_ALIAS, SHARD]
+        path = write_csv(tmp_path, [
+            'username,email',
+            *[f'user{i},user{i}@example.com' for i in range(4)],
+        ])
+        call_command('provision_users', path, processes=1)
+        users = User.objects.filter(username__startswith='user')
+        placements = dict(UserShard.objects.values_list('user_id', 'alias'))
+        assert {placements[u.pk] for u in users} == {DEFAULT_DB_ALIAS, SHARD}
+        on_shard = [u.pk for u in users if placements[u.pk] == SHARD]
+        assert set(User.objects.using(SHARD).values_list('pk', flat=True)) == set(on_shard)
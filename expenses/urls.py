@@ -3,7 +3,20 @@ from . import views
 
 urlpatterns = [
     path('', views.expense_list, name='expense_list'),
+    path('rows/', views.expense_rows, name='expense_rows'),
     path('add/', views.add_expense, name='add_expense'),
     path('edit/<int:pk>/', views.edit_expense, name='edit_expense'),
     path('delete/<int:pk>/', views.delete_expense, name='delete_expense'),
+    path('bulk/', views.bulk_expenses, name='bulk_expenses'),
+    path('budgets/', views.budgets, name='budgets'),
+    path('budgets/delete/<int:pk>/', views.delete_budget, name='delete_budget'),
+    path('recurring/', views.recurring_list, name='recurring_list'),
+    path('recurring/add/', views.add_recurring, name='add_recurring'),
+    path('recurring/delete/<int:pk>/', views.delete_recurring, name='delete_recurring'),
+    path('profile/', views.profile, name='profile'),
+    path('export/', views.export_expenses, name='export_expenses'),
+    path('jobs/', views.job_list, name='job_list'),
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:pk>/download/', views.download_job, name='download_job'),
+    path('statements/<int:year>/<int:month>/', views.statement, name='statement'),
 ]
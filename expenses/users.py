@@ -0,0 +1,111 @@
+"""
+Case-insensitive email lookups and bulk user provisioning.
+
+``auth_user`` has a unique index on ``LOWER(email)`` for non-empty emails
+(migration 0015). Lookups here filter on that same expression and condition
+so the database answers them from the index instead of scanning the table.
+"""
+import csv
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from . import sharding
+
+HAS_EMAIL = ~Q(email='')
+
+PROVISION_COLUMNS = ('username', 'email', 'password')
+
+
+def users_with_emails(emails, using=DEFAULT_DB_ALIAS):
+    """Users whose email matches any of ``emails``, ignoring case."""
+    keys = {email.lower() for email in emails if email}
+    return (
+        User.objects.using(using)
+        .alias(email_key=Lower('email'))
+        .filter(HAS_EMAIL, email_key__in=keys)
+    )
+
+
+def email_taken(email):
+    """Whether another account already uses ``email``, ignoring case."""
+    return users_with_emails([email]).exists()
+
+
+def read_user_rows(file):
+    """
+    Rows of a CSV file with ``username``, ``email`` and an optional
+    ``password`` column. Users without a password cannot log in until they
+    reset it.
+    """
+    reader = csv.DictReader(file)
+    missing = {'username', 'email'} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f'Missing columns: {", ".join(sorted(missing))}')
+    return (
+        {column: (row.get(column) or '').strip() for column in PROVISION_COLUMNS}
+        for row in reader
+    )
+
+
+def validate_user_rows(rows):
+    """
+    Split ``rows`` into those that can be created and ``(line, reason)``
+    for the rest: invalid values, or a username or email already taken by
+    an existing account or an earlier row. Existing accounts are looked up
+    in one query per field.
+    """
+    rows = list(rows)
+    taken_usernames = set(
+        User.objects.filter(username__in=[row['username'] for row in rows])
+        .values_list('username', flat=True)
+    )
+    taken_emails = {
+        email.lower()
+        for email in users_with_emails([row['email'] for row in rows])
+        .values_list('email', flat=True)
+    }
+
+    valid, skipped = [], []
+    for line, row in enumerate(rows, start=2):
+        email = row['email'].lower()
+        try:
+            User.username_validator(row['username'])
+            validate_email(row['email'])
+        except ValidationError as error:
+            skipped.append((line, error.messages[0]))
+            continue
+        if row['username'] in taken_usernames:
+            skipped.append((line, f'Username "{row["username"]}" is taken'))
+        elif email in taken_emails:
+            skipped.append((line, f'Email "{row["email"]}" is taken'))
+        else:
+            taken_usernames.add(row['username'])
+            taken_emails.add(email)
+            valid.append(row)
+    return valid, skipped
+
+
+def hash_passwords(passwords):
+    """Password hashes for ``passwords``; empty ones become unusable."""
+    return [make_password(password or None) for password in passwords]
+
+
+def create_users(rows, password_hashes, batch_size=1000):
+    """
+    Insert users for ``rows`` with their precomputed ``password_hashes`` in
+    one transaction, then place them on shards. Returns the new users.
+    """
+    users = [
+        User(username=row['username'], email=row['email'], password=password_hash)
+        for row, password_hash in zip(rows, password_hashes)
+    ]
+    with transaction.atomic():
+        users = User.objects.bulk_create(users, batch_size=batch_size)
+    sharding.assign_shards(users)
+    return users
@@ -0,0 +1,68 @@
+"""
+Per-user expense data versions.
+
+Every expense write bumps the owner's version in the shared cache, so
+in-process caches and memoized results can tell when a user's data has
+changed without querying the expense table. Loading exchange rates bumps a
+global FX version that is part of every user's data version. Caches keyed
+on these versions are only safe while every process shares the default
+cache; ``DATA_VERSION_CACHES`` turns them off otherwise.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'expenses:data_version:{user_id}'
+FX_VERSION_KEY = 'expenses:fx_version'
+
+
+def versions_shared():
+    """Whether a bump reaches every process, so versioned caches may be used."""
+    return getattr(settings, 'DATA_VERSION_CACHES', True)
+
+
+def _initialize(key):
+    # Seed from the clock so a version evicted from the cache never
+    # repeats a value an old cache entry was stored under.
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+
+def _get(key):
+    version = cache.get(key)
+    if version is None:
+        version = _initialize(key)
+    return version
+
+
+def _bump(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return _initialize(key)
+
+
+def get_data_version(user_id):
+    """Current data version for ``user_id``, including the FX version."""
+    key = VERSION_KEY.format(user_id=user_id)
+    versions = cache.get_many([key, FX_VERSION_KEY])
+    user_version = versions.get(key) or _initialize(key)
+    fx_version = versions.get(FX_VERSION_KEY) or _initialize(FX_VERSION_KEY)
+    return f'{user_version}.{fx_version}'
+
+
+def get_fx_version():
+    """Current version of the exchange rate table."""
+    return _get(FX_VERSION_KEY)
+
+
+def bump_data_version(user_id):
+    """Mark ``user_id``'s expense data as changed and return the new version."""
+    key = VERSION_KEY.format(user_id=user_id)
+    return _bump(key)
+
+
+def bump_fx_version():
+    """Mark exchange rates as changed for every user."""
+    return _bump(FX_VERSION_KEY)
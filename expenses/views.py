@@ -1,8 +1,17 @@
-from django.shortcuts import redirect
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import BadRequest
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render, resolve_url
+from django.template.loader import render_to_string
 from django.contrib import messages
-from django.contrib.auth import login
+from django.contrib.auth import alogin
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.views import View
+from django.views.decorators.cache import never_cache
+from django.views.decorators.debug import sensitive_post_parameters
 from django.views.generic import (
+    DetailView,
     ListView,
     CreateView,
     UpdateView,
@@ -10,75 +19,187 @@ from django.views.generic import (
     FormView,
 )
 from django.urls import reverse_lazy
-from django.db.models import Q, Sum
-from datetime import datetime, timedelta
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from datetime import date, datetime, timedelta
 
-from .models import Expense, ExpenseCategory
-from .forms import ExpenseForm, SignUpForm
+from expense_tracker.routers import replica_reads
 
+from .budgets import budget_status, check_budget
+from .currency import converted, format_money, home_currency
+from .cursors import next_batch
+from .filters import filter_expenses
+from .jobs import enqueue
+from .models import (
+    Budget, Expense, ExpenseCategory, Job, JobStatus, RecurringExpense, UserProfile,
+)
+from .forms import (
+    BudgetForm, BulkExpenseForm, ExpenseForm, LoginForm, ProfileForm, RecurringExpenseForm,
+    SignUpForm,
+)
+from .passwords import HashingBusy, authenticate, hash_password
+from .statements import statement_path
+from .statistics import get_spending_statistics
+from .tasks import bulk_delete, bulk_recategorize, bulk_shift_dates, export_path
+
+
+class HashingViewMixin:
+    """
+    Form rendering for the async login and signup views, whose password
+    hashing runs in the hashing pool (``expenses.passwords``).
+    """
+
+    template_name = None
+
+    async def render_form(self, request, form, status=200):
+        # Rendering may load the session and user from the database
+        return await sync_to_async(render)(
+            request, self.template_name, {'form': form}, status=status
+        )
+
+    async def hashing_busy(self, request, form):
+        """Refuse at once while too many hashes are queued."""
+        form.add_error(None, 'We are handling a lot of sign-ins right now. Please try again shortly.')
+        response = await self.render_form(request, form, status=503)
+        response['Retry-After'] = '5'
+        return response
+
+
+class LoginView(HashingViewMixin, View):
+    """Log users in, checking the password off the request thread."""
+
+    template_name = 'registration/login.html'
+
+    async def get(self, request, *args, **kwargs):
+        return await self.render_form(request, LoginForm(request))
+
+    async def post(self, request, *args, **kwargs):
+        form = LoginForm(request, data=request.POST)
+        if form.is_valid():
+            try:
+                user = await authenticate(
+                    request, form.cleaned_data['username'], form.cleaned_data['password']
+                )
+            except HashingBusy:
+                return await self.hashing_busy(request, form)
+            if user is not None:
+                await alogin(request, user)
+                return redirect(self.get_success_url(request))
+            form.add_error(None, form.get_invalid_login_error())
+        return await self.render_form(request, form)
+
+    def get_success_url(self, request):
+        url = request.POST.get('next', request.GET.get('next', ''))
+        if url_has_allowed_host_and_scheme(
+            url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+        ):
+            return url
+        return resolve_url(settings.LOGIN_REDIRECT_URL)
+
+
+class SignUpView(HashingViewMixin, View):
+    """Handle user registration, hashing the password off the request thread."""
 
-class SignUpView(FormView):
-    """Handle user registration."""
-    
     template_name = 'registration/signup.html'
     form_class = SignUpForm
     success_url = reverse_lazy('expense_list')
 
-    def form_valid(self, form):
-        user = form.save()
-        login(self.request, user)
-        messages.success(self.request, 'Account created successfully!')
-        return super().form_valid(form)
-
-    def dispatch(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         # Redirect authenticated users to expense list
-        if request.user.is_authenticated:
+        if (await request.auser()).is_authenticated:
+            return redirect('expense_list')
+        return await self.render_form(request, self.form_class())
+
+    async def post(self, request, *args, **kwargs):
+        if (await request.auser()).is_authenticated:
             return redirect('expense_list')
-        return super().dispatch(request, *args, **kwargs)
+        form = self.form_class(request.POST)
+        # Validation looks up existing usernames and emails
+        if not await sync_to_async(form.is_valid)():
+            return await self.render_form(request, form)
+        try:
+            password_hash = await hash_password(form.cleaned_data['password1'])
+        except HashingBusy:
+            return await self.hashing_busy(request, form)
+        try:
+            user = await sync_to_async(self.create_user)(form, password_hash)
+        except IntegrityError:
+            # Another signup took the username or email since validation
+            form.add_error(None, 'That username or email address was just registered.')
+            return await self.render_form(request, form)
+        await alogin(request, user)
+        messages.success(request, 'Account created successfully!')
+        return redirect(self.success_url)
+
+    def create_user(self, form, password_hash):
+        with transaction.atomic():
+            return form.save(password_hash=password_hash)
+
+
+class ReplicaReadMixin:
+    """
+    Serve GET requests from a read replica when one is configured and the
+    user has not written recently. The response is rendered inside the
+    block so lazy template queries are routed too.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        return response
 
 
-class ExpenseListView(LoginRequiredMixin, ListView):
+class ExpenseBatchMixin:
+    """
+    The user's expenses narrowed by the list filters, served in keyset
+    batches of ``batch_size`` from the ``cursor`` query parameter.
+    """
+
+    batch_size = 20
+
+    def get_queryset(self):
+        """Filter expenses based on query parameters."""
+        return filter_expenses(
+            Expense.objects.filter(user=self.request.user), self.request.GET
+        )
+
+    def get_batch(self, queryset):
+        """``(rows, next_cursor)`` for the requested cursor."""
+        try:
+            return next_batch(queryset, self.request.GET.get('cursor') or None, self.batch_size)
+        except ValueError:
+            raise BadRequest('Invalid cursor')
+
+    def next_query(self, cursor):
+        """Query string for the batch after this one, keeping the filters."""
+        if cursor is None:
+            return None
+        params = self.request.GET.copy()
+        params['cursor'] = cursor
+        return params.urlencode()
+
+
+class ExpenseListView(LoginRequiredMixin, ReplicaReadMixin, ExpenseBatchMixin, ListView):
     """
     Display list of expenses with filtering capabilities.
-    Users can filter by category and date range.
+    Users can filter by category and date range. Further rows are loaded
+    in batches from ``ExpenseRowsView`` as the user scrolls.
     """
     
     model = Expense
     template_name = 'expenses/expense_list.html'
     context_object_name = 'expenses'
-    paginate_by = 20
-
-    def get_queryset(self):
-        """Filter expenses based on query parameters."""
-        queryset = Expense.objects.filter(user=self.request.user)
-
-        # Category filter
-        category = self.request.GET.get('category')
-        if category and category != 'All':
-            queryset = queryset.filter(category=category)
-
-        # Date range filter
-        date_from = self.request.GET.get('date_from')
-        if date_from:
-            queryset = queryset.filter(date__gte=date_from)
-
-        date_to = self.request.GET.get('date_to')
-        if date_to:
-            queryset = queryset.filter(date__lte=date_to)
-
-        # Search filter
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(description__icontains=search) |
-                Q(amount__icontains=search)
-            )
-
-        return queryset
 
     def get_context_data(self, **kwargs):
         """Add additional context for the template."""
-        context = super().get_context_data(**kwargs)
+        rows, cursor = self.get_batch(self.object_list)
+        context = super().get_context_data(object_list=rows, **kwargs)
+        context['next_query'] = self.next_query(cursor)
         
         # Pass filter parameters back to template
         context['selected_category'] = self.request.GET.get('category', 'All')
@@ -86,16 +207,54 @@ class ExpenseListView(LoginRequiredMixin, ListView):
         context['date_to'] = self.request.GET.get('date_to', '')
         context['search'] = self.request.GET.get('search', '')
         context['categories'] = ExpenseCategory.choices
+        context['bulk_form'] = BulkExpenseForm()
 
-        # Calculate total for filtered expenses
-        context['total_amount'] = self.get_queryset().aggregate(
-            total=Sum('amount')
+        # Calculate total for filtered expenses in the user's home currency
+        currency = home_currency(self.request.user)
+        context['currency'] = currency
+        context['total_amount'] = self.object_list.aggregate(
+            total=Sum(converted(currency))
         )['total'] or 0
 
+        # Rolling statistics and month-end forecast for the summary card
+        context['spending_summary'] = get_spending_statistics(self.request.user.pk)
+
+        # Budget status for the current month
+        context['budgets'] = budget_status(self.request.user)
+
         return context
 
 
-class ExpenseCreateView(LoginRequiredMixin, CreateView):
+class ExpenseRowsView(LoginRequiredMixin, ReplicaReadMixin, ExpenseBatchMixin, View):
+    """
+    Next batch of expense list rows for infinite scrolling: the rendered
+    ``<tr>`` fragment and the cursor of the batch after it, without the
+    page layout, totals or summaries.
+    """
+
+    def get(self, request, *args, **kwargs):
+        rows, cursor = self.get_batch(self.get_queryset())
+        html = render_to_string(
+            'expenses/_expense_rows.html', {'expenses': rows}, request=request
+        )
+        return JsonResponse({'html': html, 'next': self.next_query(cursor)})
+
+
+class BudgetWarningMixin:
+    """Warn after saving an expense that pushes its category over budget."""
+
+    def warn_if_over_budget(self, expense):
+        budget = check_budget(expense)
+        if budget is not None and budget.is_over:
+            messages.warning(
+                self.request,
+                f'You are over your {budget.get_category_display()} budget this month: '
+                f'{format_money(budget.spent, budget.currency)} of '
+                f'{format_money(budget.amount, budget.currency)} spent.'
+            )
+
+
+class ExpenseCreateView(LoginRequiredMixin, BudgetWarningMixin, CreateView):
     """Handle creation of new expenses."""
     
     model = Expense
@@ -103,11 +262,16 @@ class ExpenseCreateView(LoginRequiredMixin, CreateView):
     template_name = 'expenses/expense_form.html'
     success_url = reverse_lazy('expense_list')
 
+    def get_initial(self):
+        return {**super().get_initial(), 'currency': home_currency(self.request.user)}
+
     def form_valid(self, form):
         """Set the user before saving."""
         form.instance.user = self.request.user
         messages.success(self.request, 'Expense added successfully!')
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        self.warn_if_over_budget(self.object)
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -116,7 +280,7 @@ class ExpenseCreateView(LoginRequiredMixin, CreateView):
         return context
 
 
-class ExpenseUpdateView(LoginRequiredMixin, UpdateView):
+class ExpenseUpdateView(LoginRequiredMixin, BudgetWarningMixin, UpdateView):
     """Handle updating existing expenses."""
     
     model = Expense
@@ -130,7 +294,9 @@ class ExpenseUpdateView(LoginRequiredMixin, UpdateView):
 
     def form_valid(self, form):
         messages.success(self.request, 'Expense updated successfully!')
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        self.warn_if_over_budget(self.object)
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -155,8 +321,249 @@ class ExpenseDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
-signup = SignUpView.as_view()
+class ExpenseBulkView(LoginRequiredMixin, FormView):
+    """
+    Recategorize, shift or delete the expenses ticked in the list with one
+    set-based query, scoped to the current user.
+    """
+
+    form_class = BulkExpenseForm
+    success_url = reverse_lazy('expense_list')
+
+    def get(self, request, *args, **kwargs):
+        return redirect('expense_list')
+
+    def get_success_url(self):
+        # Return to the filtered page the selection was made on
+        next_url = self.request.POST.get('next', '')
+        if url_has_allowed_host_and_scheme(
+            next_url, allowed_hosts={self.request.get_host()},
+            require_https=self.request.is_secure(),
+        ):
+            return next_url
+        return super().get_success_url()
+
+    def form_valid(self, form):
+        user_id = self.request.user.pk
+        expense_ids = form.cleaned_data['expenses']
+        action = form.cleaned_data['action']
+        if action == BulkExpenseForm.RECATEGORIZE:
+            count = bulk_recategorize(user_id, expense_ids, form.cleaned_data['category'])
+            messages.success(self.request, f'{count} expense(s) recategorized.')
+        elif action == BulkExpenseForm.SHIFT_DATES:
+            try:
+                count = bulk_shift_dates(user_id, expense_ids, form.cleaned_data['days'])
+            except IntegrityError:
+                messages.error(
+                    self.request,
+                    'Dates not changed: a recurring expense already has an '
+                    'occurrence on one of the new dates.'
+                )
+                return redirect(self.get_success_url())
+            messages.success(self.request, f'{count} expense(s) moved.')
+        else:
+            count = bulk_delete(user_id, expense_ids)
+            messages.success(self.request, f'{count} expense(s) deleted.')
+        return super().form_valid(form)
+
+    def form_invalid(self, form):
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(self.request, error)
+        return redirect(self.get_success_url())
+
+
+class BudgetView(LoginRequiredMixin, FormView):
+    """Show this month's budget status and set per-category budgets."""
+
+    template_name = 'expenses/budgets.html'
+    form_class = BudgetForm
+    success_url = reverse_lazy('budgets')
+
+    def form_valid(self, form):
+        Budget.objects.update_or_create(
+            user=self.request.user,
+            category=form.cleaned_data['category'],
+            defaults={'amount': form.cleaned_data['amount']},
+        )
+        messages.success(self.request, 'Budget saved successfully!')
+        return super().form_valid(form)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['budgets'] = budget_status(self.request.user)
+        return context
+
+
+class BudgetDeleteView(LoginRequiredMixin, DeleteView):
+    """Handle deletion of budgets."""
+
+    model = Budget
+    success_url = reverse_lazy('budgets')
+
+    def get_queryset(self):
+        """Ensure users can only delete their own budgets."""
+        return Budget.objects.filter(user=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        return redirect('budgets')
+
+    def form_valid(self, form):
+        messages.success(self.request, 'Budget removed.')
+        return super().form_valid(form)
+
+
+class RecurringExpenseListView(LoginRequiredMixin, ListView):
+    """List the user's recurring expense templates."""
+
+    model = RecurringExpense
+    template_name = 'expenses/recurring_list.html'
+    context_object_name = 'recurring_expenses'
+
+    def get_queryset(self):
+        return RecurringExpense.objects.filter(user=self.request.user)
+
+
+class RecurringExpenseCreateView(LoginRequiredMixin, CreateView):
+    """Handle creation of recurring expense templates."""
+
+    model = RecurringExpense
+    form_class = RecurringExpenseForm
+    template_name = 'expenses/recurring_form.html'
+    success_url = reverse_lazy('recurring_list')
+
+    def get_initial(self):
+        return {**super().get_initial(), 'currency': home_currency(self.request.user)}
+
+    def form_valid(self, form):
+        """Set the user before saving."""
+        form.instance.user = self.request.user
+        messages.success(
+            self.request,
+            'Recurring expense saved. Occurrences are added automatically when due.'
+        )
+        return super().form_valid(form)
+
+
+class RecurringExpenseDeleteView(LoginRequiredMixin, DeleteView):
+    """Handle deletion of recurring expense templates."""
+
+    model = RecurringExpense
+    success_url = reverse_lazy('recurring_list')
+
+    def get_queryset(self):
+        """Ensure users can only delete their own templates."""
+        return RecurringExpense.objects.filter(user=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        return redirect('recurring_list')
+
+    def form_valid(self, form):
+        messages.success(self.request, 'Recurring expense removed.')
+        return super().form_valid(form)
+
+
+class ProfileView(LoginRequiredMixin, UpdateView):
+    """Edit the user's preferences, such as the home currency."""
+
+    model = UserProfile
+    form_class = ProfileForm
+    template_name = 'expenses/profile.html'
+    success_url = reverse_lazy('expense_list')
+
+    def get_object(self, queryset=None):
+        profile, _ = UserProfile.objects.get_or_create(user=self.request.user)
+        return profile
+
+    def form_valid(self, form):
+        messages.success(self.request, 'Preferences saved.')
+        return super().form_valid(form)
+
+
+class ExportExpensesView(LoginRequiredMixin, View):
+    """Queue a CSV export of the user's expenses as a background job."""
+
+    def post(self, request, *args, **kwargs):
+        job = enqueue('export_expenses', {'user_id': request.user.pk}, user=request.user)
+        messages.info(request, 'Your export is being prepared.')
+        return redirect('job_detail', pk=job.pk)
+
+    def get(self, request, *args, **kwargs):
+        return redirect('expense_list')
+
+
+class JobListView(LoginRequiredMixin, ListView):
+    """List the user's background jobs."""
+
+    model = Job
+    template_name = 'expenses/job_list.html'
+    context_object_name = 'jobs'
+    paginate_by = 20
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).order_by('-created_at')
+
+
+class JobDetailView(LoginRequiredMixin, DetailView):
+    """Show the status of one background job."""
+
+    model = Job
+    template_name = 'expenses/job_detail.html'
+    context_object_name = 'job'
+
+    def get_queryset(self):
+        """Ensure users can only see their own jobs."""
+        return Job.objects.filter(user=self.request.user)
+
+
+class JobDownloadView(LoginRequiredMixin, View):
+    """Download the file produced by a finished export job."""
+
+    def get(self, request, pk, *args, **kwargs):
+        job = get_object_or_404(
+            Job, pk=pk, user=request.user,
+            kind='export_expenses', status=JobStatus.SUCCEEDED
+        )
+        path = export_path(job)
+        if not path.exists():
+            raise Http404('Export file is no longer available')
+        return FileResponse(
+            path.open('rb'), as_attachment=True, filename='expenses.csv',
+            content_type='text/csv'
+        )
+
+
+class StatementView(LoginRequiredMixin, View):
+    """Serve the signed-in user's monthly statement."""
+
+    def get(self, request, year, month, *args, **kwargs):
+        try:
+            path = statement_path(request.user.pk, date(year, month, 1))
+        except ValueError:
+            raise Http404('No such month')
+        if not path.exists():
+            raise Http404('No statement for this month')
+        response = FileResponse(path.open('rb'), content_type='text/html; charset=utf-8')
+        response['Cache-Control'] = 'private, no-store'
+        return response
+
+
+login = sensitive_post_parameters()(never_cache(LoginView.as_view()))
+signup = sensitive_post_parameters()(SignUpView.as_view())
 expense_list = ExpenseListView.as_view()
+expense_rows = ExpenseRowsView.as_view()
 add_expense = ExpenseCreateView.as_view()
 edit_expense = ExpenseUpdateView.as_view()
 delete_expense = ExpenseDeleteView.as_view()
+bulk_expenses = ExpenseBulkView.as_view()
+budgets = BudgetView.as_view()
+delete_budget = BudgetDeleteView.as_view()
+recurring_list = RecurringExpenseListView.as_view()
+add_recurring = RecurringExpenseCreateView.as_view()
+delete_recurring = RecurringExpenseDeleteView.as_view()
+profile = ProfileView.as_view()
+export_expenses = ExportExpensesView.as_view()
+job_list = JobListView.as_view()
+job_detail = JobDetailView.as_view()
+download_job = JobDownloadView.as_view()
+statement = StatementView.as_view()
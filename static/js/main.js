@@ -22,6 +22,8 @@ document.addEventListener('DOMContentLoaded', function() {
         }, false);
     });
 
+    initializeInfiniteScroll();
+
     // Initialize tooltips
     const tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
     tooltipTriggerList.map(function(tooltipTriggerEl) {
@@ -58,4 +60,64 @@ function initializeCharts(categoryData) {
             }
         }
     });
-}
\ No newline at end of file
+}
+
+// Infinite scroll for the expense list: fetch the next batch of rows from
+// the rows endpoint when the "Load more" link comes into view (or is
+// clicked) and append them to the table. Without JavaScript the link
+// loads the next batch as a full page.
+function initializeInfiniteScroll() {
+    const more = document.getElementById('expense-rows-more');
+    const rows = document.getElementById('expense-rows');
+    if (!more || !rows) return;
+
+    const link = more.querySelector('a');
+    let loading = false;
+    let observer = null;
+
+    function loadMore() {
+        if (loading || !more.dataset.next) return;
+        loading = true;
+        fetch(`${more.dataset.rowsUrl}?${more.dataset.next}`, {
+            headers: {'Accept': 'application/json'},
+            credentials: 'same-origin'
+        })
+            .then(function(response) {
+                if (!response.ok) throw new Error(response.statusText);
+                return response.json();
+            })
+            .then(function(data) {
+                rows.insertAdjacentHTML('beforeend', data.html);
+                if (!data.next) {
+                    if (observer) observer.disconnect();
+                    more.remove();
+                    return;
+                }
+                more.dataset.next = data.next;
+                link.href = `?${data.next}`;
+                if (observer) {
+                    // Fire again if the link is still on screen
+                    observer.unobserve(more);
+                    observer.observe(more);
+                }
+            })
+            .catch(function() {
+                // Leave the link in place for another try
+            })
+            .finally(function() {
+                loading = false;
+            });
+    }
+
+    link.addEventListener('click', function(event) {
+        event.preventDefault();
+        loadMore();
+    });
+
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(function(entries) {
+            if (entries.some(entry => entry.isIntersecting)) loadMore();
+        }, {rootMargin: '200px'});
+        observer.observe(more);
+    }
+}